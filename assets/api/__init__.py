@@ -6,7 +6,7 @@ from ninja.security import django_auth
 from django.conf import settings
 
 # AA Assets
-from assets.api import assets, requests
+from assets.api import assets, requests, snapshots
 from assets.hooks import get_extension_logger
 
 logger = get_extension_logger(__name__)
@@ -23,3 +23,5 @@ api = NinjaAPI(
 assets.setup(api)
 # Add the character endpoints
 requests.setup(api)
+# Add the snapshot endpoints
+snapshots.setup(api)
@@ -5,19 +5,28 @@ from typing import Any
 from ninja import NinjaAPI
 
 # Django
+from django.db.models import Sum
 from django.urls import reverse
 from django.utils.html import format_html
 
 # AA Assets
 from assets.api import schema
-from assets.api.assets.helper import update_asset_object
+from assets.api.assets.helper import annotate_available_assets, apply_datatables
 from assets.api.helpers import get_asset, get_owner
 from assets.constants import CORPORATION_FLAGS, LOCATION_FLAGS
 from assets.hooks import get_extension_logger
-from assets.models import Assets, Location
+from assets.models import (
+    AssetEvent,
+    AssetLocationSummary,
+    AssetSearchIndex,
+    Location,
+)
 
 logger = get_extension_logger(__name__)
 
+ASSETS_SEARCH_LIMIT = 100
+ASSETS_EVENTS_LIMIT = 1000
+
 
 class AssetsApiEndpoints:
     tags = ["Assets"]
@@ -44,33 +53,32 @@ class AssetsApiEndpoints:
             else:
                 location_flag = [location_flag]
 
-            assets_qs = (
+            assets_qs = annotate_available_assets(
                 asset_obj.filter(location_flag__in=location_flag)
                 .select_related("location", "eve_type")
                 .annotate_location_name()
             )
+            assets_qs, records_total, records_filtered, draw = apply_datatables(
+                assets_qs, request.GET
+            )
             assets = []
 
             for asset in assets_qs:
-                asset = update_asset_object(asset)
-
-                if asset is False:
-                    continue
-
-                try:
-                    price = asset.price * asset.quantity
-                except TypeError:
-                    price = "N/A"
                 assets.append(
                     {
                         "asset_pk": asset.pk,
                         "item_id": asset.item_id,
+                        "type_id": asset.eve_type_id,
                         "name": asset.eve_type.name,
-                        "quantity": asset.quantity,
+                        "quantity": asset.available_quantity,
                         "location_id": asset.location.id,
                         "location": asset.location_name,
                         "location_flag": asset.get_location_flag_display(),
-                        "price": price,
+                        "price": (
+                            asset.total_price
+                            if asset.total_price is not None
+                            else "N/A"
+                        ),
                     }
                 )
 
@@ -78,6 +86,9 @@ class AssetsApiEndpoints:
                 "location_id": location_id,
                 "location_flag": response_location_flag,
                 "assets": assets,
+                "draw": draw,
+                "recordsTotal": records_total,
+                "recordsFiltered": records_filtered,
             }
 
             return output
@@ -97,19 +108,20 @@ class AssetsApiEndpoints:
             if not perm:
                 return 403, "Permission Denied"
 
-            locations_ids = (
-                Assets.objects.filter(
+            summaries = {
+                row["location_id"]: row
+                for row in AssetLocationSummary.objects.filter(
                     owner__in=owner,
                     location_flag__in=LOCATION_FLAGS + CORPORATION_FLAGS,
                 )
-                .values_list("location_id", flat=True)
-                .distinct()
-            )
+                .values("location_id")
+                .annotate(items=Sum("item_count"), value=Sum("total_value"))
+                .order_by()
+            }
 
             locations = (
-                Location.objects.filter(id__in=locations_ids)
+                Location.objects.filter(id__in=summaries)
                 .select_related("eve_solar_system", "eve_type", "parent")
-                .distinct()
                 .annotate_location_name()
                 .annotate_system_name()
             )
@@ -128,8 +140,96 @@ class AssetsApiEndpoints:
                         "location_id": location.id,
                         "name": location.location_name,
                         "solar_system": location.system_name,
+                        "items": summaries[location.id]["items"],
+                        "value": summaries[location.id]["value"],
+                        "view": format_html(html),
+                    }
+                )
+
+            return output
+
+        @api.get(
+            "search/",
+            response={200: Any, 403: str},
+            tags=self.tags,
+            auth=None,
+        )
+        def search_assets(request, q: str = ""):
+            """
+            Search the item types in all visible assets.
+            """
+
+            perm, _ = get_owner(request)
+            if not perm:
+                return 403, "Permission Denied"
+
+            entries = (
+                AssetSearchIndex.objects.visible_to(request.user)
+                .search(q)
+                .select_related(
+                    "eve_type",
+                    "location__resolved_solar_system",
+                    "owner__character__character",
+                    "owner__corporation",
+                )[:ASSETS_SEARCH_LIMIT]
+            )
+
+            output = []
+
+            for entry in entries:
+                url = reverse(
+                    viewname="assets:assets",
+                    kwargs={"location_id": entry.location_id, "location_flag": "all"},
+                )
+                html = f"<a href='{url}'><button class='btn btn-primary'>View Assets</button></a>"
+
+                output.append(
+                    {
+                        "type_id": entry.eve_type_id,
+                        "name": entry.eve_type.name,
+                        "quantity": entry.quantity,
+                        "location_id": entry.location_id,
+                        "location": entry.location.resolved_name
+                        or f"Location #{entry.location_id}",
+                        "solar_system": (
+                            entry.location.resolved_solar_system.name
+                            if entry.location.resolved_solar_system
+                            else "N/A"
+                        ),
+                        "owner": entry.owner.name,
                         "view": format_html(html),
                     }
                 )
 
             return output
+
+        @api.get(
+            "events/",
+            response={200: schema.AssetEvents, 403: str},
+            tags=self.tags,
+        )
+        def get_asset_events(
+            request, cursor: int = 0, limit: int = ASSETS_EVENTS_LIMIT
+        ):
+            """
+            Return the asset events of all visible owners after the cursor.
+
+            The returned cursor is passed on the next call to read newer events.
+            """
+
+            perm, owners = get_owner(request)
+            if not perm:
+                return 403, "Permission Denied"
+
+            limit = max(1, min(limit, ASSETS_EVENTS_LIMIT))
+            # Events without a sequence number are not committed in order yet
+            events = list(
+                AssetEvent.objects.filter(
+                    owner__in=owners, sequence__gt=cursor
+                ).order_by("sequence")[:limit]
+            )
+
+            return {
+                "events": events,
+                "cursor": events[-1].sequence if events else cursor,
+            }
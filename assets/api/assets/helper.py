@@ -1,37 +1,115 @@
 # Django
-from django.db.models import Sum
-from django.utils import timezone
-from django.utils.translation import gettext_lazy as _
+from django.db import models
+from django.db.models import ExpressionWrapper, F, Q
+from django.db.models.functions import Coalesce
+from django.http import QueryDict
 
 # AA Assets
 from assets.hooks import get_extension_logger
-from assets.models import Assets, Request, RequestAssets
+from assets.models import Assets
 
 logger = get_extension_logger(__name__)
 
 
 def update_asset_object(asset: Assets) -> Assets | bool:
-    """Update the asset object based on open requests."""
-    req_assets = RequestAssets.objects.filter(asset_pk=asset.pk)
+    """Update the asset object based on open requests.
 
-    # Filter out requests that are completed and not older than 2 hours
-    recent_ordered_quantity = req_assets.filter(
-        request__status=Request.STATUS_COMPLETED,
-        request__closed_at__gte=timezone.now() - timezone.timedelta(hours=2),
-    ).aggregate(total_quantity=Sum("quantity"))["total_quantity"]
+    Assets should be annotated with `annotate_reserved_quantity`,
+    otherwise the reserved quantity is queried for the single asset.
+    """
+    reserved_quantity = getattr(asset, "reserved_quantity", None)
+    if reserved_quantity is None:
+        reserved_quantity = (
+            Assets.objects.filter(pk=asset.pk)
+            .annotate_reserved_quantity()
+            .values_list("reserved_quantity", flat=True)
+            .first()
+        )
 
-    ordered_quantity = req_assets.filter(
-        request__status=Request.STATUS_OPEN,
-    ).aggregate(total_quantity=Sum("quantity"))["total_quantity"]
-
-    if recent_ordered_quantity:
-        if recent_ordered_quantity >= asset.quantity:
-            return False
-        asset.quantity -= recent_ordered_quantity
-
-    if ordered_quantity:
-        if ordered_quantity >= asset.quantity:
+    if reserved_quantity:
+        if reserved_quantity >= asset.quantity:
             return False
-        asset.quantity -= ordered_quantity
+        asset.quantity -= reserved_quantity
 
     return asset
+
+
+# DataTables column data mapped to the ordering of the assets query
+DATATABLES_ORDER_COLUMNS = {
+    "name": "eve_type__name",
+    "quantity": "available_quantity",
+    "location": "location_name",
+    "location_flag": "location_flag",
+    "price": "total_price",
+}
+
+
+def annotate_available_assets(queryset: models.QuerySet) -> models.QuerySet:
+    """Annotate the available quantity and total price of assets.
+
+    Assets that are fully reserved by requests are excluded.
+    """
+    return (
+        queryset.annotate_market_price()
+        .annotate_reserved_quantity()
+        .annotate(available_quantity=F("quantity") - F("reserved_quantity"))
+        .filter(available_quantity__gt=0)
+        .annotate(
+            # Prefer the current market price over the price at sync time
+            total_price=ExpressionWrapper(
+                Coalesce("market_price", "price") * F("available_quantity"),
+                output_field=models.FloatField(),
+            )
+        )
+    )
+
+
+def apply_datatables(
+    queryset: models.QuerySet, params: QueryDict
+) -> tuple[models.QuerySet, int, int, int]:
+    """Apply DataTables server-side search, ordering and paging to a queryset.
+
+    :return: Page of the queryset, total and filtered number of records
+        and the draw counter of the request
+    """
+    records_total = queryset.count()
+
+    search = params.get("search[value]", "").strip()
+    if search:
+        # Flags are searched by the label shown in the table, not the stored value
+        flags = [
+            value
+            for value, label in Assets.LocationFlag.choices
+            if search.lower() in str(label).lower()
+        ]
+        queryset = queryset.filter(
+            Q(eve_type__name__icontains=search) | Q(location_flag__in=flags)
+        )
+    records_filtered = queryset.count() if search else records_total
+
+    ordering = []
+    i = 0
+    while f"order[{i}][column]" in params:
+        column = params.get(f"order[{i}][column]")
+        field = DATATABLES_ORDER_COLUMNS.get(params.get(f"columns[{column}][data]"))
+        if field:
+            descending = params.get(f"order[{i}][dir]") == "desc"
+            ordering.append(F(field).desc() if descending else F(field).asc())
+        i += 1
+    queryset = queryset.order_by(*ordering, "pk")
+
+    try:
+        draw = int(params.get("draw", 0) or 0)
+    except ValueError:
+        draw = 0
+    try:
+        start = max(int(params.get("start", 0)), 0)
+        length = int(params.get("length", -1))
+    except ValueError:
+        start, length = 0, -1
+    if length > 0:
+        queryset = queryset[start : start + length]
+    elif start:
+        queryset = queryset[start:]
+
+    return queryset, records_total, records_filtered, draw
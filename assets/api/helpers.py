@@ -48,43 +48,65 @@ def get_character_permission(request) -> bool:
     return perms
 
 
-def get_manage_permission(request) -> bool:
-    """Get Permission for Corporation"""
-    perms = True
-    owner = Owner.objects.all()
+def _get_access_cache(request) -> dict:
+    """Return the access check cache of the request."""
+    if not hasattr(request, "_assets_access_cache"):
+        request._assets_access_cache = {}
+    return request._assets_access_cache
+
+
+def _cached_access(request, key: tuple, check) -> bool:
+    """Run an access check once per user and request."""
+    access_cache = _get_access_cache(request)
+    key = (request.user.pk, *key)
+    if key not in access_cache:
+        access_cache[key] = check()
+    return access_cache[key]
+
+
+def can_view_location(request, location_id: int) -> bool:
+    """Check if the request user can see any asset at the location."""
+    return _cached_access(
+        request,
+        ("location", location_id),
+        lambda: Assets.objects.visible_to(request.user)
+        .filter(root_location_id=location_id)
+        .exists(),
+    )
 
-    # Check access
-    visible = Owner.objects.manage_to(request.user)
 
-    # Check if there is an intersection between owner and visible
-    if not owner.intersection(visible).exists():
-        perms = False
+def can_view_owners(request) -> bool:
+    """Check if the request user can see any owner."""
+    return _cached_access(
+        request,
+        ("owners",),
+        lambda: Owner.objects.visible_to(request.user).exists(),
+    )
 
-    return perms
 
+def can_manage_owners(request) -> bool:
+    """Check if the request user can manage any owner."""
+    return _cached_access(
+        request,
+        ("manage_owners",),
+        lambda: Owner.objects.manage_to(request.user).exists(),
+    )
 
-def get_asset(request, location_id: int) -> tuple[bool, Assets]:
-    """Get the Assets object for the request user."""
-    perms = True
 
-    asset = Assets.objects.filter(location_id=location_id)
+def get_manage_permission(request) -> bool:
+    """Get Permission for Corporation"""
+    return can_manage_owners(request)
 
-    visible = Assets.objects.visible_to(request.user)
-    if not asset.intersection(visible).exists():
-        perms = False
+
+def get_asset(request, location_id: int) -> tuple[bool, Assets]:
+    """Get the visible Assets object at the location for the request user."""
+    perms = can_view_location(request, location_id)
+    asset = Assets.objects.visible_to(request.user).filter(root_location_id=location_id)
     return perms, asset
 
 
 def get_owner(request) -> tuple[bool, Owner | None]:
-    """Get the owner object for the request user."""
-    perms = True
-
-    try:
-        owner = Owner.objects.all()
-    except Owner.DoesNotExist:
-        return None, None
-
-    visible = Owner.objects.visible_to(request.user)
-    if not owner.intersection(visible).exists():
-        perms = False
+    """Get the visible owner object for the request user."""
+    perms = can_view_owners(request)
+    owner = Owner.objects.visible_to(request.user)
     return perms, owner
@@ -36,6 +36,9 @@ class Assets(Schema):
     location_id: int
     location_flag: str
     assets: list
+    draw: int = 0
+    recordsTotal: int = 0
+    recordsFiltered: int = 0
 
 
 class Requests(Schema):
@@ -48,3 +51,37 @@ class Requests(Schema):
     approver: Any | None
     requestor: Any
     actions: Any
+
+
+class Snapshot(Schema):
+    id: int
+    created_at: datetime
+    delta_count: int
+
+
+class SnapshotChange(Schema):
+    item_id: int
+    action: str
+    name: str | None = None
+    before: dict | None = None
+    after: dict | None = None
+
+
+class AssetEvent(Schema):
+    id: int
+    sequence: int
+    owner_id: int
+    item_id: int
+    event: str
+    type_id: int
+    location_id: int
+    location_flag: str
+    quantity: int
+    previous_location_id: int | None = None
+    previous_quantity: int | None = None
+    created_at: datetime
+
+
+class AssetEvents(Schema):
+    events: list[AssetEvent]
+    cursor: int
@@ -0,0 +1,5 @@
+from .snapshots import SnapshotsApiEndpoints
+
+
+def setup(api):
+    SnapshotsApiEndpoints(api)
@@ -0,0 +1,84 @@
+# Third Party
+from ninja import NinjaAPI
+
+# Alliance Auth (External Libs)
+from eve_sde.models.types import ItemType
+
+# AA Assets
+from assets.api import schema
+from assets.api.helpers import get_owner
+from assets.hooks import get_extension_logger
+from assets.models import AssetSnapshot
+
+logger = get_extension_logger(__name__)
+
+
+class SnapshotsApiEndpoints:
+    tags = ["Snapshots"]
+
+    def __init__(self, api: NinjaAPI):
+        @api.get(
+            "owner/{owner_id}/snapshots/",
+            response={200: list[schema.Snapshot], 403: str},
+            tags=self.tags,
+        )
+        def get_snapshots(request, owner_id: int):
+            perm, owners = get_owner(request)
+            owner = owners.filter(pk=owner_id).first()
+            if not perm or owner is None:
+                return 403, "Permission Denied"
+
+            return AssetSnapshot.objects.filter(owner=owner).order_by("-pk")
+
+        @api.get(
+            "owner/{owner_id}/snapshots/diff/",
+            response={200: list[schema.SnapshotChange], 403: str, 404: str},
+            tags=self.tags,
+        )
+        def get_snapshot_diff(request, owner_id: int, from_id: int, to_id: int):
+            """
+            Return the assets changed between two snapshots of an owner.
+            """
+            perm, owners = get_owner(request)
+            owner = owners.filter(pk=owner_id).first()
+            if not perm or owner is None:
+                return 403, "Permission Denied"
+
+            snapshots = AssetSnapshot.objects.filter(
+                owner=owner, pk__in=[from_id, to_id]
+            )
+            if snapshots.count() != len({from_id, to_id}):
+                return 404, "Snapshot not found"
+
+            changes = AssetSnapshot.objects.diff(owner, from_id, to_id)
+            type_ids = {
+                state["eve_type_id"]
+                for change in changes.values()
+                for state in change.values()
+                if state
+            }
+            eve_types = ItemType.objects.in_bulk(type_ids)
+
+            output = []
+            for item_id, change in changes.items():
+                before, after = change["before"], change["after"]
+                if before is None:
+                    action = "created"
+                elif after is None:
+                    action = "deleted"
+                else:
+                    action = "updated"
+                output.append(
+                    {
+                        "item_id": item_id,
+                        "action": action,
+                        "name": getattr(
+                            eve_types.get((after or before)["eve_type_id"]),
+                            "name",
+                            None,
+                        ),
+                        "before": before,
+                        "after": after,
+                    }
+                )
+            return output
@@ -25,3 +25,18 @@ ASSETS_UPDATE_PERIOD = getattr(settings, "ASSETS_UPDATE_PERIOD", 60)  # in minut
 ASSETS_CACHE_KEY = getattr(settings, "ASSETS_CACHE_KEY", "ASSETS")
 
 ASSETS_BULK_BATCH_SIZE = getattr(settings, "ASSETS_BULK_BATCH_SIZE", 500)
+
+# Number of locations resolved by one location update task
+ASSETS_LOCATION_BATCH_SIZE = getattr(settings, "ASSETS_LOCATION_BATCH_SIZE", 1000)
+
+# Number of ESI pages fetched at the same time for paginated asset endpoints
+ASSETS_ESI_MAX_WORKERS = getattr(settings, "ASSETS_ESI_MAX_WORKERS", 5)
+
+# Number of owner asset updates that run at the same time on a worker
+ASSETS_UPDATE_MAX_CONCURRENT = getattr(settings, "ASSETS_UPDATE_MAX_CONCURRENT", 5)
+
+# Number of asset snapshots kept per owner
+ASSETS_SNAPSHOT_HISTORY = getattr(settings, "ASSETS_SNAPSHOT_HISTORY", 30)
+
+# Days asset events are kept for downstream consumers
+ASSETS_EVENT_RETENTION_DAYS = getattr(settings, "ASSETS_EVENT_RETENTION_DAYS", 7)
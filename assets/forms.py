@@ -7,6 +7,7 @@ from django.utils.translation import gettext_lazy as _
 
 # AA Assets
 from assets.api.assets.helper import update_asset_object
+from assets.api.helpers import can_view_location
 from assets.constants import STANDARD_FLAG
 from assets.models import Assets
 
@@ -33,9 +34,16 @@ class RequestOrder(forms.Form):
 class RequestMultiOrder(forms.Form):
     """Form for Multi-Ordering."""
 
-    def __init__(self, *args, location_flag=None, location_id=None, **kwargs):
+    def __init__(
+        self, *args, location_flag=None, location_id=None, request=None, **kwargs
+    ):
         super().__init__(*args, **kwargs)
         self.asset_fields = []  # Liste der dynamisch hinzugefügten Felder
+        assets = Assets.objects.all()
+        if request is not None:
+            if location_id is not None and not can_view_location(request, location_id):
+                location_id = None
+            assets = Assets.objects.visible_to(request.user)
         if location_id is not None:
             # Wenn location_flag nicht angegeben ist, Standardwert verwenden
             if location_flag == "all":
@@ -44,9 +52,14 @@ class RequestMultiOrder(forms.Form):
                 location_flag = [location_flag]
 
             # Dynamisch Felder für jedes Asset mit der gegebenen location_id hinzufügen
-            for asset in Assets.objects.filter(
-                location_flag__in=location_flag, location_id=location_id
-            ).order_by("eve_type__name"):
+            for asset in (
+                assets.filter(
+                    location_flag__in=location_flag, root_location_id=location_id
+                )
+                .select_related("eve_type")
+                .annotate_reserved_quantity()
+                .order_by("eve_type__name")
+            ):
                 asset = update_asset_object(asset)
                 if asset is False:
                     continue
@@ -0,0 +1,91 @@
+"""Cache maintenance helpers"""
+
+# Standard Library
+from collections.abc import Callable
+
+# Django
+from django.core.cache import cache
+from django.utils.text import slugify
+
+# AA Assets
+from assets import __app_name_useragent__
+from assets.app_settings import ASSETS_CACHE_KEY, STORAGE_BASE_KEY
+from assets.hooks import get_extension_logger
+
+logger = get_extension_logger(__name__)
+
+# Key patterns of the cache namespaces used by this app
+CACHE_NAMESPACES = {
+    "etags": (f"{slugify(__app_name_useragent__)}_etag_*",),
+    "no_permission": (f"{ASSETS_CACHE_KEY}-structure_access-*",),
+    "prices": (f"{STORAGE_BASE_KEY}*",),
+    # Update slots and locks of running tasks are not cleared,
+    # it would exceed the limit or run the same update twice
+    "cooldowns": ("cooldown_request_*",),
+}
+
+# Number of keys fetched per SCAN call and deleted per pipeline
+CACHE_SCAN_BATCH_SIZE = 1000
+# Number of keys per UNLINK command in a pipeline
+CACHE_UNLINK_CHUNK_SIZE = 100
+
+
+def get_redis_client():
+    """Return the Redis client of the default cache."""
+    try:
+        # Third Party
+        # pylint: disable=import-outside-toplevel
+        from django_redis import get_redis_connection
+
+        return get_redis_connection("default")
+    except (NotImplementedError, ModuleNotFoundError):
+        # Django
+        # pylint: disable=import-outside-toplevel
+        from django.core.cache import caches
+
+        return caches["default"].get_master_client()
+
+
+def _unlink_keys(client, keys: list) -> int:
+    """Unlink keys with one pipeline of chunked UNLINK commands."""
+    pipeline = client.pipeline(transaction=False)
+    for i in range(0, len(keys), CACHE_UNLINK_CHUNK_SIZE):
+        pipeline.unlink(*keys[i : i + CACHE_UNLINK_CHUNK_SIZE])
+    return sum(pipeline.execute())
+
+
+def clear_cache_namespace(
+    namespace: str,
+    batch_size: int = CACHE_SCAN_BATCH_SIZE,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    """Delete all keys of a cache namespace.
+
+    Keys are found with cursor based SCAN and removed in batches with pipelined
+    UNLINK, Redis is never blocked by a single large KEYS or DELETE command.
+
+    Args:
+        namespace: One of `CACHE_NAMESPACES`.
+        batch_size: Number of keys fetched per SCAN call and deleted per batch.
+        progress: Called with the number of deleted keys after every batch.
+
+    Returns:
+        The number of deleted keys.
+    """
+    client = get_redis_client()
+    deleted = 0
+    batch = []
+    for pattern in CACHE_NAMESPACES[namespace]:
+        for key in client.scan_iter(match=cache.make_key(pattern), count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                deleted += _unlink_keys(client, batch)
+                batch = []
+                if progress is not None:
+                    progress(deleted)
+    if batch:
+        deleted += _unlink_keys(client, batch)
+        if progress is not None:
+            progress(deleted)
+    logger.info("Deleted %s %s keys", deleted, namespace)
+    return deleted
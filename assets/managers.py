@@ -1,6 +1,8 @@
 # Standard Library
 import datetime as dt
-from typing import TYPE_CHECKING, Any
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, NamedTuple
 
 # Third Party
 import requests
@@ -8,23 +10,38 @@ import requests
 # Django
 from django.contrib.auth.models import User
 from django.core.cache import cache
-from django.db import models
-from django.db.models import Case, F, Q, Value, When
-from django.db.models.functions import Concat
+from django.db import connections, models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Concat
 from django.utils.timezone import now
 
 # Alliance Auth
 from allianceauth.eveonline.models import EveCharacter
 
 # Alliance Auth (External Libs)
-from eve_sde.models.map import SolarSystem
+from eve_sde.models.map import NPCStation, SolarSystem
 from eve_sde.models.types import ItemType
 
 # AA Assets
 from assets import __version__, contexts
 from assets.app_settings import (
     ASSETS_BULK_BATCH_SIZE,
+    ASSETS_EVENT_RETENTION_DAYS,
     ASSETS_LOCATION_STALE_HOURS,
+    ASSETS_SNAPSHOT_HISTORY,
     STORAGE_BASE_KEY,
 )
 from assets.errors import ObjectNotFound
@@ -33,26 +50,129 @@ from assets.providers import esi
 
 if TYPE_CHECKING:
     # AA Assets
+    from assets.models import Assets as AssetsContext
     from assets.models import EveEntity as EveEntityContext
+    from assets.models import Owner as OwnerContext
 
 logger = get_extension_logger(__name__)
 
 USERAGENT = f"assets v{__version__}"
 EVE_TYPE_ID_SOLAR_SYSTEM = 5
 
+# Jita IV - Moon 4 - Caldari Navy Assembly Plant
+MARKET_PRICE_TRADEHUB = 60003760
+MARKET_PRICE_CHUNK_SIZE = 100
+MARKET_PRICE_MAX_WORKERS = 4
+
+
+def get_upsert_options(using: str, unique_fields: list[str], update_fields) -> dict:
+    """Return the `bulk_create` options to upsert on the given unique fields.
+
+    MySQL and MariaDB do not support a conflict target,
+    they upsert on any unique index of the table instead.
+    """
+    options = {"update_conflicts": True, "update_fields": update_fields}
+    if connections[using].features.supports_update_conflicts_with_target:
+        options["unique_fields"] = unique_fields
+    return options
+
 
 def build_market_price_cache_tag(item_id):
     return f"{STORAGE_BASE_KEY}{item_id}"
 
 
-def set_market_price_cache(item_id: int, price: float):
-    """Set location cache for a location object."""
-    return cache.set(build_market_price_cache_tag(item_id), price, (60 * 60 * 2))
+def set_market_prices_cache(prices: dict[int, float]):
+    """Set market prices for many items with one cache call."""
+    return cache.set_many(
+        {
+            build_market_price_cache_tag(item_id): price
+            for item_id, price in prices.items()
+        },
+        (60 * 60 * 2),
+    )
+
+
+def get_market_prices(item_ids) -> dict[int, float]:
+    """Get cached market prices for many items with one cache call."""
+    tags = {build_market_price_cache_tag(item_id): item_id for item_id in item_ids}
+    return {tags[tag]: price for tag, price in cache.get_many(tags).items()}
+
+
+def fetch_market_prices(
+    item_ids: list[int], hub_id: int = MARKET_PRICE_TRADEHUB
+) -> dict[int, float]:
+    """Fetch the max buy price of the given items at a hub from Fuzzwork."""
+    headers = {
+        "User-Agent": USERAGENT,
+        "Content-Type": "application/json",
+        "Accept-Encoding": "gzip",
+    }
+
+    def fetch(chunk: list[int]) -> dict[int, float]:
+        item_id_list = ",".join(str(item_id) for item_id in chunk)
+        url = f"https://market.fuzzwork.co.uk/aggregates/?station={hub_id}&types={item_id_list}"
+        try:
+            request_result = requests.get(url=url, headers=headers, timeout=30)
+            request_result.raise_for_status()
+            response_data = request_result.json()
+        except requests.RequestException as e:
+            logger.warning("Request failed: %s, using Cache Data", e)
+            return {}
+        return {
+            item_id: float(response_data[str(item_id)]["buy"]["max"])
+            for item_id in chunk
+            if str(item_id) in response_data
+        }
 
+    # Split item_ids into chunks and fetch them concurrently
+    chunks = [
+        item_ids[i : i + MARKET_PRICE_CHUNK_SIZE]
+        for i in range(0, len(item_ids), MARKET_PRICE_CHUNK_SIZE)
+    ]
+    prices = {}
+    if chunks:
+        with ThreadPoolExecutor(
+            max_workers=min(MARKET_PRICE_MAX_WORKERS, len(chunks))
+        ) as executor:
+            for result in executor.map(fetch, chunks):
+                prices.update(result)
+    return prices
+
+
+def build_asset_tree(
+    locations: dict[int, int],
+) -> dict[int, tuple[int | None, int, int]]:
+    """Resolve the container tree of assets in one pass.
+
+    Args:
+        locations: The location ID of every asset by its item ID.
+
+    Returns:
+        The parent item ID, root location ID and depth of every asset by its item ID.
+        Assets not located in another asset have no parent and a depth of zero.
+    """
+    tree = {}
+    for item_id in locations:
+        path = []
+        visited = set()
+        current = item_id
+        while current in locations and current not in tree and current not in visited:
+            visited.add(current)
+            path.append(current)
+            current = locations[current]
+
+        if current in tree:
+            root_id, depth = tree[current][1], tree[current][2] + 1
+        else:
+            # Top most asset of the path, a cycle ends at the first repeated item
+            root_id, depth = current, 0
 
-def get_market_price(item_id: int) -> float:
-    """Get location cache for a location object."""
-    return cache.get(build_market_price_cache_tag(item_id))
+        for path_item_id in reversed(path):
+            location_id = locations[path_item_id]
+            parent_id = location_id if location_id in locations else None
+            tree[path_item_id] = (parent_id, root_id, depth)
+            depth += 1
+    return tree
 
 
 class AssetsQuerySet(models.QuerySet):
@@ -69,7 +189,9 @@ class AssetsQuerySet(models.QuerySet):
         try:
             char = user.profile.main_character
             assert char
-            queries = [models.Q(owner__character__character_id=char.character_id)]
+            queries = [
+                models.Q(owner__character__character__character_id=char.character_id)
+            ]
             logger.debug(queries)
 
             logger.debug(
@@ -142,29 +264,10 @@ class AssetsQuerySet(models.QuerySet):
         )
 
     def annotate_location_name(self) -> models.QuerySet:
-        """Annotate calculated location name field
-        with parent locations up to 3 levels up.
-        """
+        """Annotate the resolved location name field."""
         return self.annotate(
             location_name=Case(
-                When(~Q(location__name=""), then=F("location__name")),
-                When(
-                    ~Q(location__parent=None) & ~Q(location__parent__name=""),
-                    then=F("location__parent__name"),
-                ),
-                When(
-                    ~Q(location__parent=None)
-                    & ~Q(location__parent__parent=None)
-                    & ~Q(location__parent__parent__name=""),
-                    then=F("location__parent__parent__name"),
-                ),
-                When(
-                    ~Q(location__parent=None)
-                    & ~Q(location__parent__parent=None)
-                    & ~Q(location__parent__parent__parent=None)
-                    & ~Q(location__parent__parent__parent__name=""),
-                    then=F("location__parent__parent__parent__name"),
-                ),
+                When(~Q(location__resolved_name=""), then=F("location__resolved_name")),
                 default=Concat(
                     Value("Location #"), "location__id", output_field=models.CharField()
                 ),
@@ -172,45 +275,161 @@ class AssetsQuerySet(models.QuerySet):
             )
         )
 
+    def annotate_reserved_quantity(self) -> models.QuerySet:
+        """Annotate the quantity reserved by open and recently completed requests."""
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import Request, RequestAssets
+
+        reserved = (
+            RequestAssets.objects.filter(asset_pk=OuterRef("pk"))
+            .filter(
+                Q(request__status=Request.STATUS_OPEN)
+                | Q(
+                    request__status=Request.STATUS_COMPLETED,
+                    request__closed_at__gte=now() - dt.timedelta(hours=2),
+                )
+            )
+            .values("asset_pk")
+            .annotate(total_quantity=Sum("quantity"))
+            .values("total_quantity")
+        )
+        return self.annotate(
+            reserved_quantity=Coalesce(
+                Subquery(reserved, output_field=models.PositiveIntegerField()), 0
+            )
+        )
+
+    def annotate_market_price(
+        self, hub_id: int = MARKET_PRICE_TRADEHUB
+    ) -> models.QuerySet:
+        """Annotate the current market price of the asset type at the given hub."""
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import MarketPrice
+
+        return self.annotate(
+            market_price=Subquery(
+                MarketPrice.objects.filter(
+                    eve_type_id=OuterRef("eve_type_id"), hub_id=hub_id
+                ).values("price")[:1]
+            )
+        )
+
     def update_or_create_prices(self, item_ids: list[int]) -> dict:
-        """Calculate prices for all assets of this owner."""
-        tradehub = 60003760
-        headers = {
-            "User-Agent": USERAGENT,
-            "Content-Type": "application/json",
-            "Accept-Encoding": "gzip",
-        }
-        data = {}
-
-        # Split item_ids into chunks
-        for i in range(0, len(item_ids), 100):
-            chunk = item_ids[i : i + 100]
-            item_id_list = ",".join(str(item_id) for item_id in chunk)
-            url = f"https://market.fuzzwork.co.uk/aggregates/?station={tradehub}&types={item_id_list}"
-
-            try:
-                request_result = requests.get(url=url, headers=headers)
-                request_result.raise_for_status()
-                response_data = request_result.json()
-                # Update cache with new data
-                for item_id in chunk:
-                    if str(item_id) in response_data:
-                        set_market_price_cache(
-                            item_id, response_data[str(item_id)]["buy"]["max"]
-                        )
-            except requests.RequestException as e:
-                logger.warning("Request failed: %s, using Cache Data", e)
-        data = {item_id: get_market_price(item_id) for item_id in item_ids}
+        """Fetch market prices from Fuzzwork and save them in the database and cache."""
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import MarketPrice
+
+        prices = MarketPrice.objects.update_or_create_fuzzwork(item_ids)
+        if prices:
+            set_market_prices_cache(prices)
+        return prices
+
+    def get_prices(self, item_ids) -> dict[int, float]:
+        """Return market prices for the given items.
+
+        Prices are read from cache with one call, then from the market price table.
+        Only prices that are missing in both are fetched from Fuzzwork.
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import MarketPrice
+
+        prices = get_market_prices(item_ids)
+        missing = [item_id for item_id in item_ids if item_id not in prices]
+        if missing:
+            stored = MarketPrice.objects.get_prices(missing)
+            if stored:
+                set_market_prices_cache(stored)
+                prices.update(stored)
+            missing = [item_id for item_id in missing if item_id not in stored]
+        if missing:
+            prices.update(self.update_or_create_prices(missing))
+        return prices
+
+
+# Asset fields tracked by snapshots and events, price changes alone are not tracked
+ASSETS_TRACKED_FIELDS = (
+    "eve_type_id",
+    "location_id",
+    "location_flag",
+    "quantity",
+    "root_location_id",
+)
 
-        # Return the buy max prices
+
+def get_asset_state(asset: "AssetsContext") -> dict:
+    """Return the tracked fields of an asset."""
+    return {field: getattr(asset, field) for field in ASSETS_TRACKED_FIELDS}
+
+
+class AssetsDiff(NamedTuple):
+    """Result of a differential asset sync."""
+
+    created: list["AssetsContext"]
+    updated: list[tuple["AssetsContext", "AssetsContext"]]
+    deleted: list["AssetsContext"]
+
+    def __bool__(self) -> bool:
+        return bool(self.created or self.updated or self.deleted)
+
+    @property
+    def locations(self) -> set[tuple[int, str]]:
+        """Root locations and flags of all assets before and after the sync."""
+        assets = self.created + self.deleted
+        for previous, asset in self.updated:
+            assets += [previous, asset]
         return {
-            item_id: data[item_id] for item_id in item_ids if data[item_id] is not None
+            (asset.root_location_id, asset.location_flag)
+            for asset in assets
+            if asset.root_location_id is not None
         }
 
+    @property
+    def changed(self) -> list[tuple["AssetsContext", "AssetsContext"]]:
+        """Updated assets with a change of any tracked field."""
+        return [
+            (previous, asset)
+            for previous, asset in self.updated
+            if get_asset_state(previous) != get_asset_state(asset)
+        ]
+
+
+class AssetsPublished(NamedTuple):
+    """Result of publishing the staged assets of an owner."""
+
+    created: int
+    updated: int
+    deleted: int
+    # Root locations and flags of all changed assets
+    locations: set[tuple[int, str]]
+
+    def __bool__(self) -> bool:
+        return bool(self.created or self.updated or self.deleted)
+
 
 class AssetsManagerBase(models.Manager):
     """A manager for the Assets model."""
 
+    # Fields compared by a differential sync
+    SYNC_FIELDS = (
+        "eve_type",
+        "location",
+        "location_flag",
+        "location_type",
+        "quantity",
+        "singleton",
+        "blueprint_copy",
+        "parent_item_id",
+        "root_location",
+        "depth",
+    )
+    # Fields staged and written by a differential sync,
+    # prices of unchanged assets are updated by `update_prices`
+    STAGED_FIELDS = SYNC_FIELDS + ("price",)
+
     def get_queryset(self):
         return AssetsQuerySet(self.model, using=self._db)
 
@@ -220,10 +439,706 @@ class AssetsManagerBase(models.Manager):
     def manage_to(self, user: User):
         return self.get_queryset().manage_to(user)
 
+    def _assets_from_rows(
+        self, owner: "OwnerContext", rows, attnames: list[str]
+    ) -> list["AssetsContext"]:
+        """Build unsaved assets from `values_list` rows of (pk, item_id, *attnames)."""
+        assets = []
+        for row in rows:
+            asset = self.model(pk=row[0], item_id=row[1], owner=owner)
+            for attname, value in zip(attnames, row[2:]):
+                setattr(asset, attname, value)
+            assets.append(asset)
+        return assets
+
+    def diff_owner_assets(
+        self, owner: "OwnerContext", items: list["AssetsContext"]
+    ) -> AssetsDiff:
+        """Compare fetched assets of an owner against the stored ones.
+
+        Assets are matched on their EVE item ID. Changed assets get the primary key
+        of the stored row so they can be updated in place.
+        Only the given items are compared, deleted assets are not detected.
+        """
+        attnames = [self.model._meta.get_field(f).attname for f in self.SYNC_FIELDS]
+        fetched = {item.item_id: item for item in items}
+        stored_rows = self.filter(owner=owner, item_id__in=fetched).values_list(
+            "pk", "item_id", *attnames
+        )
+        stored = {
+            asset.item_id: asset
+            for asset in self._assets_from_rows(owner, stored_rows, attnames)
+        }
+
+        created = []
+        updated = []
+        for item_id, item in fetched.items():
+            previous = stored.get(item_id)
+            if previous is None:
+                created.append(item)
+                continue
+            if any(
+                getattr(previous, attname) != getattr(item, attname)
+                for attname in attnames
+            ):
+                item.pk = previous.pk
+                updated.append((previous, item))
+
+        return AssetsDiff(created=created, updated=updated, deleted=[])
+
+    def stage_owner_assets(
+        self, owner: "OwnerContext", items: list["AssetsContext"]
+    ) -> None:
+        """Write a batch of fetched assets to the staging table."""
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import AssetsStaging
+
+        attnames = [self.model._meta.get_field(f).attname for f in self.STAGED_FIELDS]
+        AssetsStaging.objects.bulk_create(
+            [
+                AssetsStaging(
+                    owner=owner,
+                    item_id=item.item_id,
+                    **{attname: getattr(item, attname) for attname in attnames},
+                )
+                for item in items
+            ],
+            batch_size=ASSETS_BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    def update_staged_tree(self, owner: "OwnerContext") -> int:
+        """Resolve the container tree over all staged assets of an owner.
+
+        Assets are processed page by page, containers on other pages are only known
+        once all pages are staged. The staged assets are resolved in batches
+        ordered by item ID, with the containers of each batch loaded level by level.
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import AssetsStaging
+
+        staged = AssetsStaging.objects.filter(owner=owner)
+        count = 0
+        last_item_id = -1
+        while True:
+            rows = list(
+                staged.filter(item_id__gt=last_item_id)
+                .order_by("item_id")
+                .values_list(
+                    "pk",
+                    "item_id",
+                    "location_id",
+                    "parent_item_id",
+                    "root_location_id",
+                    "depth",
+                )[:ASSETS_BULK_BATCH_SIZE]
+            )
+            if not rows:
+                break
+            last_item_id = rows[-1][1]
+
+            # Locations of the batch and of all containers above it
+            locations = {row[1]: row[2] for row in rows}
+            checked = set(locations)
+            pending = set(locations.values()) - checked
+            while pending:
+                checked |= pending
+                containers = dict(
+                    staged.filter(item_id__in=pending).values_list(
+                        "item_id", "location_id"
+                    )
+                )
+                locations.update(containers)
+                pending = set(containers.values()) - checked
+            tree = build_asset_tree(locations)
+
+            changed = [
+                AssetsStaging(
+                    pk=row[0],
+                    parent_item_id=tree[row[1]][0],
+                    root_location_id=tree[row[1]][1],
+                    depth=tree[row[1]][2],
+                )
+                for row in rows
+                if row[3:] != tree[row[1]]
+            ]
+            AssetsStaging.objects.bulk_update(
+                changed,
+                ["parent_item_id", "root_location", "depth"],
+                batch_size=ASSETS_BULK_BATCH_SIZE,
+            )
+            count += len(changed)
+        return count
+
+    def _publish_staged_chunks(
+        self, owner: "OwnerContext", attnames: list[str]
+    ) -> Iterator[AssetsDiff]:
+        """Write the staged assets of an owner in batches and yield their changes.
+
+        Staged assets are upserted in batches ordered by item ID,
+        afterwards the stored assets that are not staged are deleted in batches.
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import AssetsStaging
+
+        staged = AssetsStaging.objects.filter(owner=owner)
+        last_item_id = -1
+        while True:
+            rows = list(
+                staged.filter(item_id__gt=last_item_id)
+                .order_by("item_id")
+                .values_list("pk", "item_id", *attnames)[:ASSETS_BULK_BATCH_SIZE]
+            )
+            if not rows:
+                break
+            last_item_id = rows[-1][1]
+
+            chunk = self.diff_owner_assets(
+                owner, self._assets_from_rows(owner, rows, attnames)
+            )
+            for item in chunk.created:
+                # Primary key of the staging row
+                item.pk = None
+            # Upsert on the unique (owner, item_id) index
+            self.bulk_create(
+                chunk.created + [item for _, item in chunk.updated],
+                **get_upsert_options(self.db, ["owner", "item_id"], self.STAGED_FIELDS),
+            )
+            yield chunk
+
+        last_pk = 0
+        while True:
+            rows = list(
+                self.filter(owner=owner, pk__gt=last_pk)
+                .exclude(item_id__in=staged.values("item_id"))
+                .order_by("pk")
+                .values_list("pk", "item_id", *attnames)[:ASSETS_BULK_BATCH_SIZE]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            self.filter(pk__in=[row[0] for row in rows]).delete()
+            yield AssetsDiff(
+                created=[],
+                updated=[],
+                deleted=self._assets_from_rows(owner, rows, attnames),
+            )
+
+    def publish_staged_assets(
+        self,
+        owner: "OwnerContext",
+        on_publish: Callable[[AssetsDiff], Any] | None = None,
+    ) -> AssetsPublished:
+        """Apply the difference between staged and stored assets of an owner.
+
+        The staged assets are processed in batches ordered by item ID,
+        unchanged assets are left untouched and keep their primary key.
+        Only one batch of changes is held in memory at a time, `on_publish`
+        is called with the changes of every batch within the same transaction.
+        The staging table is emptied afterwards.
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import AssetsStaging
+
+        attnames = [self.model._meta.get_field(f).attname for f in self.STAGED_FIELDS]
+        created = updated = deleted = 0
+        locations = set()
+
+        with transaction.atomic():
+            for chunk in self._publish_staged_chunks(owner, attnames):
+                if on_publish is not None:
+                    on_publish(chunk)
+                created += len(chunk.created)
+                updated += len(chunk.updated)
+                deleted += len(chunk.deleted)
+                locations |= chunk.locations
+
+            AssetsStaging.objects.filter(owner=owner).delete()
+
+        logger.debug(
+            "Synced assets for %s: %s created, %s updated, %s deleted",
+            owner,
+            created,
+            updated,
+            deleted,
+        )
+        return AssetsPublished(created, updated, deleted, locations)
+
+    def sync_owner_assets(
+        self, owner: "OwnerContext", items: list["AssetsContext"]
+    ) -> AssetsDiff:
+        """Apply only the difference between a complete list of fetched assets
+        and the stored assets of an owner.
+
+        The changes of all batches are collected, `publish_staged_assets`
+        handles them batch by batch instead.
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import AssetsStaging
+
+        AssetsStaging.objects.filter(owner=owner).delete()
+        self.stage_owner_assets(owner, items)
+        diff = AssetsDiff(created=[], updated=[], deleted=[])
+
+        def collect(chunk: AssetsDiff):
+            diff.created.extend(chunk.created)
+            diff.updated.extend(chunk.updated)
+            diff.deleted.extend(chunk.deleted)
+
+        self.publish_staged_assets(owner, on_publish=collect)
+        return diff
+
+    def update_prices(
+        self, owner: "OwnerContext" = None, hub_id: int = MARKET_PRICE_TRADEHUB
+    ) -> int:
+        """Write the stored market price to all assets with a different price.
+
+        Prices are not compared by a differential sync, a price change alone does
+        not count as a change of the asset.
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import MarketPrice
+
+        prices = MarketPrice.objects.filter(
+            eve_type_id=OuterRef("eve_type_id"), hub_id=hub_id
+        )
+        assets = self.all() if owner is None else self.filter(owner=owner)
+        updated = assets.filter(
+            (Q(price__isnull=True) & Exists(prices))
+            | Exists(prices.exclude(price=OuterRef("price")))
+        )
+        count = updated.update(price=Subquery(prices.values("price")[:1]))
+        logger.debug("Updated the price of %s assets", count)
+        return count
+
 
 AssetsManager = AssetsManagerBase.from_queryset(AssetsQuerySet)
 
 
+class MarketPriceManager(models.Manager):
+    def get_prices(
+        self, item_ids, hub_id: int = MARKET_PRICE_TRADEHUB
+    ) -> dict[int, float]:
+        """Return the stored market prices for the given items."""
+        return dict(
+            self.filter(eve_type_id__in=item_ids, hub_id=hub_id).values_list(
+                "eve_type_id", "price"
+            )
+        )
+
+    def update_or_create_fuzzwork(
+        self, item_ids: list[int], hub_id: int = MARKET_PRICE_TRADEHUB
+    ) -> dict[int, float]:
+        """Fetch market prices from Fuzzwork and save them in bulk."""
+        prices = fetch_market_prices(item_ids, hub_id=hub_id)
+        updated_at = now()
+        self.bulk_create(
+            [
+                self.model(
+                    eve_type_id=item_id,
+                    hub_id=hub_id,
+                    price=price,
+                    updated_at=updated_at,
+                )
+                for item_id, price in prices.items()
+            ],
+            batch_size=ASSETS_BULK_BATCH_SIZE,
+            **get_upsert_options(
+                self.db, ["eve_type", "hub_id"], ["price", "updated_at"]
+            ),
+        )
+        return prices
+
+
+class AssetLocationSummaryManager(models.Manager):
+    def refresh_owner(
+        self, owner: "OwnerContext", locations: set[tuple[int, str]] | None = None
+    ) -> int:
+        """Recalculate the location summaries of an owner from its assets.
+
+        With `locations` only the summaries of the given root locations and flags
+        are recalculated, e.g. the `AssetsDiff.locations` of a sync.
+        Values use the stored market price and fall back to the asset price.
+        Summaries of locations the owner no longer has assets in are removed.
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import Assets
+
+        assets = Assets.objects.filter(owner=owner, root_location__isnull=False)
+        stored = self.filter(owner=owner)
+        if locations is not None:
+            if not locations:
+                return 0
+            # Covers all given pairs, other pairs in it are recalculated as well
+            location_ids = {location_id for location_id, _ in locations}
+            flags = {flag for _, flag in locations}
+            assets = assets.filter(
+                root_location_id__in=location_ids, location_flag__in=flags
+            )
+            stored = stored.filter(
+                location_id__in=location_ids, location_flag__in=flags
+            )
+
+        rows = (
+            assets.annotate_market_price()
+            .values("root_location_id", "location_flag")
+            .annotate(
+                item_count=Count("pk"),
+                total_quantity=Sum("quantity"),
+                total_value=Coalesce(
+                    Sum(
+                        ExpressionWrapper(
+                            Coalesce("market_price", "price") * F("quantity"),
+                            output_field=FloatField(),
+                        )
+                    ),
+                    0.0,
+                ),
+            )
+            .order_by()
+        )
+        updated_at = now()
+        summaries = [
+            self.model(
+                owner=owner,
+                location_id=row["root_location_id"],
+                location_flag=row["location_flag"],
+                item_count=row["item_count"],
+                total_quantity=row["total_quantity"],
+                total_value=row["total_value"],
+                updated_at=updated_at,
+            )
+            for row in rows
+        ]
+        with transaction.atomic():
+            self.bulk_create(
+                summaries,
+                batch_size=ASSETS_BULK_BATCH_SIZE,
+                **get_upsert_options(
+                    self.db,
+                    ["owner", "location", "location_flag"],
+                    ["item_count", "total_quantity", "total_value", "updated_at"],
+                ),
+            )
+            stored.filter(updated_at__lt=updated_at).delete()
+        logger.debug("Refreshed %s location summaries for %s", len(summaries), owner)
+        return len(summaries)
+
+
+def get_search_tokens(name: str) -> set[str]:
+    """Return the normalized name and every word suffix of it.
+
+    A prefix match on the tokens finds names starting with the query
+    or containing it at the start of any word.
+    """
+    words = name.lower().split()
+    return {" ".join(words[i:]) for i in range(len(words))}
+
+
+class AssetSearchIndexQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import Owner
+
+        return self.filter(owner__in=Owner.objects.visible_to(user))
+
+    def search(self, query: str) -> models.QuerySet:
+        """Filter entries by the start of the type name or of any word in it.
+
+        Types are looked up with a prefix match on the indexed search tokens.
+        Names starting with the query are ordered first.
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import AssetSearchToken
+
+        query = " ".join(query.lower().split())
+        if not query:
+            return self.none()
+        return (
+            self.filter(
+                eve_type_id__in=AssetSearchToken.objects.filter(
+                    token__startswith=query
+                ).values("eve_type_id")
+            )
+            .annotate(
+                rank=Case(
+                    When(name__startswith=query, then=Value(0)),
+                    default=Value(1),
+                    output_field=models.IntegerField(),
+                )
+            )
+            .order_by("rank", "name", "-quantity")
+        )
+
+
+class AssetSearchIndexManagerBase(models.Manager):
+    def refresh_owner(self, owner: "OwnerContext") -> int:
+        """Recalculate the search index of an owner from its assets.
+
+        Entries of types the owner no longer has at a location are removed.
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import Assets, AssetSearchToken
+
+        rows = (
+            Assets.objects.filter(owner=owner, root_location__isnull=False)
+            .values_list("root_location_id", "eve_type_id", "eve_type__name")
+            .annotate(total_quantity=Sum("quantity"))
+            .order_by()
+        )
+        updated_at = now()
+        entries = [
+            self.model(
+                owner=owner,
+                location_id=location_id,
+                eve_type_id=eve_type_id,
+                name=" ".join(name.lower().split()),
+                quantity=quantity,
+                updated_at=updated_at,
+            )
+            for location_id, eve_type_id, name, quantity in rows
+        ]
+        with transaction.atomic():
+            self.bulk_create(
+                entries,
+                batch_size=ASSETS_BULK_BATCH_SIZE,
+                **get_upsert_options(
+                    self.db,
+                    ["owner", "location", "eve_type"],
+                    ["name", "quantity", "updated_at"],
+                ),
+            )
+            self.filter(owner=owner, updated_at__lt=updated_at).delete()
+            AssetSearchToken.objects.create_missing(
+                {entry.eve_type_id: entry.name for entry in entries}
+            )
+        logger.debug("Refreshed %s search index entries for %s", len(entries), owner)
+        return len(entries)
+
+
+AssetSearchIndexManager = AssetSearchIndexManagerBase.from_queryset(
+    AssetSearchIndexQuerySet
+)
+
+
+class AssetSearchTokenManager(models.Manager):
+    def create_missing(self, names: dict[int, str]) -> int:
+        """Create the search tokens of item types that have none yet.
+
+        :param names: Normalized type names mapped by type ID
+        """
+        existing = set(
+            self.filter(eve_type_id__in=names)
+            .values_list("eve_type_id", flat=True)
+            .distinct()
+        )
+        tokens = [
+            self.model(eve_type_id=eve_type_id, token=token)
+            for eve_type_id, name in names.items()
+            if eve_type_id not in existing
+            for token in get_search_tokens(name)
+        ]
+        self.bulk_create(
+            tokens, batch_size=ASSETS_BULK_BATCH_SIZE, ignore_conflicts=True
+        )
+        return len(tokens)
+
+
+class AssetSnapshotManager(models.Manager):
+    def create_from_diff(self, owner: "OwnerContext", diff: AssetsDiff, snapshot=None):
+        """Store the tracked changes of an asset sync as a new snapshot of an owner.
+
+        Only changed assets are stored, no snapshot is created when no tracked
+        field changed. Snapshots beyond `ASSETS_SNAPSHOT_HISTORY` are removed.
+        A sync published in batches passes the returned snapshot on to the next
+        batch, so all its changes are added to the same snapshot.
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import AssetSnapshotDelta
+
+        deltas = [
+            AssetSnapshotDelta(
+                item_id=asset.item_id,
+                action=AssetSnapshotDelta.Action.CREATED,
+                after=get_asset_state(asset),
+            )
+            for asset in diff.created
+        ]
+        deltas.extend(
+            AssetSnapshotDelta(
+                item_id=asset.item_id,
+                action=AssetSnapshotDelta.Action.UPDATED,
+                before=get_asset_state(previous),
+                after=get_asset_state(asset),
+            )
+            for previous, asset in diff.changed
+        )
+        deltas.extend(
+            AssetSnapshotDelta(
+                item_id=asset.item_id,
+                action=AssetSnapshotDelta.Action.DELETED,
+                before=get_asset_state(asset),
+            )
+            for asset in diff.deleted
+        )
+        if not deltas:
+            return snapshot
+
+        with transaction.atomic():
+            if snapshot is None:
+                snapshot = self.create(owner=owner, delta_count=0)
+                expired = self.filter(owner=owner).order_by("-pk")[
+                    ASSETS_SNAPSHOT_HISTORY:
+                ]
+                self.filter(pk__in=list(expired.values_list("pk", flat=True))).delete()
+            for delta in deltas:
+                delta.snapshot = snapshot
+            AssetSnapshotDelta.objects.bulk_create(
+                deltas, batch_size=ASSETS_BULK_BATCH_SIZE
+            )
+            snapshot.delta_count += len(deltas)
+            snapshot.save(update_fields=["delta_count"])
+        logger.debug("Stored %s deltas in snapshot for %s", len(deltas), owner)
+        return snapshot
+
+    def diff(self, owner: "OwnerContext", from_pk: int, to_pk: int) -> dict:
+        """Return the changed assets of an owner between two of its snapshots.
+
+        The deltas of all snapshots after `from_pk` up to `to_pk` are combined,
+        assets that were changed back or created and deleted again are left out.
+
+        :return: Item ID mapped to the asset state before and after
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import AssetSnapshotDelta
+
+        rows = (
+            AssetSnapshotDelta.objects.filter(
+                snapshot__owner=owner,
+                snapshot_id__gt=min(from_pk, to_pk),
+                snapshot_id__lte=max(from_pk, to_pk),
+            )
+            .order_by("snapshot_id", "pk")
+            .values_list("item_id", "before", "after")
+        )
+        changes = {}
+        for item_id, before, after in rows.iterator():
+            if item_id in changes:
+                changes[item_id] = (changes[item_id][0], after)
+            else:
+                changes[item_id] = (before, after)
+        if from_pk > to_pk:
+            changes = {
+                item_id: (after, before) for item_id, (before, after) in changes.items()
+            }
+        return {
+            item_id: {"before": before, "after": after}
+            for item_id, (before, after) in changes.items()
+            if before != after
+        }
+
+
+class AssetEventManager(models.Manager):
+    def emit(self, owner: "OwnerContext", diff: AssetsDiff) -> int:
+        """Write the added, changed and removed assets of a sync to the outbox.
+
+        Events older than `ASSETS_EVENT_RETENTION_DAYS` are removed.
+        """
+        events = [
+            self.model(
+                owner=owner,
+                item_id=asset.item_id,
+                event=self.model.Event.ADDED,
+                type_id=asset.eve_type_id,
+                location_id=asset.location_id,
+                location_flag=asset.location_flag,
+                quantity=asset.quantity,
+            )
+            for asset in diff.created
+        ]
+        events.extend(
+            self.model(
+                owner=owner,
+                item_id=asset.item_id,
+                event=self.model.Event.CHANGED,
+                type_id=asset.eve_type_id,
+                location_id=asset.location_id,
+                location_flag=asset.location_flag,
+                quantity=asset.quantity,
+                previous_location_id=previous.location_id,
+                previous_quantity=previous.quantity,
+            )
+            for previous, asset in diff.changed
+        )
+        events.extend(
+            self.model(
+                owner=owner,
+                item_id=asset.item_id,
+                event=self.model.Event.REMOVED,
+                type_id=asset.eve_type_id,
+                location_id=asset.location_id,
+                location_flag=asset.location_flag,
+                quantity=asset.quantity,
+            )
+            for asset in diff.deleted
+        )
+        self.bulk_create(events, batch_size=ASSETS_BULK_BATCH_SIZE)
+        self.filter(
+            owner=owner,
+            created_at__lt=now() - dt.timedelta(days=ASSETS_EVENT_RETENTION_DAYS),
+        ).delete()
+        logger.debug("Emitted %s asset events for %s", len(events), owner)
+        return len(events)
+
+    def assign_sequence(self) -> int:
+        """Number all committed events without a sequence number.
+
+        Event IDs are taken before their transaction commits, concurrent syncs can
+        commit lower IDs after higher ones. Sequence numbers are handed out under
+        a lock after the events are committed, so consumers reading by sequence
+        never skip events that commit later.
+        Must be called outside of the transaction that emitted the events.
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import AssetEventSequence
+
+        with transaction.atomic():
+            counter, _ = AssetEventSequence.objects.select_for_update().get_or_create(
+                pk=1
+            )
+            pks = list(
+                self.select_for_update()
+                .filter(sequence__isnull=True)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            self.bulk_update(
+                [
+                    self.model(pk=pk, sequence=counter.value + i)
+                    for i, pk in enumerate(pks, 1)
+                ],
+                ["sequence"],
+                batch_size=ASSETS_BULK_BATCH_SIZE,
+            )
+            counter.value += len(pks)
+            counter.save()
+        return len(pks)
+
+
 class LocationQuerySet(models.QuerySet):
     def visible_to(self, user):
         # superusers get all visible
@@ -293,29 +1208,10 @@ class LocationQuerySet(models.QuerySet):
             return self.none()
 
     def annotate_location_name(self) -> models.QuerySet:
-        """Annotate calculated location name field
-        with parent locations up to 3 levels up.
-        """
+        """Annotate the resolved location name field."""
         return self.annotate(
             location_name=Case(
-                When(~Q(name=""), then=F("name")),
-                When(
-                    ~Q(parent=None) & ~Q(parent__name=""),
-                    then=F("parent__name"),
-                ),
-                When(
-                    ~Q(parent=None)
-                    & ~Q(parent__parent=None)
-                    & ~Q(parent__parent__name=""),
-                    then=F("parent__parent__name"),
-                ),
-                When(
-                    ~Q(parent=None)
-                    & ~Q(parent__parent=None)
-                    & ~Q(parent__parent__parent=None)
-                    & ~Q(parent__parent__parent__name=""),
-                    then=F("parent__parent__parent__name"),
-                ),
+                When(~Q(resolved_name=""), then=F("resolved_name")),
                 default=Concat(
                     Value("Location #"), "id", output_field=models.CharField()
                 ),
@@ -324,30 +1220,11 @@ class LocationQuerySet(models.QuerySet):
         )
 
     def annotate_system_name(self) -> models.QuerySet:
-        """Annotate calculated system name field
-        with parent locations up to 3 levels up.
-        """
+        """Annotate the resolved solar system name field."""
         return self.annotate(
-            system_name=Case(
-                When(~Q(eve_solar_system=None), then=F("eve_solar_system__name")),
-                When(
-                    ~Q(parent=None) & ~Q(parent__eve_solar_system=None),
-                    then=F("parent__eve_solar_system__name"),
-                ),
-                When(
-                    ~Q(parent=None)
-                    & ~Q(parent__parent=None)
-                    & ~Q(parent__parent__eve_solar_system=None),
-                    then=F("parent__parent__eve_solar_system__name"),
-                ),
-                When(
-                    ~Q(parent=None)
-                    & ~Q(parent__parent=None)
-                    & ~Q(parent__parent__parent=None)
-                    & ~Q(parent__parent__parent__eve_solar_system=None),
-                    then=F("parent__parent__parent__eve_solar_system__name"),
-                ),
-                default=Value("N/A"),
+            system_name=Coalesce(
+                F("resolved_solar_system__name"),
+                Value("N/A"),
                 output_field=models.CharField(),
             )
         )
@@ -387,6 +1264,240 @@ class LocationManagerBase(models.Manager):
 
         return location, created
 
+    def bulk_get_or_create_esi(self, location_ids: set[int]) -> dict[int, Any]:
+        """Get or create location objects in bulk, mapped by location ID.
+
+        Existing locations are loaded with a single query. Missing solar systems
+        and stations are resolved from the SDE, missing structures and items are
+        created as stubs which get resolved later by the location tasks.
+        """
+        locations = self.in_bulk(location_ids)
+        missing_ids = set(location_ids) - set(locations)
+        if not missing_ids:
+            return locations
+
+        solar_systems = SolarSystem.objects.in_bulk(
+            [
+                location_id
+                for location_id in missing_ids
+                if self.model.is_solar_system_id(location_id)
+            ]
+        )
+        stations = self.build_sde_stations(
+            [
+                location_id
+                for location_id in missing_ids
+                if self.model.is_station_id(location_id)
+            ]
+        )
+
+        new_locations = []
+        for location_id in missing_ids:
+            if location_id in stations:
+                location = stations[location_id]
+                new_locations.append(location)
+                locations[location_id] = location
+                continue
+            if self.model.is_station_id(location_id):
+                # Stations missing in the SDE are fetched from ESI
+                locations[location_id], _ = self.update_or_create_esi(
+                    location_id=location_id
+                )
+                continue
+
+            # New locations have no parent, so they resolve to themselves
+            eve_solar_system = solar_systems.get(location_id)
+            if eve_solar_system:
+                location = self.model(
+                    id=location_id,
+                    name=eve_solar_system.name,
+                    eve_solar_system=eve_solar_system,
+                    eve_type_id=EVE_TYPE_ID_SOLAR_SYSTEM,
+                    resolved_name=eve_solar_system.name,
+                    resolved_solar_system=eve_solar_system,
+                )
+            else:
+                location = self.model(id=location_id)
+            new_locations.append(location)
+            locations[location_id] = location
+
+        self.bulk_create(
+            new_locations, batch_size=ASSETS_BULK_BATCH_SIZE, ignore_conflicts=True
+        )
+        logger.debug("Created %s new locations", len(new_locations))
+        return locations
+
+    def build_sde_stations(self, station_ids) -> dict[int, Any]:
+        """Build unsaved station locations from the SDE, mapped by location ID."""
+        return {
+            station.id: self.model(
+                id=station.id,
+                name=station.name,
+                eve_solar_system_id=station.solar_system_id,
+                eve_type_id=station.item_type_id,
+                resolved_name=station.name,
+                resolved_solar_system_id=station.solar_system_id,
+            )
+            for station in NPCStation.objects.filter(id__in=station_ids).exclude(
+                name=""
+            )
+        }
+
+    def load_sde_locations(self) -> int:
+        """Create or update all solar systems and NPC stations from the SDE."""
+        locations = [
+            self.model(
+                id=solar_system.id,
+                name=solar_system.name,
+                eve_solar_system_id=solar_system.id,
+                eve_type_id=EVE_TYPE_ID_SOLAR_SYSTEM,
+                resolved_name=solar_system.name,
+                resolved_solar_system_id=solar_system.id,
+            )
+            for solar_system in SolarSystem.objects.only("id", "name")
+        ]
+        locations += list(
+            self.build_sde_stations(
+                NPCStation.objects.exclude(name="").values("id")
+            ).values()
+        )
+        self.bulk_create(
+            locations,
+            batch_size=ASSETS_BULK_BATCH_SIZE,
+            **get_upsert_options(
+                self.db,
+                ["id"],
+                [
+                    "name",
+                    "eve_solar_system",
+                    "eve_type",
+                    "resolved_name",
+                    "resolved_solar_system",
+                ],
+            ),
+        )
+        logger.info("Loaded %s locations from the SDE", len(locations))
+        return len(locations)
+
+    def update_hierarchy(self, location_ids) -> int:
+        """Update the resolved name, solar system and root of locations.
+
+        All children of the given locations are updated as well,
+        the hierarchy is walked without a depth limit.
+        """
+        location_ids = set(location_ids)
+
+        # Collect all children of the locations
+        frontier = set(location_ids)
+        while frontier:
+            frontier = (
+                set(self.filter(parent_id__in=frontier).values_list("id", flat=True))
+                - location_ids
+            )
+            location_ids |= frontier
+
+        # Load the locations and all their parents
+        rows = {}
+        pending = set(location_ids)
+        while pending:
+            fetched = {
+                row[0]: row
+                for row in self.filter(id__in=pending).values_list(
+                    "id", "parent_id", "name", "eve_solar_system_id"
+                )
+            }
+            rows.update(fetched)
+            pending = {row[1] for row in fetched.values() if row[1] is not None} - set(
+                rows
+            )
+
+        locations = []
+        for location_id in location_ids & set(rows):
+            resolved_name = ""
+            resolved_solar_system_id = None
+            root_id = None
+            current_id = location_id
+            visited = set()
+            while current_id in rows and current_id not in visited:
+                visited.add(current_id)
+                _, parent_id, name, eve_solar_system_id = rows[current_id]
+                resolved_name = resolved_name or name
+                resolved_solar_system_id = (
+                    resolved_solar_system_id or eve_solar_system_id
+                )
+                if current_id != location_id:
+                    root_id = current_id
+                current_id = parent_id
+            locations.append(
+                self.model(
+                    id=location_id,
+                    resolved_name=resolved_name,
+                    resolved_solar_system_id=resolved_solar_system_id,
+                    root_id=root_id,
+                )
+            )
+
+        self.bulk_update(
+            locations,
+            ["resolved_name", "resolved_solar_system", "root"],
+            batch_size=ASSETS_BULK_BATCH_SIZE,
+        )
+        return len(locations)
+
+    def update_parents_from_assets(self, owner: "OwnerContext" = None) -> int:
+        """Link container locations to their parent from the stored assets.
+
+        A container is an asset whose item ID is used as location by other assets,
+        its parent is the location of the container asset itself.
+        Containers are processed in batches ordered by item ID.
+        """
+        # pylint: disable=import-outside-toplevel
+        # AA Assets
+        from assets.models import Assets
+
+        assets = Assets.objects.filter(Exists(self.filter(id=OuterRef("item_id"))))
+        if owner is not None:
+            assets = assets.filter(owner=owner)
+
+        count = 0
+        last_item_id = -1
+        while True:
+            items = {
+                item_id: (location_id, eve_type_id)
+                for item_id, location_id, eve_type_id in assets.filter(
+                    item_id__gt=last_item_id
+                )
+                .order_by("item_id")
+                .values_list("item_id", "location_id", "eve_type_id")[
+                    :ASSETS_BULK_BATCH_SIZE
+                ]
+            }
+            if not items:
+                break
+            last_item_id = max(items)
+
+            locations = [
+                self.model(
+                    id=location_id,
+                    parent_id=items[location_id][0],
+                    eve_type_id=items[location_id][1],
+                )
+                for location_id, parent_id, eve_type_id in self.filter(
+                    id__in=items
+                ).values_list("id", "parent_id", "eve_type_id")
+                if (parent_id, eve_type_id) != items[location_id]
+            ]
+            if locations:
+                self.bulk_update(
+                    locations,
+                    ["parent", "eve_type"],
+                    batch_size=ASSETS_BULK_BATCH_SIZE,
+                )
+                self.update_hierarchy([location.id for location in locations])
+            count += len(locations)
+        logger.debug("Updated %s parent locations", count)
+        return count
+
     def update_or_create_esi(self, location_id: int) -> tuple[Any, bool]:
         """Update or create location object with data fetched from ESI."""
         if self.model.is_solar_system_id(location_id):
@@ -400,6 +1511,17 @@ class LocationManagerBase(models.Manager):
                     "eve_type": eve_type,
                 },
             )
+        elif self.model.is_station_id(location_id) and (
+            station := self.build_sde_stations([location_id]).get(location_id)
+        ):
+            location, created = self.update_or_create(
+                id=location_id,
+                defaults={
+                    "name": station.name,
+                    "eve_solar_system_id": station.eve_solar_system_id,
+                    "eve_type_id": station.eve_type_id,
+                },
+            )
         elif self.model.is_station_id(location_id):
             logger.info("%s: Fetching station from ESI", location_id)
             station = esi.client.Universe.GetUniverseStationsStationId(
@@ -414,6 +1536,10 @@ class LocationManagerBase(models.Manager):
             # Create ID for structure
             location, created = self.get_or_create(id=location_id)
 
+        self.update_hierarchy([location.id])
+        location.refresh_from_db(
+            fields=["resolved_name", "resolved_solar_system", "root"]
+        )
         return location, created
 
     def _station_update_or_create_dict(
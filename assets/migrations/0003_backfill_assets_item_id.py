@@ -0,0 +1,43 @@
+# Generated by Django 5.2.13 on 2026-10-17 20:15
+
+# Django
+from django.db import migrations
+from django.db.models import Count, F, Max
+
+# Placeholder item IDs start far above any EVE ID, so they never match a location
+LEGACY_ITEM_ID_OFFSET = 9_000_000_000_000_000_000
+
+
+def on_migrate(apps, schema_editor):
+    """Make the item IDs of existing assets unique per owner.
+
+    Older versions stored the type ID as item ID, the real item ID is not
+    recoverable without ESI. These rows get a placeholder item ID outside of the
+    EVE ID range and are replaced with the real items on the next asset update.
+    """
+    Assets = apps.get_model("assets", "Assets")
+
+    Assets.objects.filter(item_id=F("eve_type_id")).update(
+        item_id=F("pk") + LEGACY_ITEM_ID_OFFSET
+    )
+
+    duplicates = (
+        Assets.objects.values("owner_id", "item_id")
+        .annotate(count=Count("pk"), keep=Max("pk"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        Assets.objects.filter(
+            owner_id=duplicate["owner_id"], item_id=duplicate["item_id"]
+        ).exclude(pk=duplicate["keep"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0002_alter_request_approver_user_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(on_migrate, migrations.RunPython.noop),
+    ]
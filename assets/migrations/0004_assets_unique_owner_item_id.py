@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:17
+
+# Django
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0003_backfill_assets_item_id"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="assets",
+            constraint=models.UniqueConstraint(
+                fields=("owner", "item_id"), name="assets_unique_owner_item_id"
+            ),
+        ),
+    ]
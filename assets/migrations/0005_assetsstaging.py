@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:20
+
+# Django
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0004_assets_unique_owner_item_id"),
+        ("eve_sde", "0018_blueprintactivity_blueprintactivityproduct_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssetsStaging",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("item_id", models.PositiveBigIntegerField()),
+                ("location_flag", models.CharField(max_length=36)),
+                ("location_type", models.CharField(max_length=100)),
+                ("quantity", models.PositiveIntegerField(default=1)),
+                ("singleton", models.BooleanField()),
+                ("blueprint_copy", models.BooleanField(default=None, null=True)),
+                ("price", models.FloatField(default=None, null=True)),
+                (
+                    "eve_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="eve_sde.itemtype",
+                    ),
+                ),
+                (
+                    "location",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="assets.location",
+                    ),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="assets.owner",
+                    ),
+                ),
+            ],
+            options={
+                "default_permissions": (),
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("owner", "item_id"),
+                        name="assets_staging_unique_owner_item_id",
+                    )
+                ],
+            },
+        ),
+    ]
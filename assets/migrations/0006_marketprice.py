@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:24
+
+# Django
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0005_assetsstaging"),
+        ("eve_sde", "0018_blueprintactivity_blueprintactivityproduct_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MarketPrice",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "hub_id",
+                    models.PositiveBigIntegerField(
+                        default=60003760, help_text="Station ID of the trade hub"
+                    ),
+                ),
+                ("price", models.FloatField(help_text="Max buy price")),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "eve_type",
+                    models.ForeignKey(
+                        help_text="item type",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="eve_sde.itemtype",
+                    ),
+                ),
+            ],
+            options={
+                "default_permissions": (),
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("eve_type", "hub_id"),
+                        name="marketprice_unique_type_hub",
+                    )
+                ],
+            },
+        ),
+    ]
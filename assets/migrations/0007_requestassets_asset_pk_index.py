@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:25
+
+# Django
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0006_marketprice"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="requestassets",
+            index=models.Index(
+                fields=["asset_pk"], name="assets_requ_asset_p_24a7e3_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:29
+
+# Django
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def on_migrate(apps, schema_editor):
+    """Resolve the name, solar system and root of all existing locations."""
+    Location = apps.get_model("assets", "Location")
+
+    rows = {
+        row[0]: row
+        for row in Location.objects.values_list(
+            "id", "parent_id", "name", "eve_solar_system_id"
+        ).iterator()
+    }
+    locations = []
+    for location_id in rows:
+        resolved_name = ""
+        resolved_solar_system_id = None
+        root_id = None
+        current_id = location_id
+        visited = set()
+        while current_id in rows and current_id not in visited:
+            visited.add(current_id)
+            _, parent_id, name, eve_solar_system_id = rows[current_id]
+            resolved_name = resolved_name or name
+            resolved_solar_system_id = resolved_solar_system_id or eve_solar_system_id
+            if current_id != location_id:
+                root_id = current_id
+            current_id = parent_id
+        locations.append(
+            Location(
+                id=location_id,
+                resolved_name=resolved_name,
+                resolved_solar_system_id=resolved_solar_system_id,
+                root_id=root_id,
+            )
+        )
+
+    Location.objects.bulk_update(
+        locations,
+        ["resolved_name", "resolved_solar_system", "root"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0007_requestassets_asset_pk_index"),
+        ("eve_sde", "0018_blueprintactivity_blueprintactivityproduct_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="location",
+            name="resolved_name",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Name of this location or of the nearest named parent",
+                max_length=100,
+            ),
+        ),
+        migrations.AddField(
+            model_name="location",
+            name="resolved_solar_system",
+            field=models.ForeignKey(
+                blank=True,
+                default=None,
+                help_text="Solar system of this location or of the nearest parent",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="eve_sde.solarsystem",
+            ),
+        ),
+        migrations.AddField(
+            model_name="location",
+            name="root",
+            field=models.ForeignKey(
+                blank=True,
+                default=None,
+                help_text="Top most parent of this location, empty for top level locations",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="assets.location",
+            ),
+        ),
+        migrations.RunPython(on_migrate, migrations.RunPython.noop),
+    ]
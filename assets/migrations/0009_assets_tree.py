@@ -0,0 +1,112 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:38
+
+# Django
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def on_migrate(apps, schema_editor):
+    """Resolve the parent item, root location and depth of all existing assets."""
+    Assets = apps.get_model("assets", "Assets")
+
+    for owner_id in Assets.objects.values_list("owner_id", flat=True).distinct():
+        rows = dict(
+            Assets.objects.filter(owner_id=owner_id)
+            .values_list("item_id", "location_id")
+            .iterator()
+        )
+        tree = {}
+        for item_id in rows:
+            path = []
+            current = item_id
+            while current in rows and current not in tree and current not in path:
+                path.append(current)
+                current = rows[current]
+            if current in tree:
+                root_id, depth = tree[current][1], tree[current][2] + 1
+            else:
+                root_id, depth = current, 0
+            for path_item_id in reversed(path):
+                location_id = rows[path_item_id]
+                parent_id = location_id if location_id in rows else None
+                tree[path_item_id] = (parent_id, root_id, depth)
+                depth += 1
+
+        assets = []
+        for pk, item_id in (
+            Assets.objects.filter(owner_id=owner_id)
+            .values_list("pk", "item_id")
+            .iterator()
+        ):
+            parent_id, root_id, depth = tree[item_id]
+            assets.append(
+                Assets(
+                    pk=pk,
+                    parent_item_id=parent_id,
+                    root_location_id=root_id,
+                    depth=depth,
+                )
+            )
+        Assets.objects.bulk_update(
+            assets, ["parent_item_id", "root_location", "depth"], batch_size=500
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0008_location_hierarchy"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assets",
+            name="depth",
+            field=models.PositiveSmallIntegerField(
+                default=0, help_text="Number of assets this asset is nested in"
+            ),
+        ),
+        migrations.AddField(
+            model_name="assets",
+            name="parent_item_id",
+            field=models.PositiveBigIntegerField(
+                default=None,
+                help_text="The EVE Item ID of the asset this asset is located in",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="assets",
+            name="root_location",
+            field=models.ForeignKey(
+                default=None,
+                help_text="Station, structure or solar system the asset is located in",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="assets.location",
+            ),
+        ),
+        migrations.AddField(
+            model_name="assetsstaging",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="assetsstaging",
+            name="parent_item_id",
+            field=models.PositiveBigIntegerField(default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name="assetsstaging",
+            name="root_location",
+            field=models.ForeignKey(
+                default=None,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="assets.location",
+            ),
+        ),
+        migrations.RunPython(on_migrate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:40
+
+# Django
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Sum
+from django.db.models.functions import Coalesce
+
+
+def on_migrate(apps, schema_editor):
+    """Summarize the existing assets per owner, location and location flag."""
+    Assets = apps.get_model("assets", "Assets")
+    AssetLocationSummary = apps.get_model("assets", "AssetLocationSummary")
+
+    rows = (
+        Assets.objects.filter(root_location__isnull=False)
+        .values("owner_id", "root_location_id", "location_flag")
+        .annotate(
+            item_count=Count("pk"),
+            total_quantity=Sum("quantity"),
+            total_value=Coalesce(
+                Sum(
+                    ExpressionWrapper(
+                        F("price") * F("quantity"), output_field=FloatField()
+                    )
+                ),
+                0.0,
+            ),
+        )
+        .order_by()
+    )
+    AssetLocationSummary.objects.bulk_create(
+        [
+            AssetLocationSummary(
+                owner_id=row["owner_id"],
+                location_id=row["root_location_id"],
+                location_flag=row["location_flag"],
+                item_count=row["item_count"],
+                total_quantity=row["total_quantity"],
+                total_value=row["total_value"],
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0009_assets_tree"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssetLocationSummary",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("location_flag", models.CharField(max_length=36)),
+                (
+                    "item_count",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Number of asset stacks"
+                    ),
+                ),
+                (
+                    "total_quantity",
+                    models.PositiveBigIntegerField(
+                        default=0, help_text="Summed quantity of all assets"
+                    ),
+                ),
+                (
+                    "total_value",
+                    models.FloatField(
+                        default=0.0,
+                        help_text="Summed value of all assets at their last known price",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "location",
+                    models.ForeignKey(
+                        help_text="Root location of the assets",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="assets.location",
+                    ),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="location_summaries",
+                        to="assets.owner",
+                    ),
+                ),
+            ],
+            options={
+                "default_permissions": (),
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("owner", "location", "location_flag"),
+                        name="assetlocationsummary_unique_owner_location_flag",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(on_migrate, migrations.RunPython.noop),
+    ]
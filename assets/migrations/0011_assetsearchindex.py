@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:41
+
+# Django
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def on_migrate(apps, schema_editor):
+    """Index the existing assets per owner, location and item type."""
+    Assets = apps.get_model("assets", "Assets")
+    AssetSearchIndex = apps.get_model("assets", "AssetSearchIndex")
+
+    rows = (
+        Assets.objects.filter(root_location__isnull=False)
+        .values_list("owner_id", "root_location_id", "eve_type_id", "eve_type__name")
+        .annotate(total_quantity=Sum("quantity"))
+        .order_by()
+    )
+    AssetSearchIndex.objects.bulk_create(
+        [
+            AssetSearchIndex(
+                owner_id=owner_id,
+                location_id=location_id,
+                eve_type_id=eve_type_id,
+                name=" ".join(name.lower().split()),
+                quantity=quantity,
+            )
+            for owner_id, location_id, eve_type_id, name, quantity in rows.iterator()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0010_assetlocationsummary"),
+        ("eve_sde", "0018_blueprintactivity_blueprintactivityproduct_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssetSearchIndex",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Normalized lower case name of the item type",
+                        max_length=255,
+                    ),
+                ),
+                ("quantity", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "eve_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="eve_sde.itemtype",
+                    ),
+                ),
+                (
+                    "location",
+                    models.ForeignKey(
+                        help_text="Root location of the assets",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="assets.location",
+                    ),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="assets.owner",
+                    ),
+                ),
+            ],
+            options={
+                "default_permissions": (),
+                "indexes": [
+                    models.Index(fields=["name"], name="assets_asse_name_2f3b3b_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("owner", "location", "eve_type"),
+                        name="assetsearchindex_unique_owner_location_type",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(on_migrate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:43
+
+# Django
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0011_assetsearchindex"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="assets",
+            index=models.Index(
+                fields=["root_location", "location_flag"],
+                name="assets_root_location_flag",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="assets",
+            index=models.Index(
+                fields=["owner", "location_flag"], name="assets_owner_location_flag"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="assets",
+            index=models.Index(
+                fields=["eve_type", "location", "location_flag"],
+                name="assets_type_location_flag",
+            ),
+        ),
+    ]
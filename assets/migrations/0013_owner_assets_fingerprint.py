@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:47
+
+# Django
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0012_assets_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="owner",
+            name="assets_fingerprint",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Fingerprints of the ESI asset pages of the last update",
+            ),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:53
+
+# Django
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0014_assetsnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssetEvent",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("item_id", models.PositiveBigIntegerField()),
+                (
+                    "event",
+                    models.CharField(
+                        choices=[
+                            ("added", "Added"),
+                            ("changed", "Changed"),
+                            ("removed", "Removed"),
+                        ],
+                        max_length=7,
+                    ),
+                ),
+                ("type_id", models.PositiveIntegerField()),
+                ("location_id", models.PositiveBigIntegerField()),
+                ("location_flag", models.CharField(max_length=36)),
+                ("quantity", models.PositiveIntegerField()),
+                (
+                    "previous_location_id",
+                    models.PositiveBigIntegerField(
+                        default=None, help_text="Location before a change", null=True
+                    ),
+                ),
+                (
+                    "previous_quantity",
+                    models.PositiveIntegerField(
+                        default=None, help_text="Quantity before a change", null=True
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="assets.owner",
+                    ),
+                ),
+            ],
+            options={
+                "default_permissions": (),
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:12
+
+# Django
+from django.db import migrations, models
+
+
+def reset_fingerprints(apps, schema_editor):
+    """Fingerprints were stored as a list, the next update stores them by page."""
+    Owner = apps.get_model("assets", "Owner")
+    Owner.objects.update(assets_fingerprint={})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0015_assetevent"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="owner",
+            name="assets_fingerprint",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Fingerprints of the ESI asset pages of the last update by page",
+            ),
+        ),
+        migrations.RunPython(reset_fingerprints, migrations.RunPython.noop),
+    ]
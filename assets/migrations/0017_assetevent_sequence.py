@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:14
+
+# Django
+from django.db import migrations, models
+from django.db.models import F
+
+
+def number_events(apps, schema_editor):
+    """Existing events are committed, they are numbered in ID order."""
+    AssetEvent = apps.get_model("assets", "AssetEvent")
+    AssetEventSequence = apps.get_model("assets", "AssetEventSequence")
+    AssetEvent.objects.update(sequence=F("pk"))
+    last = AssetEvent.objects.order_by("-pk").values_list("pk", flat=True).first()
+    AssetEventSequence.objects.create(pk=1, value=last or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0016_alter_owner_assets_fingerprint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssetEventSequence",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                "default_permissions": (),
+            },
+        ),
+        migrations.AddField(
+            model_name="assetevent",
+            name="sequence",
+            field=models.PositiveBigIntegerField(
+                default=None,
+                help_text="Commit order of the event, empty until the sync is committed",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.RunPython(number_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:21
+
+# Django
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_tokens(apps, schema_editor):
+    """Create the search tokens of all types in the search index."""
+    AssetSearchIndex = apps.get_model("assets", "AssetSearchIndex")
+    AssetSearchToken = apps.get_model("assets", "AssetSearchToken")
+    names = dict(AssetSearchIndex.objects.values_list("eve_type_id", "name").distinct())
+    tokens = []
+    for eve_type_id, name in names.items():
+        words = name.split()
+        tokens += [
+            AssetSearchToken(eve_type_id=eve_type_id, token=" ".join(words[i:]))
+            for i in range(len(words))
+        ]
+    AssetSearchToken.objects.bulk_create(tokens, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("assets", "0017_assetevent_sequence"),
+        ("eve_sde", "0018_blueprintactivity_blueprintactivityproduct_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssetSearchToken",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "token",
+                    models.CharField(
+                        db_index=True,
+                        help_text="Normalized type name starting at one of its words",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "eve_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="eve_sde.itemtype",
+                    ),
+                ),
+            ],
+            options={
+                "default_permissions": (),
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("eve_type", "token"),
+                        name="assetsearchtoken_unique_type_token",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_tokens, migrations.RunPython.noop),
+    ]
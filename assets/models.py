@@ -1,8 +1,13 @@
 """Models for assets."""
 
+# Standard Library
+import hashlib
+from collections.abc import Iterator
+
 # Django
 from django.core.validators import MinValueValidator
-from django.db import models, transaction
+from django.db import models
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
@@ -25,6 +30,7 @@ from eve_sde.models.types import ItemType
 
 # AA Assets
 from assets import contexts
+from assets.app_settings import ASSETS_BULK_BATCH_SIZE, ASSETS_ESI_MAX_WORKERS
 from assets.errors import HTTPGatewayTimeoutError
 from assets.helpers.discord import send_user_notification
 from assets.helpers.eveonline import (
@@ -34,22 +40,42 @@ from assets.helpers.eveonline import (
 )
 from assets.hooks import get_extension_logger
 from assets.managers import (
+    MARKET_PRICE_TRADEHUB,
+    AssetEventManager,
+    AssetLocationSummaryManager,
+    AssetsDiff,
+    AssetSearchIndexManager,
+    AssetSearchTokenManager,
     AssetsManager,
+    AssetSnapshotManager,
     EveEntityManager,
     LocationManager,
+    MarketPriceManager,
     OwnerManager,
     RequestManager,
-    get_market_price,
+    build_asset_tree,
 )
-from assets.providers import esi
+from assets.providers import esi, iter_esi_pages
 
 logger = get_extension_logger(__name__)
 
 
-def get_or_create_location(location_id: int) -> "Location":
-    """Get or create a location sync - helper function."""
-    obj, _ = Location.objects.get_or_create_esi(location_id=location_id)
-    return obj
+def get_assets_fingerprint(assets: list[contexts.GetAssetsContext]) -> str:
+    """Return a fingerprint of an ESI asset page independent of the item order."""
+    rows = sorted(
+        (
+            asset.item_id,
+            asset.type_id,
+            asset.location_id,
+            asset.location_flag,
+            asset.location_type,
+            asset.quantity,
+            asset.is_singleton,
+            asset.is_blueprint_copy,
+        )
+        for asset in assets
+    )
+    return hashlib.sha256(repr(rows).encode()).hexdigest()
 
 
 def users_with_permission(
@@ -242,6 +268,11 @@ class Owner(models.Model):
         help_text=("whether this owner is currently included in the sync process"),
     )
     last_update = models.DateTimeField(auto_now=True)
+    assets_fingerprint = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Fingerprints of the ESI asset pages of the last update by page",
+    )
 
     objects = OwnerManager()
 
@@ -291,72 +322,133 @@ class Owner(models.Model):
 
     def process_assets(self, assets: list[contexts.GetAssetsContext]):
         items = []
-        item_ids = list(
-            {
-                asset.type_id
-                for asset in assets
-                if get_market_price(asset.type_id) is None
-            }
-        )
+        type_ids = {asset.type_id for asset in assets}
+        location_ids = {asset.location_id for asset in assets}
+
+        # Resolve all types and locations up front instead of once per asset
+        eve_types = ItemType.objects.in_bulk(type_ids)
+        locations = Location.objects.bulk_get_or_create_esi(location_ids)
+
+        # Cached prices are read at once, missing prices are fetched and cached
+        prices = Assets.objects.get_prices(list(eve_types))
 
-        if item_ids:
-            # Update or create prices for all items and save them in cache
-            Assets.objects.update_or_create_prices(item_ids)
+        # Nested assets are resolved to their root location with a dict index
+        tree = build_asset_tree({asset.item_id: asset.location_id for asset in assets})
 
         for asset in assets:
-            try:
-                price = float(get_market_price(asset.type_id))
-            except AttributeError:
-                price = None
+            eve_type = eve_types.get(asset.type_id)
+            if eve_type is None:
+                logger.warning(
+                    "Unknown type %s for item %s of %s",
+                    asset.type_id,
+                    asset.item_id,
+                    self.name,
+                )
+                continue
 
+            price = prices.get(asset.type_id)
+            parent_item_id, root_location_id, depth = tree[asset.item_id]
             location_flag = Assets.LocationFlag.from_esi_data(asset.location_flag)
-            eve_type = ItemType.objects.get(id=asset.type_id)
             asset_item = Assets(
-                location=get_or_create_location(asset.location_id),
+                location=locations[asset.location_id],
                 location_flag=location_flag,
                 location_type=asset.location_type,
                 eve_type=eve_type,
-                item_id=asset.type_id,
+                item_id=asset.item_id,
                 quantity=asset.quantity,
                 singleton=asset.is_singleton,
                 blueprint_copy=asset.is_blueprint_copy,
                 owner=self,
                 price=price,
+                parent_item_id=parent_item_id,
+                root_location=locations[root_location_id],
+                depth=depth,
             )
             items.append(asset_item)
         return items
 
+    def _stage_assets(self, assets: list[contexts.GetAssetsContext]) -> int:
+        """Process a page of ESI assets and write it to the staging table."""
+        items = self.process_assets(assets)
+        Assets.objects.stage_owner_assets(self, items)
+        return len(items)
+
     def update_assets_esi(self, force_refresh=False):
+        # Assets are written page by page to the staging table and published at once
+        staged = AssetsStaging.objects.filter(owner=self)
+        staged.delete()
+        count = 0
         try:
+            token = self.valid_token(self.get_esi_scopes())
             if self.corporation:
-                token = self.valid_token(self.get_esi_scopes())
-                assets = self._fetch_corporate_assets(
-                    token, force_refresh=force_refresh
-                )
+                fetch_assets = self._fetch_corporate_assets
             else:
-                token = self.valid_token(self.get_esi_scopes())
-                assets = self._fetch_personal_assets(token, force_refresh=force_refresh)
+                fetch_assets = self._fetch_personal_assets
 
-            items = self.process_assets(assets)
+            # Pages are only hashed first and compared by page number,
+            # unchanged assets are not processed at all
+            fingerprints = {
+                str(page): get_assets_fingerprint(assets)
+                for page, assets in fetch_assets(token, force_refresh=force_refresh)
+            }
+            if not force_refresh and fingerprints == self.assets_fingerprint:
+                logger.info("Assets unchanged for: %s", self.name)
+                self.last_update = timezone.now()
+                self.save(update_fields=["last_update"])
+                return
+
+            # Changed pages are read again from the ESI response cache and staged
+            fingerprints = {}
+            for page, assets in fetch_assets(token, use_etag=False):
+                fingerprints[str(page)] = get_assets_fingerprint(assets)
+                count += self._stage_assets(assets)
         except HTTPNotModified:
             logger.info("No new Assets for: %s", self.name)
+            self.last_update = timezone.now()
+            self.save(update_fields=["last_update"])
             return
         except HTTPGatewayTimeoutError:
             logger.info("Gateway Timeout for: %s", self.name)
+            staged.delete()
             return
         except HTTPClientError as e:
             logger.error("Failed to fetch assets for %s: %s", self.name, e)
+            staged.delete()
             return
 
         try:
-            if items:
-                with transaction.atomic():
-                    # Delete all assets before adding new ones
-                    self.flush_assets()
-                    # Create Bulk
-                    Assets.objects.bulk_create(items)
-                    logger.info("Updated %s assets for %s", len(assets), self.name)
-
+            if count:
+                Assets.objects.update_staged_tree(self)
+                # Events and snapshot deltas are committed batch by batch
+                # together with the published assets
+                snapshot = None
+
+                def on_publish(diff: AssetsDiff):
+                    nonlocal snapshot
+                    AssetEvent.objects.emit(self, diff)
+                    snapshot = AssetSnapshot.objects.create_from_diff(
+                        self, diff, snapshot
+                    )
+
+                published = Assets.objects.publish_staged_assets(
+                    self, on_publish=on_publish
+                )
+                AssetEvent.objects.assign_sequence()
+                Location.objects.update_parents_from_assets(self)
+                if published:
+                    AssetLocationSummary.objects.refresh_owner(
+                        self, published.locations
+                    )
+                    AssetSearchIndex.objects.refresh_owner(self)
+                self.assets_fingerprint = fingerprints
+                logger.info(
+                    "Updated %s assets for %s (%s created, %s updated, %s deleted)",
+                    count,
+                    self.name,
+                    published.created,
+                    published.updated,
+                    published.deleted,
+                )
             else:
                 logger.info("No updates found for %s", self.name)
         # pylint: disable=broad-except
@@ -366,59 +458,83 @@ class Owner(models.Model):
                 self.name,
                 e,
             )
+            staged.delete()
 
         self.last_update = timezone.now()
         self.save()
         self.update_order_assets()
 
     def update_order_assets(self):
-        # Filter offene Bestellungen
-        orders = RequestAssets.objects.filter(request__status=Request.STATUS_OPEN)
+        """Relink open requests to the current assets of this owner.
+
+        Only requests whose asset no longer matches their type, location and flag
+        are relinked to an asset of this owner that does.
+        """
+        matching_assets = Assets.objects.filter(
+            eve_type=OuterRef("eve_type"),
+            location_id=OuterRef("asset_location_id"),
+            location_flag=OuterRef("asset_location_flag"),
+        )
+        orders = list(
+            RequestAssets.objects.filter(request__status=Request.STATUS_OPEN)
+            .filter(Exists(matching_assets.filter(owner=self)))
+            .exclude(Exists(matching_assets.filter(pk=OuterRef("asset_pk"))))
+        )
+        if not orders:
+            return
+
+        # First asset per type, location and flag of this owner
+        assets = {}
+        for pk, eve_type_id, location_id, location_flag in (
+            Assets.objects.filter(
+                owner=self,
+                eve_type_id__in={order.eve_type_id for order in orders},
+                location_id__in={order.asset_location_id for order in orders},
+            )
+            .order_by("-pk")
+            .values_list("pk", "eve_type_id", "location_id", "location_flag")
+        ):
+            assets[(eve_type_id, location_id, location_flag)] = pk
 
-        orders_to_update = []
         for order in orders:
-            try:
-                asset = Assets.objects.get(
-                    eve_type=order.eve_type,
-                    location_id=order.asset_location_id,
-                    location_flag=order.asset_location_flag,
-                )
-            except Assets.DoesNotExist:
-                continue
-            if asset:
-                order.asset_pk = asset.pk
-                orders_to_update.append(order)
-
-        # Bulk-Update der Bestellungen
-        if orders_to_update:
-            logger.info("Updated %s orders for %s", len(orders_to_update), self.name)
-            RequestAssets.objects.bulk_update(orders_to_update, ["asset_pk"])
-
-    def _fetch_corporate_assets(self, token: Token, force_refresh=False) -> list:
-        """Fetch all assets for this owner from ESI."""
-        asset_esi = esi.client.Assets.GetCorporationsCorporationIdAssets(
-            corporation_id=self.corporation_strict.corporation_id,
-            token=token,
-        )
-        assets, response = asset_esi.results(
-            return_response=True,
-            force_refresh=force_refresh,
+            order.asset_pk = assets[
+                (order.eve_type_id, order.asset_location_id, order.asset_location_flag)
+            ]
+
+        logger.info("Updated %s orders for %s", len(orders), self.name)
+        RequestAssets.objects.bulk_update(
+            orders, ["asset_pk"], batch_size=ASSETS_BULK_BATCH_SIZE
         )
-        logger.debug("Response Status: %s", response.status_code)
-        return assets
 
-    def _fetch_personal_assets(self, token: Token, force_refresh=False) -> list:
-        """Fetch all assets for this owner from ESI."""
-        asset_esi = esi.client.Assets.GetCharactersCharacterIdAssets(
-            character_id=self.eve_character_strict.character_id,
-            token=token,
+    def _fetch_corporate_assets(
+        self, token: Token, force_refresh=False, use_etag=True
+    ) -> Iterator[tuple[int, list]]:
+        """Fetch all assets for this owner from ESI page by page."""
+        return iter_esi_pages(
+            lambda **kwargs: esi.client.Assets.GetCorporationsCorporationIdAssets(
+                corporation_id=self.corporation_strict.corporation_id,
+                token=token,
+                **kwargs,
+            ),
+            force_refresh=force_refresh,
+            max_workers=ASSETS_ESI_MAX_WORKERS,
+            use_etag=use_etag,
         )
-        assets, response = asset_esi.results(
-            return_response=True,
+
+    def _fetch_personal_assets(
+        self, token: Token, force_refresh=False, use_etag=True
+    ) -> Iterator[tuple[int, list]]:
+        """Fetch all assets for this owner from ESI page by page."""
+        return iter_esi_pages(
+            lambda **kwargs: esi.client.Assets.GetCharactersCharacterIdAssets(
+                character_id=self.eve_character_strict.character_id,
+                token=token,
+                **kwargs,
+            ),
             force_refresh=force_refresh,
+            max_workers=ASSETS_ESI_MAX_WORKERS,
+            use_etag=use_etag,
         )
-        logger.debug("Response Status: %s", response.status_code)
-        return assets
 
     def valid_token(self, scopes) -> Token:
         """Return a valid token for the owner or raise exception."""
@@ -500,6 +616,32 @@ class Location(models.Model):
     )
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalised hierarchy, maintained by `LocationManager.update_hierarchy`
+    resolved_name = models.CharField(
+        max_length=100,
+        default="",
+        blank=True,
+        help_text="Name of this location or of the nearest named parent",
+    )
+    resolved_solar_system = models.ForeignKey(
+        SolarSystem,
+        on_delete=models.SET_NULL,
+        default=None,
+        null=True,
+        blank=True,
+        help_text="Solar system of this location or of the nearest parent",
+        related_name="+",
+    )
+    root = models.ForeignKey(
+        "Location",
+        on_delete=models.SET_NULL,
+        default=None,
+        null=True,
+        blank=True,
+        help_text="Top most parent of this location, empty for top level locations",
+        related_name="+",
+    )
+
     objects = LocationManager()
 
     class Meta:
@@ -745,6 +887,22 @@ class Assets(models.Model):
         help_text="Blueprint Copy", null=True, default=None
     )
     price = models.FloatField(null=True, default=None)
+    parent_item_id = models.PositiveBigIntegerField(
+        null=True,
+        default=None,
+        help_text="The EVE Item ID of the asset this asset is located in",
+    )
+    root_location = models.ForeignKey(
+        Location,
+        on_delete=models.SET_NULL,
+        null=True,
+        default=None,
+        related_name="+",
+        help_text="Station, structure or solar system the asset is located in",
+    )
+    depth = models.PositiveSmallIntegerField(
+        default=0, help_text="Number of assets this asset is nested in"
+    )
 
     objects = AssetsManager()
 
@@ -756,6 +914,288 @@ class Assets(models.Model):
         indexes = [
             models.Index(fields=["location_id"]),
             models.Index(fields=["item_id"]),
+            # Assets of a location page, API and request form
+            models.Index(
+                fields=["root_location", "location_flag"],
+                name="assets_root_location_flag",
+            ),
+            # Assets of an owner by flag for location lists and summaries
+            models.Index(
+                fields=["owner", "location_flag"], name="assets_owner_location_flag"
+            ),
+            # Relinking open requests to their asset
+            models.Index(
+                fields=["eve_type", "location", "location_flag"],
+                name="assets_type_location_flag",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "item_id"], name="assets_unique_owner_item_id"
+            ),
+        ]
+
+
+class AssetsStaging(models.Model):
+    """Assets of an owner fetched from ESI that are not yet published."""
+
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name="+")
+    item_id = models.PositiveBigIntegerField()
+    eve_type = models.ForeignKey(ItemType, on_delete=models.CASCADE, related_name="+")
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name="+")
+    location_flag = models.CharField(max_length=36)
+    location_type = models.CharField(max_length=100)
+    quantity = models.PositiveIntegerField(default=1)
+    singleton = models.BooleanField()
+    blueprint_copy = models.BooleanField(null=True, default=None)
+    price = models.FloatField(null=True, default=None)
+    parent_item_id = models.PositiveBigIntegerField(null=True, default=None)
+    root_location = models.ForeignKey(
+        Location, on_delete=models.CASCADE, null=True, default=None, related_name="+"
+    )
+    depth = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.owner_id}: {self.item_id}"
+
+    class Meta:
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "item_id"],
+                name="assets_staging_unique_owner_item_id",
+            ),
+        ]
+
+
+class AssetLocationSummary(models.Model):
+    """Aggregated assets of an owner per location and location flag."""
+
+    owner = models.ForeignKey(
+        Owner, on_delete=models.CASCADE, related_name="location_summaries"
+    )
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.CASCADE,
+        related_name="+",
+        help_text="Root location of the assets",
+    )
+    location_flag = models.CharField(max_length=36)
+    item_count = models.PositiveIntegerField(
+        default=0, help_text="Number of asset stacks"
+    )
+    total_quantity = models.PositiveBigIntegerField(
+        default=0, help_text="Summed quantity of all assets"
+    )
+    total_value = models.FloatField(
+        default=0.0, help_text="Summed value of all assets at their last known price"
+    )
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    objects = AssetLocationSummaryManager()
+
+    def __str__(self):
+        return f"{self.owner_id}: {self.location_id} ({self.location_flag})"
+
+    class Meta:
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "location", "location_flag"],
+                name="assetlocationsummary_unique_owner_location_flag",
+            ),
+        ]
+
+
+class AssetSearchIndex(models.Model):
+    """Summed quantity of an item type per owner and location for searching."""
+
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name="+")
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.CASCADE,
+        related_name="+",
+        help_text="Root location of the assets",
+    )
+    eve_type = models.ForeignKey(ItemType, on_delete=models.CASCADE, related_name="+")
+    name = models.CharField(
+        max_length=255, help_text="Normalized lower case name of the item type"
+    )
+    quantity = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    objects = AssetSearchIndexManager()
+
+    def __str__(self):
+        return f"{self.owner_id}: {self.eve_type_id} @ {self.location_id}"
+
+    class Meta:
+        default_permissions = ()
+        indexes = [
+            models.Index(fields=["name"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "location", "eve_type"],
+                name="assetsearchindex_unique_owner_location_type",
+            ),
+        ]
+
+
+class AssetSearchToken(models.Model):
+    """A word suffix of an item type name, searched with a prefix match."""
+
+    eve_type = models.ForeignKey(ItemType, on_delete=models.CASCADE, related_name="+")
+    token = models.CharField(
+        max_length=255,
+        db_index=True,
+        help_text="Normalized type name starting at one of its words",
+    )
+
+    objects = AssetSearchTokenManager()
+
+    def __str__(self):
+        return f"{self.eve_type_id}: {self.token}"
+
+    class Meta:
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(
+                fields=["eve_type", "token"],
+                name="assetsearchtoken_unique_type_token",
+            ),
+        ]
+
+
+class AssetSnapshot(models.Model):
+    """A version of the assets of an owner, stored as changes to the previous one."""
+
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name="snapshots")
+    created_at = models.DateTimeField(default=timezone.now)
+    delta_count = models.PositiveIntegerField(
+        default=0, help_text="Number of assets changed in this version"
+    )
+
+    objects = AssetSnapshotManager()
+
+    def __str__(self):
+        return f"{self.owner_id}: {self.created_at}"
+
+    class Meta:
+        default_permissions = ()
+
+
+class AssetSnapshotDelta(models.Model):
+    """The change of a single asset in a snapshot."""
+
+    class Action(models.TextChoices):
+        CREATED = "created", _("Created")
+        UPDATED = "updated", _("Updated")
+        DELETED = "deleted", _("Deleted")
+
+    snapshot = models.ForeignKey(
+        AssetSnapshot, on_delete=models.CASCADE, related_name="deltas"
+    )
+    item_id = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=7, choices=Action.choices)
+    before = models.JSONField(
+        null=True, default=None, help_text="Asset state before this version"
+    )
+    after = models.JSONField(
+        null=True, default=None, help_text="Asset state after this version"
+    )
+
+    def __str__(self):
+        return f"{self.snapshot_id}: {self.item_id} ({self.action})"
+
+    class Meta:
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(
+                fields=["snapshot", "item_id"],
+                name="assetsnapshotdelta_unique_snapshot_item_id",
+            ),
+        ]
+
+
+class AssetEvent(models.Model):
+    """An added, changed or removed asset of an owner for downstream consumers.
+
+    Events are written once per sync and numbered after they are committed,
+    the sequence number is the cursor to read new events.
+    """
+
+    class Event(models.TextChoices):
+        ADDED = "added", _("Added")
+        CHANGED = "changed", _("Changed")
+        REMOVED = "removed", _("Removed")
+
+    id = models.BigAutoField(primary_key=True)
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name="+")
+    item_id = models.PositiveBigIntegerField()
+    event = models.CharField(max_length=7, choices=Event.choices)
+    type_id = models.PositiveIntegerField()
+    location_id = models.PositiveBigIntegerField()
+    location_flag = models.CharField(max_length=36)
+    quantity = models.PositiveIntegerField()
+    previous_location_id = models.PositiveBigIntegerField(
+        null=True, default=None, help_text="Location before a change"
+    )
+    previous_quantity = models.PositiveIntegerField(
+        null=True, default=None, help_text="Quantity before a change"
+    )
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    sequence = models.PositiveBigIntegerField(
+        null=True,
+        default=None,
+        unique=True,
+        help_text="Commit order of the event, empty until the sync is committed",
+    )
+
+    objects = AssetEventManager()
+
+    def __str__(self):
+        return f"{self.owner_id}: {self.item_id} ({self.event})"
+
+    class Meta:
+        default_permissions = ()
+
+
+class AssetEventSequence(models.Model):
+    """Last sequence number handed out to asset events, locked while numbering."""
+
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.value)
+
+    class Meta:
+        default_permissions = ()
+
+
+class MarketPrice(models.Model):
+    """Market price of an item type at a trade hub."""
+
+    eve_type = models.ForeignKey(
+        ItemType, on_delete=models.CASCADE, related_name="+", help_text="item type"
+    )
+    hub_id = models.PositiveBigIntegerField(
+        default=MARKET_PRICE_TRADEHUB, help_text="Station ID of the trade hub"
+    )
+    price = models.FloatField(help_text="Max buy price")
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    objects = MarketPriceManager()
+
+    def __str__(self):
+        return f"{self.eve_type_id}@{self.hub_id}: {self.price}"
+
+    class Meta:
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(
+                fields=["eve_type", "hub_id"], name="marketprice_unique_type_hub"
+            ),
         ]
 
 
@@ -989,3 +1429,6 @@ class RequestAssets(models.Model):
 
     class Meta:
         default_permissions = ()
+        indexes = [
+            models.Index(fields=["asset_pk"]),
+        ]
@@ -3,21 +3,29 @@
 # Standard Library
 import logging
 import random
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from http import HTTPStatus
+from typing import Any
 
 # Third Party
 from aiopenapi3 import RequestError
 from celery import Task
 
+# Django
+from django import db
+
 # Alliance Auth
 from allianceauth.services.hooks import get_extension_logger
 from esi.exceptions import (
     ESIBucketLimitException,
     ESIErrorLimitException,
+    HTTPNotModified,
     HTTPServerError,
 )
-from esi.openapi_clients import ESIClientProvider
+from esi.openapi_clients import ESIClientProvider, EsiOperation
 
 # AA Assets
 from assets import (
@@ -125,3 +133,113 @@ def retry_task_on_esi_error(task: Task):
         raise exc
     except RequestError as exc:
         retry(exc, 60, "Request Error")
+
+
+def _iter_bounded(
+    executor: ThreadPoolExecutor | None,
+    func: Callable[[int], Any],
+    pages: Iterable[int],
+    max_workers: int,
+) -> Iterator[tuple[int, Any]]:
+    """Yield `(page, func(page))` in page order.
+
+    With an executor at most `max_workers` pages are fetched or held at the same time.
+    """
+    if executor is None:
+        for page in pages:
+            yield page, func(page)
+        return
+
+    pending = deque()
+    for page in pages:
+        pending.append((page, executor.submit(func, page)))
+        if len(pending) >= max_workers:
+            page, future = pending.popleft()
+            yield page, future.result()
+    while pending:
+        page, future = pending.popleft()
+        yield page, future.result()
+
+
+def iter_esi_pages(
+    operation: Callable[..., EsiOperation],
+    force_refresh: bool = False,
+    max_workers: int = 1,
+    use_etag: bool = True,
+) -> Iterator[tuple[int, list[Any]]]:
+    """Yield the page number and results of a paginated ESI operation page by page.
+
+    Unlike `results()` only the fetched pages are held in memory, not the full list.
+    Pages that hit their ETag are fetched again without ETag if other pages changed,
+    after all other pages.
+
+    With more than one worker the first page is fetched to learn the number of pages
+    and the remaining pages are fetched concurrently, at most `max_workers` at once.
+    ESI limit errors of any page are raised and cancel the pending pages.
+
+    :param operation: Callable returning the ESI operation for the given `page`
+    :param force_refresh: Whether to ignore ETags and cached responses
+    :param max_workers: Number of pages fetched at the same time
+    :param use_etag: Whether unchanged pages raise `HTTPNotModified`,
+        without ETags pages are read from the response cache if possible
+    :raises HTTPNotModified: When all pages are unchanged
+    """
+
+    def fetch(page: int) -> list[Any] | None:
+        try:
+            data = operation(page=page).result(
+                use_etag=use_etag, force_refresh=force_refresh
+            )
+            logger.debug("ESI Page Fetched %s/%s", page, total_pages)
+            return data
+        except HTTPNotModified:
+            return None
+
+    def refetch(page: int) -> list[Any]:
+        return operation(page=page).result(use_etag=False)
+
+    def in_thread(func: Callable[[int], Any]) -> Callable[[int], Any]:
+        def wrapper(page: int) -> Any:
+            try:
+                return func(page)
+            finally:
+                # Worker threads open their own database connections (e.g. for tokens)
+                db.connections.close_all()
+
+        return wrapper
+
+    # The number of pages is only read from the headers of the first page
+    not_modified_pages = []
+    try:
+        data, response = operation(page=1).result(
+            use_etag=use_etag, return_response=True, force_refresh=force_refresh
+        )
+        headers = response.headers
+    except HTTPNotModified as exc:
+        data, headers = None, exc.headers
+        not_modified_pages.append(1)
+    total_pages = int(headers.get("X-Pages", 1))
+    if data is not None:
+        yield 1, data
+
+    executor = None
+    if max_workers > 1 and total_pages > 1:
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, total_pages - 1))
+        fetch, refetch = in_thread(fetch), in_thread(refetch)
+    try:
+        for page, data in _iter_bounded(
+            executor, fetch, range(2, total_pages + 1), max_workers
+        ):
+            if data is None:
+                not_modified_pages.append(page)
+            else:
+                yield page, data
+
+        if len(not_modified_pages) == total_pages:
+            raise HTTPNotModified(status_code=304, headers=headers)
+
+        # Some pages changed, so the unchanged pages are needed as well
+        yield from _iter_bounded(executor, refetch, not_modified_pages, max_workers)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
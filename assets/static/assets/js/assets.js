@@ -7,20 +7,35 @@ $(document).ready(() => {
     let LocationFLAG = assetsSettings.locationFlag;
 
     const tableAssets = AssetsTableVar.DataTable({
-        ajax: {
-            url: assetsSettings.assetsUrl,
-            type: 'GET',
-            dataSrc: function(data) {
-                return data.assets;
-            },
-            error: function (xhr, error, thrown) {
+        processing: true,
+        serverSide: true,
+        searchDelay: 500,
+        ajax: function (data, callback, _) {
+            $.ajax({
+                url: assetsSettings.assetsUrl,
+                type: 'GET',
+                data: data,
+            }).done(function (json) {
+                callback({
+                    draw: json.draw,
+                    recordsTotal: json.recordsTotal,
+                    recordsFiltered: json.recordsFiltered,
+                    data: json.assets,
+                });
+            }).fail(function (xhr, error, thrown) {
                 console.error('Error loading data:', error);
-                tableAssets.clear().draw();
-            }
+                // Render an empty result, a redraw would request the server again
+                callback({
+                    draw: data.draw,
+                    recordsTotal: 0,
+                    recordsFiltered: 0,
+                    data: [],
+                });
+            });
         },
         columns: [
             {
-                data: 'item_id',
+                data: 'type_id',
                 render: function(data, _, __) {
                     return '<img class="card-img-zoom" src="https://imageserver.eveonline.com/types/' + data + '/icon/?size=64" height="64" width="64"/>';
                 }
@@ -72,7 +87,7 @@ $(document).ready(() => {
                             data-action="${assetsSettings.createRequestUrl}"
                             aria-label="Request Order"
                             data-asset-pk="${row.asset_pk}"
-                            data-item-id="${row.item_id}"
+                            data-item-id="${row.type_id}"
                             data-item-quantity="${row.quantity}"
                             data-title="${row.name}"
                         >
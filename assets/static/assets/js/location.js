@@ -34,6 +34,21 @@ $(document).ready(function() {
                     return data;
                 }
             },
+            {
+                data: 'items',
+                render: function (data, type) {
+                    return data;
+                }
+            },
+            {
+                data: 'value',
+                render: function (data, type) {
+                    if (type === 'display') {
+                        return data.toLocaleString() + ' ISK';
+                    }
+                    return data;
+                }
+            },
             {
                 data: 'view',
                 render: function (data, type, row) {
@@ -43,7 +58,7 @@ $(document).ready(function() {
         ],
         columnDefs: [
             {
-                targets: 3,
+                targets: 5,
                 className: 'text-end',
                 orderable: false,
                 searchable: false
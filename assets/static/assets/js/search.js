@@ -0,0 +1,90 @@
+/* global assetsSettings */
+
+$(document).ready(function() {
+    const searchTableVar = $('#search');
+    const searchInput = $('#search-query');
+    let searchTimeout = null;
+
+    const tableSearch = searchTableVar.DataTable({
+        data: [],
+        columns: [
+            {
+                data: 'name',
+                render: function (data, type, row) {
+                    return data;
+                }
+            },
+            {
+                data: 'quantity',
+                render: function (data, type) {
+                    if (type === 'display') {
+                        return data.toLocaleString();
+                    }
+                    return data;
+                }
+            },
+            {
+                data: 'location',
+                render: function (data, type) {
+                    return data;
+                }
+            },
+            {
+                data: 'solar_system',
+                render: function (data, type) {
+                    return data;
+                }
+            },
+            {
+                data: 'owner',
+                render: function (data, type) {
+                    return data;
+                }
+            },
+            {
+                data: 'view',
+                render: function (data, type, row) {
+                    return data;
+                }
+            }
+        ],
+        columnDefs: [
+            {
+                targets: 5,
+                className: 'text-end',
+                orderable: false,
+                searchable: false
+            }
+        ],
+        order: [],
+        searching: false,
+        pageLength: 25,
+    });
+
+    function loadResults(query) {
+        if (query.length < 2) {
+            tableSearch.clear().draw();
+            return;
+        }
+        $.ajax({
+            url: assetsSettings.searchUrl,
+            type: 'GET',
+            data: { q: query },
+            success: function (data) {
+                tableSearch.clear().rows.add(data).draw();
+            },
+            error: function (xhr, error, thrown) {
+                console.error('Error loading data:', error);
+                tableSearch.clear().draw();
+            }
+        });
+    }
+
+    searchInput.on('input', function() {
+        clearTimeout(searchTimeout);
+        const query = $(this).val().trim();
+        searchTimeout = setTimeout(function() {
+            loadResults(query);
+        }, 300);
+    });
+});
@@ -1,5 +1,9 @@
+# Standard Library
+from collections import defaultdict
+
 # Django
 from django.core.cache import cache
+from django.utils import timezone
 
 # Alliance Auth
 from esi.exceptions import HTTPClientError, HTTPNotModified
@@ -10,17 +14,74 @@ from eve_sde.models.map import SolarSystem
 
 # AA Assets
 from assets import contexts
-from assets.app_settings import ASSETS_CACHE_KEY
+from assets.app_settings import ASSETS_BULK_BATCH_SIZE, ASSETS_CACHE_KEY
 from assets.constants import STANDARD_FLAG
 from assets.hooks import get_extension_logger
-from assets.models import Location
+from assets.managers import EVE_TYPE_ID_SOLAR_SYSTEM
+from assets.models import Assets, EveEntity, Location
 from assets.providers import esi
 
 logger = get_extension_logger(__name__)
 
 
-def get_cache_key(location_id):
-    return f"{ASSETS_CACHE_KEY}-{location_id}_no_permission"
+ASSET_SAFETY_LOCATION_ID = 2004
+
+
+STRUCTURE_ACCESS_GRANTED_TIMEOUT = 60 * 60 * 24 * 30  # 30 days
+STRUCTURE_ACCESS_DENIED_TIMEOUT = 60 * 60 * 24 * 7  # 7 days
+
+
+def get_structure_access_key(structure_id: int, character_id: int) -> str:
+    return f"{ASSETS_CACHE_KEY}-structure_access-{structure_id}-{character_id}"
+
+
+def get_structure_access(
+    pairs: set[tuple[int, int]],
+) -> dict[tuple[int, int], bool]:
+    """Return the known structure access of (structure, character) pairs.
+
+    Pairs without a known result are not included.
+    """
+    keys = {
+        get_structure_access_key(structure_id, character_id): (
+            structure_id,
+            character_id,
+        )
+        for structure_id, character_id in pairs
+    }
+    return {keys[key]: bool(value) for key, value in cache.get_many(keys).items()}
+
+
+def set_structure_access(structure_id: int, character_id: int, granted: bool):
+    """Remember if a character has access to a structure."""
+    cache.set(
+        get_structure_access_key(structure_id, character_id),
+        int(granted),
+        (
+            STRUCTURE_ACCESS_GRANTED_TIMEOUT
+            if granted
+            else STRUCTURE_ACCESS_DENIED_TIMEOUT
+        ),
+    )
+
+
+def order_structure_characters(
+    structure_id: int, character_ids, access: dict[tuple[int, int], bool]
+) -> list[int]:
+    """Order the characters to fetch a structure with.
+
+    Characters with known access come first, then characters without a known
+    result. Characters known to be denied are skipped.
+    """
+    granted = []
+    unknown = []
+    for character_id in character_ids:
+        result = access.get((structure_id, character_id))
+        if result is True:
+            granted.append(character_id)
+        elif result is None:
+            unknown.append(character_id)
+    return granted + unknown
 
 
 def get_location_type(location_id) -> tuple[Location | None, Location | None]:
@@ -33,27 +94,31 @@ def get_location_type(location_id) -> tuple[Location | None, Location | None]:
 
     existing_location = existing_location.first()
 
-    if location_id == 2004:
+    if location_id == ASSET_SAFETY_LOCATION_ID:
         # ASSET SAFETY
         return Location(id=location_id, name="Asset Safety"), existing_location
     # Location is a Solar System
-    if 30_000_000 < location_id < 33_000_000:
-        system, _ = SolarSystem.objects.get(id=location_id)
+    if Location.is_solar_system_id(location_id):
+        system = SolarSystem.objects.filter(id=location_id).first()
         logger.debug("Fetched Solar System: %s", system)
         if not system:
-            return None
+            return None, existing_location
 
-        system = system.first()
         return (
             Location(
                 id=location_id,
                 name=system.name,
                 eve_solar_system=system,
+                eve_type_id=EVE_TYPE_ID_SOLAR_SYSTEM,
             ),
             existing_location,
         )
     # Location is a Station
-    if 60_000_000 < location_id < 64_000_000:
+    if Location.is_station_id(location_id):
+        station = Location.objects.build_sde_stations([location_id]).get(location_id)
+        if station:
+            return station, existing_location
+
         try:
             station = esi.client.Universe.GetUniverseStationsStationId(
                 station_id=location_id
@@ -82,8 +147,13 @@ def fetch_location(
 ) -> tuple[Location | None, bool]:
     """Takes a location_id and character_id and returns a location model for items in a station/structure or in space"""
 
-    # Check if we have a cached no-permission flag
-    if cache.get(get_cache_key(location_id)):
+    # Check if we have a cached no-permission flag for this character
+    if (
+        get_structure_access({(location_id, character_id)}).get(
+            (location_id, character_id)
+        )
+        is False
+    ):
         logger.debug(
             "Skipping fetch for location_id %s due to cached no-permission flag",
             location_id,
@@ -119,11 +189,11 @@ def fetch_location(
         logger.debug("No Updates for Location: %s", location_id)
         return None, False
     except HTTPClientError as e:
-        if e.status_code == 403:
-            logger.debug("Failed to get location %s due to 403 Forbidden", location_id)
-            cache.set(
-                get_cache_key(location_id), 1, (60 * 60 * 24 * 7)
-            )  # Cache for 7 days
+        if e.status_code in (403, 404):
+            logger.debug(
+                "Failed to get location %s due to %s", location_id, e.status_code
+            )
+            set_structure_access(location_id, character_id, False)
             return None, False
         if e.status_code == 420:
             logger.debug("Rate limit hit when fetching parent location %s", location_id)
@@ -137,7 +207,8 @@ def fetch_location(
         )
         return None, False
 
-    system, _ = SolarSystem.objects.get(id=structure.solar_system_id)
+    set_structure_access(location_id, character_id, True)
+    system = SolarSystem.objects.filter(id=structure.solar_system_id).first()
 
     if not system:
         logger.debug("Failed to get Solar System: %s", system)
@@ -162,80 +233,182 @@ def fetch_location(
     )
 
 
-def fetch_parent_location(
-    parent_id, character_id, force_refresh=False
-) -> tuple[Location | None, bool]:
-    """Takes a parent_id and character_id and returns a location model for items in a station/structure or in space"""
-
-    # Check if we have a cached no-permission flag
-    if cache.get(get_cache_key(parent_id)):
-        logger.debug(
-            "Skipping fetch for parent_id %s due to cached no-permission flag",
-            parent_id,
-        )
-        return None, False
-
-    # Check which location type it is
-    location, existing = get_location_type(parent_id)
-    if location:
-        return location, False
+def _resolve_structures(
+    locations: dict[int, Location], force_refresh=False
+) -> tuple[list[Location], bool]:
+    """Resolve structures from ESI with the characters that have assets in them.
+
+    Characters known to have access are tried first and characters known to be
+    denied are skipped, every token is loaded once.
+    """
+    characters = defaultdict(set)
+    for location_id, character_id in (
+        Assets.objects.filter(location_id__in=locations)
+        .values_list("location_id", "owner__character__character__character_id")
+        .distinct()
+    ):
+        characters[location_id].add(character_id)
+
+    access = get_structure_access(
+        {
+            (structure_id, character_id)
+            for structure_id, character_ids in characters.items()
+            for character_id in character_ids
+        }
+    )
 
     req_scopes = ["esi-universe.read_structures.v1"]
-
-    token = Token.get_token(character_id, req_scopes)
-
-    if not token:
-        return None, False
-
-    try:
-        structure = esi.client.Universe.GetUniverseStructuresStructureId(
-            structure_id=parent_id, token=token
-        ).result(force_refresh=force_refresh)
-        structure: contexts.GetUniverseStructuresStructureIdContext
-    except HTTPNotModified:
-        logger.debug("No Updates for Parent Location: %s", parent_id)
-        return existing, False
-    except HTTPClientError as e:
-        if e.status_code == 403:
-            logger.debug("Failed to get location %s due to 403 Forbidden", parent_id)
-            cache.set(
-                get_cache_key(parent_id), 1, (60 * 60 * 24 * 7)
-            )  # Cache for 7 days
-            return None, False
-        if e.status_code == 420:
-            logger.debug("Rate limit hit when fetching parent location %s", parent_id)
-            return None, True
-        logger.debug("Failed to get: %s", e)
-        logger.debug(
-            "Failed to get location:%s, Headers:%s, Data: %s",
-            parent_id,
-            e.headers,
-            e.data,
+    tokens = {}
+    updated = []
+    for structure_id, character_ids in characters.items():
+        for character_id in order_structure_characters(
+            structure_id, character_ids, access
+        ):
+            if character_id not in tokens:
+                tokens[character_id] = Token.get_token(character_id, req_scopes)
+            token = tokens[character_id]
+            if not token:
+                continue
+
+            try:
+                structure = esi.client.Universe.GetUniverseStructuresStructureId(
+                    structure_id=structure_id, token=token
+                ).result(force_refresh=force_refresh)
+                structure: contexts.GetUniverseStructuresStructureIdContext
+            except HTTPNotModified:
+                logger.debug("No Updates for Location: %s", structure_id)
+                break
+            except HTTPClientError as e:
+                if e.status_code == 403:
+                    # Try the next character with assets in this structure
+                    logger.debug(
+                        "Failed to get location %s with %s due to 403 Forbidden",
+                        structure_id,
+                        character_id,
+                    )
+                    set_structure_access(structure_id, character_id, False)
+                    continue
+                if e.status_code == 404:
+                    # The structure is gone, none of the characters can fetch it
+                    logger.debug("Location %s not found", structure_id)
+                    for other_character_id in character_ids:
+                        set_structure_access(structure_id, other_character_id, False)
+                    break
+                if e.status_code == 420:
+                    logger.debug(
+                        "Rate limit hit when fetching location %s", structure_id
+                    )
+                    return updated, True
+                logger.info(
+                    "Failed to get location:%s, Headers:%s, Data: %s",
+                    structure_id,
+                    e.headers,
+                    e.data,
+                )
+                break
+
+            set_structure_access(structure_id, character_id, True)
+            location = locations[structure_id]
+            location.name = structure.name
+            location.eve_solar_system_id = structure.solar_system_id
+            location.eve_type_id = structure.type_id
+            location.owner_id = structure.owner_id
+            updated.append(location)
+            break
+
+    return updated, False
+
+
+def resolve_locations(location_ids, force_refresh=False) -> tuple[int, bool]:
+    """Resolve a batch of locations and save them in bulk.
+
+    Solar systems are resolved from the SDE, stations and structures from ESI.
+
+    :return: Number of updated locations and if the ESI limit was exceeded
+    """
+    locations = Location.objects.in_bulk(location_ids)
+    updated = []
+
+    solar_systems = SolarSystem.objects.in_bulk(
+        [
+            location_id
+            for location_id in locations
+            if Location.is_solar_system_id(location_id)
+        ]
+    )
+    for location_id, eve_solar_system in solar_systems.items():
+        location = locations[location_id]
+        location.name = eve_solar_system.name
+        location.eve_solar_system = eve_solar_system
+        location.eve_type_id = EVE_TYPE_ID_SOLAR_SYSTEM
+        updated.append(location)
+
+    if ASSET_SAFETY_LOCATION_ID in locations:
+        locations[ASSET_SAFETY_LOCATION_ID].name = "Asset Safety"
+        updated.append(locations[ASSET_SAFETY_LOCATION_ID])
+
+    station_ids = [
+        location_id for location_id in locations if Location.is_station_id(location_id)
+    ]
+    stations = Location.objects.build_sde_stations(station_ids)
+    for location_id, station in stations.items():
+        location = locations[location_id]
+        location.name = station.name
+        location.eve_solar_system_id = station.eve_solar_system_id
+        location.eve_type_id = station.eve_type_id
+        updated.append(location)
+    # Stations missing in the SDE are fetched from ESI
+    for location_id in set(station_ids) - set(stations):
+        Location.objects.update_or_create_esi(location_id)
+
+    # Offices and containers are assets themselves and not fetched as structures
+    item_ids = set(
+        Assets.objects.filter(
+            item_id__in=[
+                location_id
+                for location_id in locations
+                if location_id > Location._STATION_ID_END
+            ]
+        ).values_list("item_id", flat=True)
+    )
+    structures = {
+        location_id: location
+        for location_id, location in locations.items()
+        if location_id > Location._STATION_ID_END and location_id not in item_ids
+    }
+    updated_structures, limit_exceeded = _resolve_structures(
+        structures, force_refresh=force_refresh
+    )
+    updated += updated_structures
+
+    # Missing owner corporations are created from ESI before they are linked
+    structure_owner_ids = {
+        location.owner_id
+        for location in updated_structures
+        if location.owner_id is not None
+    }
+    owner_ids = set(
+        EveEntity.objects.filter(id__in=structure_owner_ids).values_list(
+            "id", flat=True
         )
-        return None, False
-
-    system = SolarSystem.objects.get(id=structure.solar_system_id)
-
-    if not system:
-        logger.debug("Failed to get Solar System: %s", system)
-        return None, False
-
-    logger.debug("Fetched Structure: %s", structure.name)
-
-    if existing:
-        existing.name = structure.name
-        existing.eve_solar_system = system
-        existing.eve_type_id = structure.type_id
-        existing.owner_id = structure.owner_id
-        return existing, False
-
-    return (
-        Location(
-            id=parent_id,
-            name=structure.name,
-            eve_solar_system_id=structure.solar_system_id,
-            eve_type_id=structure.type_id,
-            owner_id=structure.owner_id,
-        ),
-        False,
     )
+    if structure_owner_ids - owner_ids:
+        EveEntity.objects.create_bulk_from_esi(list(structure_owner_ids - owner_ids))
+        owner_ids = set(
+            EveEntity.objects.filter(id__in=structure_owner_ids).values_list(
+                "id", flat=True
+            )
+        )
+    updated_at = timezone.now()
+    for location in updated:
+        if location.owner_id not in owner_ids:
+            location.owner_id = None
+        location.updated_at = updated_at
+
+    Location.objects.bulk_update(
+        updated,
+        ["name", "eve_solar_system", "eve_type", "owner", "updated_at"],
+        batch_size=ASSETS_BULK_BATCH_SIZE,
+    )
+    Location.objects.update_hierarchy([location.id for location in updated])
+    return len(updated) + len(set(station_ids) - set(stations)), limit_exceeded
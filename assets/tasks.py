@@ -2,33 +2,48 @@
 
 # Standard Library
 import datetime
+import random
+import zlib
+from contextlib import contextmanager
 
 # Third Party
 from celery import shared_task
 
 # Django
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
 from django.utils import timezone
 
 # Alliance Auth
-from allianceauth.eveonline.models import Token
 from allianceauth.services.tasks import QueueOnce
-from esi.exceptions import HTTPNotModified
-
-# Alliance Auth (External Libs)
-from eve_sde.models.types import ItemType
 
 # AA Assets
-from assets import __title__, contexts
+from assets import __title__
 from assets.app_settings import (
     ASSETS_CACHE_KEY,
+    ASSETS_LOCATION_BATCH_SIZE,
     ASSETS_TASKS_TIME_LIMIT,
+    ASSETS_UPDATE_MAX_CONCURRENT,
     ASSETS_UPDATE_PERIOD,
 )
 from assets.constants import STANDARD_FLAG
+from assets.helpers.cache import CACHE_NAMESPACES, clear_cache_namespace
 from assets.hooks import get_extension_logger
-from assets.models import Assets, Location, Owner
-from assets.providers import AppLogger, esi
-from assets.task_helpers.location_helpers import fetch_location, fetch_parent_location
+from assets.models import (
+    AssetLocationSummary,
+    Assets,
+    Location,
+    Owner,
+    Request,
+    RequestAssets,
+)
+from assets.providers import AppLogger, retry_task_on_esi_error
+from assets.task_helpers.location_helpers import (
+    fetch_location,
+    get_structure_access,
+    order_structure_characters,
+    resolve_locations,
+)
 
 logger = AppLogger(get_extension_logger(__name__), __title__)
 
@@ -46,54 +61,179 @@ TASK_DEFAULTS = {
 TASK_DEFAULTS_ONCE = {**TASK_DEFAULTS, **{"base": QueueOnce}}
 
 
+def get_update_slot_start(owner_pk: int, now: datetime.datetime) -> datetime.datetime:
+    """Return the start of the latest update slot of an owner.
+
+    Every owner has a fixed offset within `ASSETS_UPDATE_PERIOD` from a hash of
+    its primary key, this spreads the updates evenly over the period.
+    """
+    period = ASSETS_UPDATE_PERIOD * 60
+    offset = zlib.crc32(str(owner_pk).encode()) % period
+    timestamp = int(now.timestamp())
+    return datetime.datetime.fromtimestamp(
+        timestamp - (timestamp - offset) % period, tz=datetime.timezone.utc
+    )
+
+
+@contextmanager
+def update_slot(task):
+    """Hold one of the `ASSETS_UPDATE_MAX_CONCURRENT` update slots of the worker.
+
+    When all slots are taken the task is queued again with a countdown instead of
+    a retry, waiting does not use up `max_retries`. Yields whether a slot is held.
+    The requeued task is not protected by its QueueOnce lock, see `owner_update_lock`.
+    """
+    prefix = f"{ASSETS_CACHE_KEY}-update-slot-{task.request.hostname}"
+    for slot in range(ASSETS_UPDATE_MAX_CONCURRENT):
+        key = f"{prefix}-{slot}"
+        if cache.add(key, 1, ASSETS_TASKS_TIME_LIMIT):
+            break
+    else:
+        countdown = random.randint(30, 90)
+        logger.debug("All update slots taken - Queued again in %s seconds", countdown)
+        # Release the lock of the running task so it can be queued again
+        task.once_backend.clear_lock(
+            task.get_key(args=task.request.args, kwargs=task.request.kwargs)
+        )
+        task.apply_async(
+            args=task.request.args,
+            kwargs=task.request.kwargs,
+            countdown=countdown,
+            priority=(task.request.delivery_info or {}).get("priority"),
+        )
+        yield False
+        return
+
+    try:
+        yield True
+    finally:
+        cache.delete(key)
+
+
+@contextmanager
+def owner_update_lock(owner_pk: int):
+    """Hold the update lock of an owner, yields whether the lock is held.
+
+    A requeued update loses its QueueOnce lock when the requeuing task returns,
+    this lock keeps two updates of the same owner from running at the same time.
+    """
+    key = f"{ASSETS_CACHE_KEY}-owner-update-{owner_pk}"
+    if not cache.add(key, 1, ASSETS_TASKS_TIME_LIMIT):
+        yield False
+        return
+
+    try:
+        yield True
+    finally:
+        cache.delete(key)
+
+
 @shared_task(**TASK_DEFAULTS_ONCE)
 def update_all_assets(runs: int = 0, force_refresh=False):
-    """Update all assets."""
+    """Update the assets of all owners that missed their update slot."""
     owners = Owner.objects.filter(is_active=True)
-    skip_date = timezone.now() - datetime.timedelta(minutes=ASSETS_UPDATE_PERIOD)
+    now = timezone.now()
+
+    # Owners with open requests are updated first
+    requested_owners = set(
+        Assets.objects.filter(
+            pk__in=RequestAssets.objects.filter(
+                request__status=Request.STATUS_OPEN
+            ).values("asset_pk")
+        ).values_list("owner_id", flat=True)
+    )
 
     for owner in owners:
-        if owner.last_update <= skip_date or force_refresh:
+        if owner.last_update < get_update_slot_start(owner.pk, now) or force_refresh:
             update_assets_for_owner.apply_async(
                 kwargs={"owner_pk": owner.pk, "force_refresh": force_refresh},
-                priority=6,
+                priority=5 if owner.pk in requested_owners else 6,
             )
             runs = runs + 1
-    logger.info("Queued %s Assets Updates", len(owners))
+    logger.info("Queued %s/%s Assets Updates", runs, len(owners))
 
 
-@shared_task(**TASK_DEFAULTS_ONCE)
-def update_assets_for_owner(owner_pk: int, force_refresh=False):
+@shared_task(bind=True, **TASK_DEFAULTS_ONCE)
+def update_assets_for_owner(self, owner_pk: int, force_refresh=False):
     """Fetch all assets for an owner from ESI."""
     owner = Owner.objects.get(pk=owner_pk)
-    owner.update_assets_esi(force_refresh=force_refresh)
+    with owner_update_lock(owner_pk) as has_lock:
+        if not has_lock:
+            logger.debug("Assets of %s are already being updated", owner)
+            return
+        with update_slot(self) as has_slot:
+            if not has_slot:
+                return
+            with retry_task_on_esi_error(self):
+                owner.update_assets_esi(force_refresh=force_refresh)
+
+
+@shared_task(**TASK_DEFAULTS_ONCE)
+def update_market_prices():
+    """Update the market prices of all item types in assets."""
+    type_ids = list(Assets.objects.values_list("eve_type_id", flat=True).distinct())
+    prices = Assets.objects.update_or_create_prices(type_ids)
+    logger.info("Updated %s/%s Market Prices", len(prices), len(type_ids))
+    count = Assets.objects.update_prices()
+    logger.info("Updated the price of %s assets", count)
+    # Location values depend on the market prices
+    for owner in Owner.objects.all():
+        AssetLocationSummary.objects.refresh_owner(owner)
 
 
 @shared_task(**TASK_DEFAULTS_ONCE)
 def update_all_locations(force_refresh=False, runs: int = 0):
-    """Update all locations."""
+    """Update all locations of assets in batches."""
     skip_date = timezone.now() - datetime.timedelta(days=7)
 
-    assets_loc_ids = list(
-        Assets.objects.filter(location_flag__in=STANDARD_FLAG).values_list(
-            "location_id", flat=True
+    # Offices and containers are assets themselves and have no ESI location
+    locations = Location.objects.filter(
+        id__in=Assets.objects.filter(location_flag__in=STANDARD_FLAG).values(
+            "location_id"
         )
-    )
+    ).exclude(Exists(Assets.objects.filter(item_id=OuterRef("id"))))
+    if not force_refresh:
+        locations = locations.filter(Q(updated_at__lte=skip_date) | Q(name=""))
+
+    location_ids = []
+    count = 0
+    for location_id in locations.values_list("id", flat=True).iterator():
+        location_ids.append(location_id)
+        if len(location_ids) >= ASSETS_LOCATION_BATCH_SIZE:
+            update_locations.apply_async(
+                args=[location_ids], kwargs={"force_refresh": force_refresh}, priority=8
+            )
+            count += len(location_ids)
+            runs = runs + 1
+            location_ids = []
+    if location_ids:
+        update_locations.apply_async(
+            args=[location_ids], kwargs={"force_refresh": force_refresh}, priority=8
+        )
+        count += len(location_ids)
+        runs = runs + 1
+    logger.debug("Queued %s Location Tasks for %s Locations", runs, count)
 
-    location_ids = list(
-        Location.objects.filter(
-            updated_at__lte=skip_date, id__in=set(assets_loc_ids)
-        ).values_list("id", flat=True)
-    )
 
-    all_locations = set(assets_loc_ids + location_ids)
+@shared_task(**TASK_DEFAULTS_ONCE)
+def load_sde_locations():
+    """Create or update all solar system and NPC station locations from the SDE."""
+    count = Location.objects.load_sde_locations()
+    logger.info("Loaded %s Locations from SDE", count)
+
 
-    for location in all_locations:
-        update_location.apply_async(
-            args=[location], kwargs={"force_refresh": force_refresh}, priority=8
+@shared_task(bind=True, **TASK_DEFAULTS_ONCE)
+def update_locations(self, location_ids: list[int], force_refresh=False):
+    """Resolve a batch of locations and save them in bulk."""
+    with retry_task_on_esi_error(self):
+        count, limit_exceeded = resolve_locations(
+            location_ids, force_refresh=force_refresh
         )
-        runs = runs + 1
-    logger.debug("Queued %s/%s Structure Tasks", runs, len(all_locations))
+    logger.debug("Updated %s/%s Locations", count, len(location_ids))
+
+    if limit_exceeded:
+        logger.debug("ESI limit exceeded when fetching Locations - Retry Later")
+        raise self.retry(countdown=300)
 
 
 @shared_task(bind=True, **TASK_DEFAULTS_ONCE)
@@ -116,6 +256,7 @@ def update_location(self, location_id, force_refresh=False):
         )
         if location is not None:
             location.save()
+            Location.objects.update_hierarchy([location.id])
             count = Assets.objects.filter(
                 location_id=location_id, location__name=""
             ).update(location_id=location_id)
@@ -126,12 +267,15 @@ def update_location(self, location_id, force_refresh=False):
         logger.debug("No Characters for Location ID: %s", location_id)
         return
 
-    for char_id in char_ids:
+    access = get_structure_access({(location_id, char_id) for char_id in char_ids})
+    limit_exceeded = False
+    for char_id in order_structure_characters(location_id, char_ids, access):
         location, limit_exceeded = fetch_location(
             location_id, None, char_id, force_refresh=force_refresh
         )
         if location is not None:
             location.save()
+            Location.objects.update_hierarchy([location.id])
             count = Assets.objects.filter(
                 location_id=location_id, location__name=""
             ).update(location_id=location_id)
@@ -151,141 +295,28 @@ def update_location(self, location_id, force_refresh=False):
 
 
 @shared_task(**TASK_DEFAULTS_ONCE)
-def update_all_parent_locations(force_refresh=False):
-    assets = Assets.objects.all().select_related("owner__character__character")
-
-    owners = Owner.objects.filter(is_active=True)
-
-    if not owners.exists():
-        logger.debug("No Characters found skip Update")
-        return
+def update_all_parent_locations():
+    """Link all container locations to their parent from the stored assets."""
+    count = Location.objects.update_parents_from_assets()
+    logger.debug("Updated %s Parent Locations", count)
 
-    asset_ids = []
-    asset_locations = {}
-    assets_by_id = {}
-
-    count = 0
-    for owner in owners:
-        owner_id = owner.character.character.character_id
-        try:
-            if owner.corporation is None:
-                req_scopes = [
-                    "esi-universe.read_structures.v1",
-                    "esi-assets.read_assets.v1",
-                ]
-                token = Token.get_token(owner_id, req_scopes)
-                assets_esi = esi.client.Assets.GetCharactersCharacterIdAssets(
-                    character_id=owner.character.character.character_id,
-                    token=token,
-                )
-                assets, response = assets_esi.results(
-                    return_response=True,
-                    force_refresh=force_refresh,
-                )
-                logger.debug("Response Status: %s", response.status_code)
-            else:
-                req_scopes = [
-                    "esi-universe.read_structures.v1",
-                    "esi-assets.read_corporation_assets.v1",
-                ]
-                token = Token.get_token(owner_id, req_scopes)
-
-                assets_esi = esi.client.Assets.GetCorporationsCorporationIdAssets(
-                    corporation_id=owner.corporation.corporation_id,
-                    token=token,
-                )
-
-                assets, response = assets_esi.results(
-                    return_response=True,
-                    force_refresh=force_refresh,
-                )
-                logger.debug("Response Status: %s", response.status_code)
-        except HTTPNotModified:
-            logger.debug("No Updates for: %s", owner.name)
-            continue
-
-        # Collect all location ids
-        for asset in assets:
-            asset: contexts.GetAssetsContext
-
-            asset_ids.append(asset.item_id)
-            assets_by_id[asset.item_id] = asset
-            if asset.location_id in asset_ids:
-                location_id = asset.location_id
-                asset_locations[location_id] = [asset.item_id]
-
-        # Update all parent locations
-        for location_id in asset_locations:
-            asset = assets_by_id[location_id]
-            parent_id = asset.location_id
-            eve_type = asset.type_id
-
-            update_parent_location.apply_async(
-                args=[location_id, parent_id, owner_id, eve_type],
-                kwargs={"force_refresh": force_refresh},
-                priority=8,
-            )
-            count += 1
-
-    logger.debug("Queued %s Parent Locations Updated Tasks", count)
-    return
-
-
-# pylint: disable=too-many-positional-arguments
-@shared_task(bind=True, **TASK_DEFAULTS_ONCE)
-def update_parent_location(
-    self, location_id, parent_id, character_id, eve_type_id, force_refresh=False
-):
-    parent_check = Location.objects.get(id=location_id)
 
-    if parent_check.parent is not None:
-        logger.debug("Location ID: %s Already has Parent ID", location_id)
-        return
-
-    parent, limit_exceeded = fetch_parent_location(
-        parent_id, character_id, force_refresh=force_refresh
+@shared_task(base=QueueOnce)
+def clear_all_etags():
+    """Delete all cached ETags of this app."""
+    clear_cache_namespace(
+        "etags",
+        progress=lambda deleted: logger.info("Deleted %s etag keys so far", deleted),
     )
-    if parent is not None:
-        eve_type = ItemType.objects.get(id=eve_type_id)
-        Location.objects.update_or_create(
-            id=location_id,
-            defaults={
-                "parent": parent,
-                "eve_type": eve_type,
-            },
-        )
-        logger.debug("Parent Location: %s Updated for %s", parent_id, location_id)
-        return
-    if limit_exceeded:
-        logger.debug(
-            "ESI limit exceeded when fetching Parent Location: %s - Retry Later",
-            parent_id,
-        )
-        self.retry(countdown=300)
-    logger.debug("Parent Location Task: %s Complete", location_id)
-    return
 
 
-@shared_task(base=QueueOnce)
-def clear_all_etags():
-    logger.debug("Clearing all etags")
-    try:
-        # Third Party
-        # pylint: disable=import-outside-toplevel
-        from django_redis import get_redis_connection
-
-        _client = get_redis_connection("default")
-    except (NotImplementedError, ModuleNotFoundError):
-        # Django
-        # pylint: disable=import-outside-toplevel
-        from django.core.cache import caches
-
-        default_cache = caches["default"]
-        _client = default_cache.get_master_client()
-    keys = _client.keys(f":?:{ASSETS_CACHE_KEY}-*")
-    logger.info("Deleting %s etag keys", len(keys))
-    if keys:
-        deleted = _client.delete(*keys)
-        logger.info("Deleted %s etag keys", deleted)
-    else:
-        logger.info("No etag keys to delete")
+@shared_task(**TASK_DEFAULTS_ONCE)
+def clear_cache(namespaces: list[str] | None = None):
+    """Delete all keys of the given cache namespaces, all namespaces by default."""
+    for namespace in namespaces or CACHE_NAMESPACES:
+        clear_cache_namespace(
+            namespace,
+            progress=lambda deleted, namespace=namespace: logger.info(
+                "Deleted %s %s keys so far", deleted, namespace
+            ),
+        )
@@ -0,0 +1,224 @@
+# Django
+from django.http import QueryDict
+
+# Alliance Auth (External Libs)
+from eve_sde.models.types import ItemType
+
+# AA Assets
+from assets.api.assets.helper import annotate_available_assets, apply_datatables
+from assets.api.helpers import can_view_location, get_asset
+from assets.models import Assets, Location, MarketPrice, Request, RequestAssets
+from assets.tests import AssetsTestCase
+from assets.tests.testdata.utils import create_owner_from_user
+
+
+class TestAssetsDataTables(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.location = Location.objects.create(id=60003760, name="Jita IV - Moon 4")
+        cls.owner = create_owner_from_user(cls.user)
+        cls.types = ItemType.objects.bulk_create(
+            [
+                ItemType(id=34, name="Tritanium"),
+                ItemType(id=35, name="Pyerite"),
+                ItemType(id=36, name="Mexallon"),
+            ]
+        )
+        cls.assets = Assets.objects.bulk_create(
+            [
+                Assets(
+                    item_id=eve_type.id,
+                    owner=cls.owner,
+                    eve_type=eve_type,
+                    location=cls.location,
+                    root_location=cls.location,
+                    location_flag=Assets.LocationFlag.HANGAR,
+                    location_type="station",
+                    quantity=10 * (i + 1),
+                    singleton=False,
+                    price=1.0,
+                )
+                for i, eve_type in enumerate(cls.types)
+            ]
+        )
+        MarketPrice.objects.create(eve_type_id=35, price=2.0)
+
+    def _query(self, **params) -> list[Assets]:
+        queryset = annotate_available_assets(
+            Assets.objects.filter(location_id=self.location.id)
+        )
+        query = QueryDict(mutable=True)
+        query.update(
+            {"columns[0][data]": "name", "columns[1][data]": "price", **params}
+        )
+        page, total, filtered, _ = apply_datatables(queryset, query)
+        return list(page), total, filtered
+
+    def test_should_page_and_order_in_sql(self):
+        """
+        Test DataTables paging and ordering.
+
+        ### Expected Result
+        - Only the requested page is returned in the requested order.
+        """
+        # Test Action
+        with self.assertNumQueries(2):
+            page, total, filtered = self._query(
+                **{
+                    "order[0][column]": "0",
+                    "order[0][dir]": "asc",
+                    "start": "1",
+                    "length": "1",
+                }
+            )
+
+        # Expected Results
+        self.assertEqual([asset.eve_type.name for asset in page], ["Pyerite"])
+        self.assertEqual(total, 3)
+        self.assertEqual(filtered, 3)
+
+    def test_should_search_and_use_market_price(self):
+        """
+        Test DataTables search and price calculation.
+
+        ### Expected Result
+        - Assets are filtered by type name.
+        - Total price uses the stored market price.
+        """
+        # Test Action
+        page, total, filtered = self._query(**{"search[value]": "pyer"})
+
+        # Expected Results
+        self.assertEqual(total, 3)
+        self.assertEqual(filtered, 1)
+        self.assertEqual(page[0].total_price, 40.0)
+
+    def test_should_search_location_flag_labels(self):
+        """
+        Test DataTables search on the displayed location flag.
+
+        ### Expected Result
+        - Assets are found by the flag label instead of the stored value.
+        """
+        # Test Data
+        Assets.objects.filter(pk=self.assets[0].pk).update(
+            location_flag=Assets.LocationFlag.CORP_S_A_G_1
+        )
+
+        # Test Action
+        page, _, filtered = self._query(
+            **{"search[value]": str(Assets.LocationFlag.CORP_S_A_G_1.label)}
+        )
+
+        # Expected Results
+        self.assertEqual(filtered, 1)
+        self.assertEqual(page[0].pk, self.assets[0].pk)
+
+    def test_should_ignore_invalid_draw(self):
+        """
+        Test the DataTables draw counter.
+
+        ### Expected Result
+        - A numeric draw counter is returned.
+        - A non-numeric draw counter falls back to zero.
+        """
+        # Test Data
+        queryset = annotate_available_assets(Assets.objects.all())
+
+        # Test Action
+        *_, draw = apply_datatables(queryset, QueryDict("draw=3"))
+        *_, invalid_draw = apply_datatables(queryset, QueryDict("draw=abc"))
+
+        # Expected Results
+        self.assertEqual(draw, 3)
+        self.assertEqual(invalid_draw, 0)
+
+    def test_should_exclude_reserved_assets(self):
+        """
+        Test available quantity of reserved assets.
+
+        ### Expected Result
+        - Fully reserved assets are excluded.
+        - Partly reserved assets have a reduced quantity.
+        """
+        # Test Data
+        for asset, quantity in ((self.assets[0], 10), (self.assets[1], 5)):
+            request = Request.objects.create(
+                requesting_user=self.user, status=Request.STATUS_OPEN
+            )
+            RequestAssets.objects.create(
+                name=asset.eve_type.name,
+                request=request,
+                asset_pk=asset.pk,
+                asset_location_id=asset.location_id,
+                asset_location_flag=asset.location_flag,
+                eve_type=asset.eve_type,
+                quantity=quantity,
+            )
+
+        # Test Action
+        page, total, _ = self._query(**{"order[0][column]": "1"})
+
+        # Expected Results
+        self.assertEqual(total, 2)
+        self.assertEqual(
+            {asset.eve_type_id: asset.available_quantity for asset in page},
+            {35: 15, 36: 30},
+        )
+
+
+class TestAccessChecks(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.location = Location.objects.create(id=60003760, name="Jita IV - Moon 4")
+        cls.owner = create_owner_from_user(cls.user)
+        eve_type = ItemType.objects.create(id=34, name="Tritanium")
+        Assets.objects.create(
+            item_id=1,
+            owner=cls.owner,
+            eve_type=eve_type,
+            location=cls.location,
+            root_location=cls.location,
+            location_flag=Assets.LocationFlag.HANGAR,
+            location_type="station",
+            quantity=1,
+            singleton=False,
+        )
+
+    def test_can_view_location_should_check_once_per_request(self):
+        """
+        Test checking the location access of a user.
+
+        ### Expected Result
+        - Access is checked once and cached on the request.
+        """
+        # Test Data
+        request = self.factory.get("/")
+        request.user = self.user
+
+        # Test Action
+        self.assertTrue(can_view_location(request, self.location.id))
+
+        # Expected Results
+        with self.assertNumQueries(0):
+            self.assertTrue(can_view_location(request, self.location.id))
+
+    def test_can_view_location_should_deny_other_users(self):
+        """
+        Test checking the location access of a user without visible assets.
+
+        ### Expected Result
+        - Access is denied and no assets are returned.
+        """
+        # Test Data
+        request = self.factory.get("/")
+        request.user = self.user2
+
+        # Test Action
+        perms, assets = get_asset(request, self.location.id)
+
+        # Expected Results
+        self.assertFalse(perms)
+        self.assertFalse(assets.exists())
@@ -0,0 +1,51 @@
+# Standard Library
+from unittest.mock import MagicMock, patch
+
+# Django
+from django.test import TestCase
+
+# AA Assets
+from assets.helpers.cache import clear_cache_namespace
+
+MODULE_PATH = "assets.helpers.cache"
+
+
+@patch(MODULE_PATH + ".get_redis_client")
+class TestClearCacheNamespace(TestCase):
+    def test_should_unlink_keys_in_batches(self, mock_get_client):
+        """
+        Test clearing a cache namespace.
+
+        ### Expected Result
+        - Keys are found with SCAN instead of KEYS.
+        - Keys are deleted in batches with UNLINK and progress is reported.
+        """
+        # Test Data
+        client = MagicMock()
+        client.scan_iter.return_value = iter([f"key-{i}" for i in range(5)])
+        pipeline = client.pipeline.return_value
+        pipeline.execute.side_effect = lambda: [1] * len(pipeline.unlink.call_args[0])
+        mock_get_client.return_value = client
+        progress = MagicMock()
+
+        # Test Action
+        deleted = clear_cache_namespace("etags", batch_size=2, progress=progress)
+
+        # Expected Results
+        self.assertEqual(deleted, 5)
+        client.keys.assert_not_called()
+        client.delete.assert_not_called()
+        self.assertEqual(pipeline.unlink.call_count, 3)
+        self.assertEqual([call.args[0] for call in progress.call_args_list], [2, 4, 5])
+        self.assertIn("etag", client.scan_iter.call_args.kwargs["match"])
+
+    def test_should_reject_unknown_namespaces(self, _):
+        """
+        Test clearing a namespace that does not exist.
+
+        ### Expected Result
+        - KeyError is raised.
+        """
+        # Test Action & Expected Results
+        with self.assertRaises(KeyError):
+            clear_cache_namespace("unknown")
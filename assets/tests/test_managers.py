@@ -0,0 +1,824 @@
+# Standard Library
+import datetime as dt
+from unittest.mock import Mock, patch
+
+# Django
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+# Alliance Auth (External Libs)
+from eve_sde.models.map import NPCStation, SolarSystem
+from eve_sde.models.types import ItemType
+
+# AA Assets
+from assets.managers import (
+    build_asset_tree,
+    get_market_prices,
+    get_upsert_options,
+    set_market_prices_cache,
+)
+from assets.models import (
+    AssetEvent,
+    AssetLocationSummary,
+    Assets,
+    AssetSearchIndex,
+    AssetSearchToken,
+    AssetSnapshot,
+    Location,
+    MarketPrice,
+)
+from assets.tests import AssetsTestCase
+from assets.tests.testdata.utils import create_owner_from_user
+
+MODULE_PATH = "assets.managers"
+
+
+def make_fuzzwork_response(prices: dict) -> Mock:
+    """Create a Fuzzwork aggregates response for the given prices."""
+    response = Mock()
+    response.json.return_value = {
+        str(type_id): {"buy": {"max": str(price)}} for type_id, price in prices.items()
+    }
+    return response
+
+
+class TestUpsertOptions(TestCase):
+    def test_should_upsert_on_unique_fields(self):
+        """
+        Test the upsert options on a backend with conflict targets.
+
+        ### Expected Result
+        - The unique fields are the conflict target.
+        """
+        # Test Action
+        with patch.object(
+            connection.features, "supports_update_conflicts_with_target", True
+        ):
+            options = get_upsert_options("default", ["owner", "item_id"], ["price"])
+
+        # Expected Results
+        self.assertEqual(
+            options,
+            {
+                "update_conflicts": True,
+                "update_fields": ["price"],
+                "unique_fields": ["owner", "item_id"],
+            },
+        )
+
+    def test_should_leave_out_unique_fields_on_mysql(self):
+        """
+        Test the upsert options on a backend without conflict targets.
+
+        ### Expected Result
+        - No unique fields are given.
+        """
+        # Test Action
+        with patch.object(
+            connection.features, "supports_update_conflicts_with_target", False
+        ):
+            options = get_upsert_options("default", ["owner", "item_id"], ["price"])
+
+        # Expected Results
+        self.assertEqual(
+            options, {"update_conflicts": True, "update_fields": ["price"]}
+        )
+
+
+@patch(MODULE_PATH + ".requests.get")
+class TestAssetsPrices(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ItemType.objects.bulk_create(
+            [ItemType(id=type_id, name=f"Type {type_id}") for type_id in range(1, 6)]
+            + [ItemType(id=34, name="Tritanium"), ItemType(id=35, name="Pyerite")]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_get_prices_should_only_fetch_missing_prices(self, mock_get):
+        """
+        Test getting prices when some prices are cached.
+
+        ### Expected Result
+        - Only missing prices are requested from Fuzzwork.
+        - Fetched prices are cached.
+        """
+        # Test Data
+        set_market_prices_cache({34: 5.0})
+        mock_get.return_value = make_fuzzwork_response({35: 10.0})
+
+        # Test Action
+        prices = Assets.objects.get_prices([34, 35])
+
+        # Expected Results
+        self.assertEqual(prices, {34: 5.0, 35: 10.0})
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertIn("types=35", mock_get.call_args.kwargs["url"])
+        self.assertEqual(get_market_prices([35]), {35: 10.0})
+        self.assertEqual(MarketPrice.objects.get(eve_type_id=35).price, 10.0)
+
+    def test_get_prices_should_use_stored_prices(self, mock_get):
+        """
+        Test getting prices when the cache is empty but prices are stored.
+
+        ### Expected Result
+        - Stored prices are returned without requesting Fuzzwork.
+        - Stored prices are cached again.
+        """
+        # Test Data
+        MarketPrice.objects.create(eve_type_id=34, price=5.0)
+
+        # Test Action
+        prices = Assets.objects.get_prices([34])
+
+        # Expected Results
+        self.assertEqual(prices, {34: 5.0})
+        mock_get.assert_not_called()
+        self.assertEqual(get_market_prices([34]), {34: 5.0})
+
+    def test_update_or_create_prices_should_update_stored_prices(self, mock_get):
+        """
+        Test updating prices that are already stored.
+
+        ### Expected Result
+        - Stored price is updated in place.
+        """
+        # Test Data
+        MarketPrice.objects.create(eve_type_id=34, price=5.0)
+        mock_get.return_value = make_fuzzwork_response({34: 6.0})
+
+        # Test Action
+        Assets.objects.update_or_create_prices([34])
+
+        # Expected Results
+        self.assertEqual(MarketPrice.objects.get(eve_type_id=34).price, 6.0)
+        self.assertEqual(MarketPrice.objects.count(), 1)
+
+    @patch(MODULE_PATH + ".MARKET_PRICE_CHUNK_SIZE", 2)
+    def test_get_prices_should_fetch_in_chunks(self, mock_get):
+        """
+        Test getting prices for more items than fit in one request.
+
+        ### Expected Result
+        - Prices are requested in chunks.
+        """
+        # Test Data
+        mock_get.return_value = make_fuzzwork_response(
+            {type_id: 1.0 for type_id in range(1, 6)}
+        )
+
+        # Test Action
+        prices = Assets.objects.get_prices(list(range(1, 6)))
+
+        # Expected Results
+        self.assertEqual(len(prices), 5)
+        self.assertEqual(mock_get.call_count, 3)
+
+
+class TestLocationHierarchy(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.solar_system = SolarSystem.objects.create(id=30000142, name="Jita")
+
+    def test_should_resolve_deep_hierarchy(self):
+        """
+        Test resolving a location nested deeper than three levels.
+
+        ### Expected Result
+        - Name, solar system and root are taken from the top most parent.
+        """
+        # Test Data
+        structure = Location.objects.create(
+            id=1_030_000_000_000,
+            name="Jita Keepstar",
+            eve_solar_system=self.solar_system,
+        )
+        parent = structure
+        for item_id in range(1, 6):
+            parent = Location.objects.create(id=item_id, parent=parent)
+
+        # Test Action
+        Location.objects.update_hierarchy([structure.id])
+        location = (
+            Location.objects.annotate_location_name().annotate_system_name().get(id=5)
+        )
+
+        # Expected Results
+        self.assertEqual(location.location_name, "Jita Keepstar")
+        self.assertEqual(location.system_name, "Jita")
+        self.assertEqual(location.root_id, structure.id)
+
+    def test_should_update_children_when_parent_changes(self):
+        """
+        Test changing the parent of a location with children.
+
+        ### Expected Result
+        - Children resolve to the new parent.
+        """
+        # Test Data
+        old_structure = Location.objects.create(id=1_030_000_000_001, name="Old")
+        new_structure = Location.objects.create(id=1_030_000_000_002, name="New")
+        container = Location.objects.create(id=1, parent=old_structure)
+        Location.objects.create(id=2, parent=container)
+
+        # Test Action
+        container.parent = new_structure
+        container.save()
+        Location.objects.update_hierarchy([container.id])
+
+        # Expected Results
+        child = Location.objects.get(id=2)
+        self.assertEqual(child.resolved_name, "New")
+        self.assertEqual(child.root_id, new_structure.id)
+
+
+class TestBuildAssetTree(TestCase):
+    def test_should_resolve_nested_assets(self):
+        """
+        Test resolving assets nested in ships and containers.
+
+        ### Expected Result
+        - Every asset resolves to the station with its parent and depth.
+        """
+        # Test Data
+        station = 60003760
+        locations = {3: 2, 1: station, 2: 1, 4: station}
+
+        # Test Action
+        tree = build_asset_tree(locations)
+
+        # Expected Results
+        self.assertEqual(
+            tree,
+            {
+                1: (None, station, 0),
+                2: (1, station, 1),
+                3: (2, station, 2),
+                4: (None, station, 0),
+            },
+        )
+
+    def test_should_stop_on_cycles(self):
+        """
+        Test resolving assets that are located in each other.
+
+        ### Expected Result
+        - Tree is resolved without an endless loop.
+        """
+        # Test Action
+        tree = build_asset_tree({1: 2, 2: 1})
+
+        # Expected Results
+        self.assertEqual(set(tree), {1, 2})
+
+
+class TestLocationParents(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.ship_type = ItemType.objects.create(id=587, name="Rifter")
+        cls.container_type = ItemType.objects.create(id=3467, name="Small Container")
+        cls.owner = create_owner_from_user(cls.user)
+
+    def _asset(self, item_id: int, location: Location, eve_type: ItemType) -> Assets:
+        return Assets.objects.create(
+            item_id=item_id,
+            owner=self.owner,
+            eve_type=eve_type,
+            location=location,
+            location_flag=Assets.LocationFlag.HANGAR,
+            location_type="item",
+            quantity=1,
+            singleton=True,
+        )
+
+    def test_should_link_containers_from_stored_assets(self):
+        """
+        Test deriving parent locations from the stored assets.
+
+        ### Expected Result
+        - Containers are linked to the location of their asset.
+        - Nested containers resolve to the structure.
+        """
+        # Test Data
+        structure = Location.objects.create(id=1_030_000_000_000, name="Keepstar")
+        ship = Location.objects.create(id=1)
+        container = Location.objects.create(id=2)
+        self._asset(1, structure, self.ship_type)
+        self._asset(2, ship, self.container_type)
+        self._asset(3, container, self.container_type)
+
+        # Test Action
+        with patch(MODULE_PATH + ".ASSETS_BULK_BATCH_SIZE", 1):
+            count = Location.objects.update_parents_from_assets(self.owner)
+
+        # Expected Results
+        self.assertEqual(count, 2)
+        ship.refresh_from_db()
+        container.refresh_from_db()
+        self.assertEqual(ship.parent_id, structure.id)
+        self.assertEqual(ship.eve_type_id, self.ship_type.id)
+        self.assertEqual(container.parent_id, ship.id)
+        self.assertEqual(container.root_id, structure.id)
+        self.assertEqual(container.resolved_name, "Keepstar")
+        self.assertEqual(Location.objects.update_parents_from_assets(self.owner), 0)
+
+
+class TestAssetLocationSummary(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tritanium = ItemType.objects.create(id=34, name="Tritanium")
+        cls.station = Location.objects.create(id=60003760, name="Jita IV - Moon 4")
+        cls.owner = create_owner_from_user(cls.user)
+
+    def _asset(self, item_id: int, quantity: int, price: float | None) -> Assets:
+        return Assets.objects.create(
+            item_id=item_id,
+            owner=self.owner,
+            eve_type=self.tritanium,
+            location=self.station,
+            root_location=self.station,
+            location_flag=Assets.LocationFlag.HANGAR,
+            location_type="station",
+            quantity=quantity,
+            singleton=False,
+            price=price,
+        )
+
+    def test_refresh_owner_should_summarize_assets(self):
+        """
+        Test refreshing the location summaries of an owner.
+
+        ### Expected Result
+        - Assets are summarized per location and flag.
+        - Summaries of locations without assets are removed.
+        """
+        # Test Data
+        self._asset(1, 10, 5.0)
+        self._asset(2, 20, None)
+        other = Location.objects.create(id=60008494, name="Amarr VIII")
+        AssetLocationSummary.objects.create(
+            owner=self.owner, location=other, location_flag="Hangar", item_count=1
+        )
+
+        # Test Action
+        count = AssetLocationSummary.objects.refresh_owner(self.owner)
+
+        # Expected Results
+        self.assertEqual(count, 1)
+        summary = AssetLocationSummary.objects.get(owner=self.owner)
+        self.assertEqual(summary.location_id, self.station.id)
+        self.assertEqual(summary.item_count, 2)
+        self.assertEqual(summary.total_quantity, 30)
+        self.assertEqual(summary.total_value, 50.0)
+
+    def test_refresh_owner_should_use_market_prices(self):
+        """
+        Test refreshing the location summaries with stored market prices.
+
+        ### Expected Result
+        - Values use the market price over the asset price.
+        """
+        # Test Data
+        self._asset(1, 10, 5.0)
+        MarketPrice.objects.create(eve_type=self.tritanium, price=7.0)
+
+        # Test Action
+        AssetLocationSummary.objects.refresh_owner(self.owner)
+
+        # Expected Results
+        summary = AssetLocationSummary.objects.get(owner=self.owner)
+        self.assertEqual(summary.total_value, 70.0)
+
+    def test_refresh_owner_should_only_refresh_given_locations(self):
+        """
+        Test refreshing the location summaries of a sync.
+
+        ### Expected Result
+        - Only the summaries of the given locations are recalculated.
+        """
+        # Test Data
+        self._asset(1, 10, 5.0)
+        other = Location.objects.create(id=60008494, name="Amarr VIII")
+        AssetLocationSummary.objects.create(
+            owner=self.owner, location=other, location_flag="Hangar", item_count=1
+        )
+
+        # Test Action
+        count = AssetLocationSummary.objects.refresh_owner(
+            self.owner, {(self.station.id, "Hangar")}
+        )
+
+        # Expected Results
+        self.assertEqual(count, 1)
+        self.assertEqual(
+            AssetLocationSummary.objects.filter(owner=self.owner).count(), 2
+        )
+        self.assertEqual(
+            AssetLocationSummary.objects.refresh_owner(self.owner, set()), 0
+        )
+
+
+class TestAssetSearchIndex(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.types = ItemType.objects.bulk_create(
+            [
+                ItemType(id=34, name="Tritanium"),
+                ItemType(id=28606, name="Orca"),
+                ItemType(id=17476, name="Mining  Orca Blueprint"),
+            ]
+        )
+        cls.station = Location.objects.create(id=60003760, name="Jita IV - Moon 4")
+        cls.owner = create_owner_from_user(cls.user)
+        Assets.objects.bulk_create(
+            [
+                Assets(
+                    item_id=item_id,
+                    owner=cls.owner,
+                    eve_type=eve_type,
+                    location=cls.station,
+                    root_location=cls.station,
+                    location_flag=Assets.LocationFlag.HANGAR,
+                    location_type="station",
+                    quantity=10,
+                    singleton=False,
+                )
+                for item_id, eve_type in enumerate(cls.types + cls.types[:1], 1)
+            ]
+        )
+
+    def test_search_should_match_word_prefixes(self):
+        """
+        Test searching the index after refreshing an owner.
+
+        ### Expected Result
+        - Quantities are summed per type and location.
+        - Names starting with the query come before word matches.
+        - Search tokens are created for every word of the type names.
+        """
+        # Test Action
+        count = AssetSearchIndex.objects.refresh_owner(self.owner)
+        result = list(AssetSearchIndex.objects.search(" ORCA").values_list("name"))
+
+        # Expected Results
+        self.assertEqual(count, 3)
+        self.assertEqual(result, [("orca",), ("mining orca blueprint",)])
+        self.assertEqual(
+            AssetSearchIndex.objects.get(eve_type_id=34).quantity,
+            20,
+        )
+        self.assertFalse(AssetSearchIndex.objects.search("rca").exists())
+        self.assertEqual(
+            set(
+                AssetSearchToken.objects.filter(eve_type_id=17476).values_list(
+                    "token", flat=True
+                )
+            ),
+            {"mining orca blueprint", "orca blueprint", "blueprint"},
+        )
+
+    def test_visible_to_should_hide_other_owners(self):
+        """
+        Test searching the index as a user and as a superuser.
+
+        ### Expected Result
+        - User only sees entries of own owners.
+        """
+        # Test Data
+        other_owner = create_owner_from_user(self.superuser)
+        AssetSearchIndex.objects.create(
+            owner=other_owner,
+            location=self.station,
+            eve_type=self.types[0],
+            name="tritanium",
+            quantity=1,
+        )
+        AssetSearchIndex.objects.refresh_owner(self.owner)
+
+        # Test Action
+        result = AssetSearchIndex.objects.visible_to(self.user).search("tri")
+
+        # Expected Results
+        self.assertEqual([entry.owner_id for entry in result], [self.owner.pk])
+        self.assertEqual(
+            AssetSearchIndex.objects.visible_to(self.superuser).search("tri").count(),
+            2,
+        )
+
+
+class TestAssetSnapshot(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tritanium = ItemType.objects.create(id=34, name="Tritanium")
+        cls.station = Location.objects.create(id=60003760, name="Jita IV - Moon 4")
+        cls.owner = create_owner_from_user(cls.user)
+
+    def _sync(self, items: dict[int, tuple[int, float]]) -> AssetSnapshot | None:
+        diff = Assets.objects.sync_owner_assets(
+            self.owner,
+            [
+                Assets(
+                    item_id=item_id,
+                    owner=self.owner,
+                    eve_type=self.tritanium,
+                    location=self.station,
+                    root_location=self.station,
+                    location_flag=Assets.LocationFlag.HANGAR,
+                    location_type="station",
+                    quantity=quantity,
+                    singleton=False,
+                    price=price,
+                )
+                for item_id, (quantity, price) in items.items()
+            ],
+        )
+        return AssetSnapshot.objects.create_from_diff(self.owner, diff)
+
+    def test_should_store_only_changed_assets(self):
+        """
+        Test storing snapshots of asset syncs.
+
+        ### Expected Result
+        - Each snapshot stores the changed assets only.
+        - Price changes alone do not create a snapshot.
+        """
+        # Test Action
+        first = self._sync({1: (10, 5.0), 2: (20, 5.0), 3: (30, 5.0)})
+        second = self._sync({1: (15, 5.0), 2: (20, 5.0), 4: (40, 5.0)})
+        third = self._sync({1: (15, 6.0), 2: (20, 6.0), 4: (40, 6.0)})
+
+        # Expected Results
+        self.assertEqual(first.deltas.count(), 3)
+        self.assertEqual(
+            sorted(second.deltas.values_list("item_id", "action")),
+            [(1, "updated"), (3, "deleted"), (4, "created")],
+        )
+        self.assertIsNone(third)
+
+    def test_should_store_batches_in_one_snapshot(self):
+        """
+        Test storing the changes of a sync published in batches.
+
+        ### Expected Result
+        - All batches are stored in the same snapshot.
+        """
+        # Test Data
+        Assets.objects.stage_owner_assets(
+            self.owner,
+            [
+                Assets(
+                    item_id=item_id,
+                    owner=self.owner,
+                    eve_type=self.tritanium,
+                    location=self.station,
+                    root_location=self.station,
+                    location_flag=Assets.LocationFlag.HANGAR,
+                    location_type="station",
+                    quantity=1,
+                    singleton=False,
+                )
+                for item_id in range(1, 6)
+            ],
+        )
+        snapshots = []
+
+        # Test Action
+        with patch(MODULE_PATH + ".ASSETS_BULK_BATCH_SIZE", 2):
+            Assets.objects.publish_staged_assets(
+                self.owner,
+                on_publish=lambda diff: snapshots.append(
+                    AssetSnapshot.objects.create_from_diff(
+                        self.owner, diff, snapshots[-1] if snapshots else None
+                    )
+                ),
+            )
+
+        # Expected Results
+        snapshot = AssetSnapshot.objects.get(owner=self.owner)
+        self.assertEqual(snapshot.delta_count, 5)
+        self.assertEqual(snapshot.deltas.count(), 5)
+
+    def test_diff_should_combine_snapshots(self):
+        """
+        Test the difference between two snapshots.
+
+        ### Expected Result
+        - Changes of all snapshots in between are combined.
+        - Assets changed back or created and deleted again are left out.
+        - Diffing backwards swaps the states.
+        """
+        # Test Data
+        first = self._sync({1: (10, 5.0), 2: (20, 5.0)})
+        self._sync({1: (15, 5.0), 2: (25, 5.0), 3: (30, 5.0)})
+        last = self._sync({1: (20, 5.0), 2: (20, 5.0)})
+
+        # Test Action
+        changes = AssetSnapshot.objects.diff(self.owner, first.pk, last.pk)
+        backwards = AssetSnapshot.objects.diff(self.owner, last.pk, first.pk)
+
+        # Expected Results
+        self.assertEqual(list(changes), [1])
+        self.assertEqual(changes[1]["before"]["quantity"], 10)
+        self.assertEqual(changes[1]["after"]["quantity"], 20)
+        self.assertEqual(backwards[1]["before"]["quantity"], 20)
+
+    @patch(MODULE_PATH + ".ASSETS_SNAPSHOT_HISTORY", 2)
+    def test_should_keep_snapshot_history(self):
+        """
+        Test removing old snapshots.
+
+        ### Expected Result
+        - Only the newest `ASSETS_SNAPSHOT_HISTORY` snapshots are kept.
+        """
+        # Test Action
+        snapshots = [self._sync({1: (quantity, 5.0)}) for quantity in (1, 2, 3)]
+
+        # Expected Results
+        self.assertQuerySetEqual(
+            AssetSnapshot.objects.filter(owner=self.owner).order_by("pk"),
+            snapshots[1:],
+        )
+
+
+class TestAssetEvent(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tritanium = ItemType.objects.create(id=34, name="Tritanium")
+        cls.station = Location.objects.create(id=60003760, name="Jita IV - Moon 4")
+        cls.owner = create_owner_from_user(cls.user)
+
+    def _sync(self, items: dict[int, tuple[int, float]]) -> int:
+        diff = Assets.objects.sync_owner_assets(
+            self.owner,
+            [
+                Assets(
+                    item_id=item_id,
+                    owner=self.owner,
+                    eve_type=self.tritanium,
+                    location=self.station,
+                    root_location=self.station,
+                    location_flag=Assets.LocationFlag.HANGAR,
+                    location_type="station",
+                    quantity=quantity,
+                    singleton=False,
+                    price=price,
+                )
+                for item_id, (quantity, price) in items.items()
+            ],
+        )
+        return AssetEvent.objects.emit(self.owner, diff)
+
+    def test_emit_should_write_changes_to_outbox(self):
+        """
+        Test emitting the asset events of a sync.
+
+        ### Expected Result
+        - Added, changed and removed assets are written in order.
+        - Price changes alone do not emit events.
+        - Events older than the retention are removed.
+        """
+        # Test Data
+        self._sync({1: (10, 5.0), 2: (20, 5.0), 3: (30, 5.0)})
+        AssetEvent.objects.filter(item_id=3).update(
+            created_at=timezone.now() - dt.timedelta(days=30)
+        )
+        cursor = AssetEvent.objects.order_by("pk").last().pk
+
+        # Test Action
+        count = self._sync({1: (15, 5.0), 2: (20, 6.0), 4: (40, 5.0)})
+
+        # Expected Results
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            list(
+                AssetEvent.objects.filter(pk__gt=cursor)
+                .order_by("pk")
+                .values_list("item_id", "event", "quantity", "previous_quantity")
+            ),
+            [(4, "added", 40, None), (1, "changed", 15, 10), (3, "removed", 30, None)],
+        )
+        self.assertFalse(AssetEvent.objects.filter(pk__lte=cursor, item_id=3).exists())
+
+    def test_assign_sequence_should_follow_commit_order(self):
+        """
+        Test numbering events of syncs that commit out of ID order.
+
+        ### Expected Result
+        - Events committed after a consumer read get a higher sequence number,
+          even with lower IDs, and are read with the previous cursor.
+        """
+
+        # Test Data
+        def event(pk: int) -> AssetEvent:
+            return AssetEvent.objects.create(
+                pk=pk,
+                owner=self.owner,
+                item_id=pk,
+                event=AssetEvent.Event.ADDED,
+                type_id=34,
+                location_id=self.station.id,
+                location_flag="Hangar",
+                quantity=1,
+            )
+
+        # The sync with the higher IDs commits first and is read by a consumer
+        event(11)
+        event(12)
+        AssetEvent.objects.assign_sequence()
+        cursor = AssetEvent.objects.order_by("sequence").last().sequence
+        # The sync with the lower IDs commits afterwards
+        event(1)
+        event(2)
+
+        # Test Action
+        count = AssetEvent.objects.assign_sequence()
+
+        # Expected Results
+        self.assertEqual(count, 2)
+        self.assertEqual(
+            list(
+                AssetEvent.objects.filter(sequence__gt=cursor)
+                .order_by("sequence")
+                .values_list("pk", flat=True)
+            ),
+            [1, 2],
+        )
+        self.assertEqual(AssetEvent.objects.assign_sequence(), 0)
+
+
+@patch(MODULE_PATH + ".esi")
+class TestLocationSde(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        ItemType.objects.create(id=5, name="Solar System")
+        ItemType.objects.create(id=1529, name="Caldari Administrative Station")
+        cls.solar_system = SolarSystem.objects.create(id=30000142, name="Jita")
+        NPCStation.objects.create(
+            id=60003760,
+            name="Jita IV - Moon 4 - Caldari Navy Assembly Plant",
+            solar_system=cls.solar_system,
+            item_type_id=1529,
+        )
+
+    def test_bulk_get_or_create_esi_should_resolve_stations_from_sde(self, mock_esi):
+        """
+        Test creating a station location.
+
+        ### Expected Result
+        - Station is resolved from the SDE without ESI.
+        """
+        # Test Action
+        locations = Location.objects.bulk_get_or_create_esi({60003760})
+
+        # Expected Results
+        mock_esi.client.Universe.GetUniverseStationsStationId.assert_not_called()
+        location = Location.objects.get(id=60003760)
+        self.assertEqual(locations[60003760].name, location.name)
+        self.assertEqual(location.eve_solar_system_id, 30000142)
+        self.assertEqual(location.resolved_name, location.name)
+
+    def test_update_or_create_esi_should_return_resolved_location(self, mock_esi):
+        """
+        Test updating a station location.
+
+        ### Expected Result
+        - Returned location carries its resolved hierarchy.
+        """
+        # Test Action
+        location, created = Location.objects.update_or_create_esi(60003760)
+
+        # Expected Results
+        mock_esi.client.Universe.GetUniverseStationsStationId.assert_not_called()
+        self.assertTrue(created)
+        self.assertEqual(location.resolved_name, location.name)
+        self.assertEqual(location.resolved_solar_system_id, 30000142)
+        self.assertIsNone(location.root_id)
+
+    def test_load_sde_locations(self, mock_esi):
+        """
+        Test loading all locations from the SDE.
+
+        ### Expected Result
+        - Solar systems and stations are created.
+        - Existing locations are updated.
+        """
+        # Test Data
+        Location.objects.create(id=30000142)
+
+        # Test Action
+        count = Location.objects.load_sde_locations()
+
+        # Expected Results
+        self.assertEqual(count, 2)
+        self.assertEqual(Location.objects.get(id=30000142).name, "Jita")
+        self.assertEqual(Location.objects.get(id=60003760).eve_type_id, 1529)
+        mock_esi.client.Universe.GetUniverseStationsStationId.assert_not_called()
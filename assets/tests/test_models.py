@@ -0,0 +1,511 @@
+# Standard Library
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+# Alliance Auth (External Libs)
+from eve_sde.models.map import SolarSystem
+from eve_sde.models.types import ItemType
+
+# AA Assets
+from assets.models import (
+    Assets,
+    AssetsStaging,
+    Location,
+    MarketPrice,
+    Request,
+    RequestAssets,
+)
+from assets.tests import AssetsTestCase
+from assets.tests.testdata.utils import create_owner_from_user
+
+MODULE_PATH = "assets.models"
+
+
+def make_esi_asset(**kwargs) -> SimpleNamespace:
+    """Create a ESI asset row like returned from the assets endpoints."""
+    data = {
+        "is_blueprint_copy": None,
+        "is_singleton": False,
+        "item_id": 1_000_000_000_001,
+        "location_flag": "Hangar",
+        "location_id": 30000142,
+        "location_type": "solar_system",
+        "quantity": 1,
+        "type_id": 34,
+    }
+    data.update(kwargs)
+    return SimpleNamespace(**data)
+
+
+@patch(MODULE_PATH + ".Assets.objects.get_prices", return_value={34: 5.0, 35: 5.0})
+class TestOwnerProcessAssets(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        ItemType.objects.create(id=5, name="Solar System")
+        ItemType.objects.create(id=34, name="Tritanium")
+        ItemType.objects.create(id=35, name="Pyerite")
+        SolarSystem.objects.create(id=30000142, name="Jita")
+        cls.owner = create_owner_from_user(cls.user)
+
+    def test_should_resolve_types_and_locations_in_bulk(self, _):
+        """
+        Test processing assets with a constant number of queries.
+
+        ### Expected Result
+        - Types and locations are resolved with one query each.
+        - Missing locations are created in bulk.
+        """
+        # Test Data
+        assets = [
+            make_esi_asset(item_id=1, type_id=34),
+            make_esi_asset(item_id=2, type_id=35),
+            make_esi_asset(item_id=3, type_id=34, location_id=1_030_000_000_000),
+        ]
+
+        # Test Action
+        with self.assertNumQueries(4):
+            items = self.owner.process_assets(assets)
+
+        # Expected Results
+        self.assertEqual(len(items), 3)
+        self.assertEqual(Location.objects.get(id=30000142).name, "Jita")
+        self.assertTrue(Location.objects.filter(id=1_030_000_000_000).exists())
+        self.assertEqual(items[1].eve_type.name, "Pyerite")
+        self.assertEqual(items[0].price, 5.0)
+
+    def test_should_resolve_nested_assets(self, _):
+        """
+        Test processing assets located in other assets.
+
+        ### Expected Result
+        - Nested assets get their parent item, root location and depth.
+        """
+        # Test Data
+        assets = [
+            make_esi_asset(item_id=3, location_id=2, location_type="item"),
+            make_esi_asset(item_id=1),
+            make_esi_asset(item_id=2, location_id=1, location_type="item"),
+        ]
+
+        # Test Action
+        items = {item.item_id: item for item in self.owner.process_assets(assets)}
+
+        # Expected Results
+        self.assertIsNone(items[1].parent_item_id)
+        self.assertEqual(items[1].depth, 0)
+        self.assertEqual(items[3].parent_item_id, 2)
+        self.assertEqual(items[3].root_location_id, 30000142)
+        self.assertEqual(items[3].depth, 2)
+
+    def test_should_skip_unknown_types(self, _):
+        """
+        Test processing assets with a type that is not in the SDE.
+
+        ### Expected Result
+        - Asset with unknown type is skipped.
+        """
+        # Test Data
+        assets = [make_esi_asset(item_id=1), make_esi_asset(item_id=2, type_id=99)]
+
+        # Test Action
+        items = self.owner.process_assets(assets)
+
+        # Expected Results
+        self.assertEqual(len(items), 1)
+        self.assertIsInstance(items[0], Assets)
+
+
+@patch(MODULE_PATH + ".Assets.objects.get_prices", return_value={})
+@patch(MODULE_PATH + ".Owner.valid_token")
+@patch(MODULE_PATH + ".Owner._fetch_personal_assets")
+class TestOwnerAssetsFingerprint(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        ItemType.objects.create(id=5, name="Solar System")
+        ItemType.objects.create(id=34, name="Tritanium")
+        SolarSystem.objects.create(id=30000142, name="Jita")
+        cls.owner = create_owner_from_user(cls.user)
+
+    def test_should_skip_unchanged_assets(self, mock_fetch, *_):
+        """
+        Test updating the assets of an owner twice with the same ESI data.
+
+        ### Expected Result
+        - Second update does not process, stage or publish the assets,
+          also with pages out of order.
+        - Changed ESI data is read again without ETags and published.
+        """
+        # Test Data
+        pages = [(1, [make_esi_asset(item_id=1)]), (2, [make_esi_asset(item_id=2)])]
+        mock_fetch.side_effect = lambda *args, **kwargs: iter(pages)
+        self.owner.update_assets_esi()
+
+        # Test Action
+        with (
+            patch.object(
+                Assets.objects,
+                "publish_staged_assets",
+                wraps=Assets.objects.publish_staged_assets,
+            ) as mock_publish,
+            patch.object(
+                self.owner, "process_assets", wraps=self.owner.process_assets
+            ) as mock_process,
+            patch.object(
+                self.owner, "_stage_assets", wraps=self.owner._stage_assets
+            ) as mock_stage,
+        ):
+            # Re-fetched pages arrive out of order
+            pages.reverse()
+            mock_fetch.reset_mock()
+            self.owner.update_assets_esi()
+            mock_publish.assert_not_called()
+            mock_process.assert_not_called()
+            mock_stage.assert_not_called()
+            self.assertEqual(mock_fetch.call_count, 1)
+            self.assertFalse(AssetsStaging.objects.exists())
+
+            pages[0] = (2, [make_esi_asset(item_id=2, quantity=5)])
+            self.owner.update_assets_esi()
+
+        # Expected Results
+        self.assertEqual(mock_publish.call_count, 1)
+        self.assertEqual(mock_stage.call_count, 2)
+        self.assertEqual(mock_fetch.call_args.kwargs, {"use_etag": False})
+        self.assertEqual(Assets.objects.get(item_id=2).quantity, 5)
+        self.assertEqual(set(self.owner.assets_fingerprint), {"1", "2"})
+
+
+class TestAssetsSync(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tritanium = ItemType.objects.create(id=34, name="Tritanium")
+        cls.location = Location.objects.create(id=60003760, name="Jita IV - Moon 4")
+        cls.owner = create_owner_from_user(cls.user)
+
+    def _asset(self, item_id: int, quantity: int = 1) -> Assets:
+        return Assets(
+            item_id=item_id,
+            owner=self.owner,
+            eve_type=self.tritanium,
+            location=self.location,
+            location_flag=Assets.LocationFlag.HANGAR,
+            location_type="station",
+            quantity=quantity,
+            singleton=False,
+        )
+
+    def test_sync_owner_assets_should_only_apply_changes(self):
+        """
+        Test syncing fetched assets against the stored ones.
+
+        ### Expected Result
+        - Unchanged asset keeps its primary key.
+        - Changed asset is updated in place.
+        - New asset is created and missing asset is deleted.
+        """
+        # Test Data
+        unchanged = self._asset(1, quantity=10)
+        changed = self._asset(2, quantity=10)
+        removed = self._asset(3)
+        Assets.objects.bulk_create([unchanged, changed, removed])
+        items = [self._asset(1, quantity=10), self._asset(2, 5), self._asset(4)]
+
+        # Test Action
+        diff = Assets.objects.sync_owner_assets(self.owner, items)
+
+        # Expected Results
+        self.assertEqual([item.item_id for item in diff.created], [4])
+        self.assertEqual([new.item_id for _, new in diff.updated], [2])
+        self.assertEqual([asset.item_id for asset in diff.deleted], [3])
+        self.assertEqual(Assets.objects.get(item_id=1).pk, unchanged.pk)
+        self.assertEqual(Assets.objects.get(item_id=2).pk, changed.pk)
+        self.assertEqual(Assets.objects.get(item_id=2).quantity, 5)
+        self.assertFalse(Assets.objects.filter(item_id=3).exists())
+        self.assertTrue(Assets.objects.filter(item_id=4).exists())
+
+    def test_sync_owner_assets_should_do_nothing_without_changes(self):
+        """
+        Test syncing unchanged assets.
+
+        ### Expected Result
+        - No write queries are executed on the assets table.
+        """
+        # Test Data
+        Assets.objects.bulk_create([self._asset(1), self._asset(2)])
+
+        # Test Action
+        with CaptureQueriesContext(connection) as ctx:
+            diff = Assets.objects.sync_owner_assets(
+                self.owner, [self._asset(1), self._asset(2)]
+            )
+
+        # Expected Results
+        self.assertFalse(diff)
+        writes = [
+            query["sql"]
+            for query in ctx.captured_queries
+            if '"assets_assets"' in query["sql"]
+            and not query["sql"].startswith("SELECT")
+        ]
+        self.assertEqual(writes, [])
+        self.assertFalse(AssetsStaging.objects.exists())
+
+    def test_sync_owner_assets_should_ignore_price_changes(self):
+        """
+        Test syncing assets whose price changed.
+
+        ### Expected Result
+        - A price change alone is not a change of the asset.
+        - `update_prices` writes the stored market price to the assets.
+        """
+        # Test Data
+        asset = self._asset(1)
+        asset.price = 1.0
+        Assets.objects.bulk_create([asset, self._asset(2)])
+        item = self._asset(1)
+        item.price = 2.0
+        MarketPrice.objects.create(eve_type=self.tritanium, price=3.0)
+
+        # Test Action
+        diff = Assets.objects.sync_owner_assets(self.owner, [item, self._asset(2)])
+        count = Assets.objects.update_prices(self.owner)
+
+        # Expected Results
+        self.assertFalse(diff)
+        self.assertEqual(count, 2)
+        self.assertEqual(set(Assets.objects.values_list("price", flat=True)), {3.0})
+        self.assertEqual(Assets.objects.update_prices(self.owner), 0)
+
+    def test_update_staged_tree_should_resolve_across_pages(self):
+        """
+        Test resolving the container tree of assets staged on different pages.
+
+        ### Expected Result
+        - Asset in a container of another page or batch resolves to the station.
+        """
+        # Test Data
+        container = Location.objects.create(id=1)
+        item = self._asset(2)
+        item.location = container
+        item.root_location = container
+        Assets.objects.stage_owner_assets(self.owner, [self._asset(1)])
+        Assets.objects.stage_owner_assets(self.owner, [item])
+
+        # Test Action
+        with patch("assets.managers.ASSETS_BULK_BATCH_SIZE", 1):
+            count = Assets.objects.update_staged_tree(self.owner)
+
+        # Expected Results
+        self.assertEqual(count, 2)
+        staged = AssetsStaging.objects.get(item_id=2)
+        self.assertEqual(staged.parent_item_id, 1)
+        self.assertEqual(staged.root_location_id, self.location.id)
+        self.assertEqual(staged.depth, 1)
+
+    def test_publish_staged_assets_should_publish_in_batches(self):
+        """
+        Test publishing more staged assets than fit in one batch.
+
+        ### Expected Result
+        - All staged assets are published and missing assets are deleted.
+        - Changes are handed over one batch at a time.
+        - Staging table is empty.
+        """
+        # Test Data
+        Assets.objects.bulk_create([self._asset(item_id) for item_id in (6, 7, 8)])
+        Assets.objects.stage_owner_assets(
+            self.owner, [self._asset(item_id) for item_id in range(1, 6)]
+        )
+        chunks = []
+
+        # Test Action
+        with patch("assets.managers.ASSETS_BULK_BATCH_SIZE", 2):
+            published = Assets.objects.publish_staged_assets(
+                self.owner, on_publish=chunks.append
+            )
+
+        # Expected Results
+        self.assertEqual((published.created, published.deleted), (5, 3))
+        self.assertEqual(
+            [len(chunk.created) + len(chunk.deleted) for chunk in chunks],
+            [2, 2, 1, 2, 1],
+        )
+        self.assertEqual(
+            set(Assets.objects.values_list("item_id", flat=True)), {1, 2, 3, 4, 5}
+        )
+        self.assertFalse(AssetsStaging.objects.exists())
+
+
+class TestAssetsReservedQuantity(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tritanium = ItemType.objects.create(id=34, name="Tritanium")
+        cls.location = Location.objects.create(id=60003760, name="Jita IV - Moon 4")
+        cls.owner = create_owner_from_user(cls.user)
+
+    def _request(self, asset: Assets, quantity: int, status: str, closed_at=None):
+        request = Request.objects.create(
+            requesting_user=self.user, status=status, closed_at=closed_at
+        )
+        RequestAssets.objects.create(
+            name=asset.eve_type.name,
+            request=request,
+            asset_pk=asset.pk,
+            asset_location_id=asset.location_id,
+            asset_location_flag=asset.location_flag,
+            eve_type=asset.eve_type,
+            quantity=quantity,
+        )
+
+    def test_annotate_reserved_quantity(self):
+        """
+        Test annotating the quantity reserved by requests.
+
+        ### Expected Result
+        - Open and recently completed requests are reserved.
+        - Old completed and cancelled requests are ignored.
+        """
+        # Test Data
+        asset = Assets.objects.create(
+            item_id=1,
+            owner=self.owner,
+            eve_type=self.tritanium,
+            location=self.location,
+            location_flag=Assets.LocationFlag.HANGAR,
+            location_type="station",
+            quantity=100,
+            singleton=False,
+        )
+        self._request(asset, 10, Request.STATUS_OPEN)
+        self._request(asset, 5, Request.STATUS_COMPLETED, closed_at=timezone.now())
+        self._request(
+            asset,
+            20,
+            Request.STATUS_COMPLETED,
+            closed_at=timezone.now() - timezone.timedelta(days=1),
+        )
+        self._request(asset, 30, Request.STATUS_CANCELLED)
+
+        # Test Action
+        with self.assertNumQueries(1):
+            result = list(Assets.objects.annotate_reserved_quantity())
+
+        # Expected Results
+        self.assertEqual(result[0].reserved_quantity, 15)
+
+
+class TestOwnerUpdateOrderAssets(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tritanium = ItemType.objects.create(id=34, name="Tritanium")
+        cls.location = Location.objects.create(id=60003760, name="Jita IV - Moon 4")
+        cls.owner = create_owner_from_user(cls.user)
+
+    def _asset(self, item_id: int) -> Assets:
+        return Assets.objects.create(
+            item_id=item_id,
+            owner=self.owner,
+            eve_type=self.tritanium,
+            location=self.location,
+            location_flag=Assets.LocationFlag.HANGAR,
+            location_type="station",
+            quantity=10,
+            singleton=False,
+        )
+
+    def _order(self, asset_pk: int) -> RequestAssets:
+        request = Request.objects.create(
+            requesting_user=self.user, status=Request.STATUS_OPEN
+        )
+        return RequestAssets.objects.create(
+            name=self.tritanium.name,
+            request=request,
+            asset_pk=asset_pk,
+            asset_location_id=self.location.id,
+            asset_location_flag=Assets.LocationFlag.HANGAR,
+            eve_type=self.tritanium,
+            quantity=1,
+        )
+
+    def test_should_relink_orders_of_removed_assets(self):
+        """
+        Test relinking open requests after the owner was updated.
+
+        ### Expected Result
+        - Request of a removed asset is linked to a matching asset.
+        - Request of an existing asset keeps its asset despite duplicates.
+        """
+        # Test Data
+        first = self._asset(1)
+        second = self._asset(2)
+        relinked = self._order(asset_pk=999)
+        kept = self._order(asset_pk=second.pk)
+
+        # Test Action
+        self.owner.update_order_assets()
+
+        # Expected Results
+        relinked.refresh_from_db()
+        kept.refresh_from_db()
+        self.assertEqual(relinked.asset_pk, first.pk)
+        self.assertEqual(kept.asset_pk, second.pk)
+
+    def test_should_skip_without_orders(self):
+        """
+        Test relinking without any open request of the owner.
+
+        ### Expected Result
+        - Only the request query is executed.
+        """
+        # Test Data
+        self._asset(1)
+
+        # Test Action
+        with self.assertNumQueries(1):
+            self.owner.update_order_assets()
+
+
+class TestAssetsIndexes(AssetsTestCase):
+    def test_hot_queries_should_have_composite_indexes(self):
+        """
+        Test the composite indexes of the hot asset queries in the database.
+
+        ### Expected Result
+        - Every index exists with the filtered columns in query order.
+        """
+        # Test Data
+        expected = {
+            # Assets of a location page, API and request form
+            "assets_root_location_flag": ["root_location_id", "location_flag"],
+            # Assets of an owner by flag for location lists and summaries
+            "assets_owner_location_flag": ["owner_id", "location_flag"],
+            # Relinking open requests to their asset
+            "assets_type_location_flag": [
+                "eve_type_id",
+                "location_id",
+                "location_flag",
+            ],
+        }
+
+        # Test Action
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Assets._meta.db_table
+            )
+
+        # Expected Results
+        for index_name, columns in expected.items():
+            with self.subTest(index=index_name):
+                self.assertIn(index_name, constraints)
+                self.assertTrue(constraints[index_name]["index"])
+                self.assertEqual(constraints[index_name]["columns"], columns)
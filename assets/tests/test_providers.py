@@ -0,0 +1,158 @@
+# Standard Library
+from unittest.mock import Mock
+
+# Django
+from django.test import TestCase
+
+# Alliance Auth
+from esi.exceptions import ESIErrorLimitException, HTTPNotModified
+
+# AA Assets
+from assets.providers import iter_esi_pages
+
+
+def make_operation(pages: dict, not_modified: tuple = ()) -> Mock:
+    """Create a ESI operation factory returning the given pages."""
+
+    def result(page, use_etag=True, **kwargs):
+        headers = {"X-Pages": str(len(pages))}
+        if page in not_modified and use_etag:
+            raise HTTPNotModified(status_code=304, headers=headers)
+        if kwargs.get("return_response"):
+            return pages[page], Mock(headers=headers)
+        return pages[page]
+
+    def operation(page):
+        op = Mock()
+        op.result.side_effect = lambda **kwargs: result(page, **kwargs)
+        return op
+
+    return Mock(side_effect=operation)
+
+
+class TestIterEsiPages(TestCase):
+    def test_should_yield_pages(self):
+        """
+        Test iterating over all pages of a ESI operation.
+
+        ### Expected Result
+        - Every page is yielded once in order.
+        """
+        # Test Data
+        operation = make_operation({1: ["a"], 2: ["b"], 3: ["c"]})
+
+        # Test Action
+        result = list(iter_esi_pages(operation))
+
+        # Expected Results
+        self.assertEqual(result, [(1, ["a"]), (2, ["b"]), (3, ["c"])])
+        self.assertEqual(operation.call_count, 3)
+
+    def test_should_refetch_not_modified_pages(self):
+        """
+        Test iterating when only some pages are not modified.
+
+        ### Expected Result
+        - Not modified pages are fetched again without ETag.
+        """
+        # Test Data
+        operation = make_operation({1: ["a"], 2: ["b"]}, not_modified=(1,))
+
+        # Test Action
+        result = list(iter_esi_pages(operation))
+
+        # Expected Results
+        self.assertEqual(result, [(2, ["b"]), (1, ["a"])])
+
+    def test_should_raise_when_nothing_changed(self):
+        """
+        Test iterating when all pages are not modified.
+
+        ### Expected Result
+        - HTTPNotModified is raised.
+        """
+        # Test Data
+        operation = make_operation({1: ["a"], 2: ["b"]}, not_modified=(1, 2))
+
+        # Test Action & Expected Results
+        with self.assertRaises(HTTPNotModified):
+            list(iter_esi_pages(operation))
+
+    def test_should_read_pages_without_etag(self):
+        """
+        Test iterating over unchanged pages without ETags.
+
+        ### Expected Result
+        - Every page is yielded once in order.
+        """
+        # Test Data
+        operation = make_operation({1: ["a"], 2: ["b"]}, not_modified=(1, 2))
+
+        # Test Action
+        result = list(iter_esi_pages(operation, use_etag=False))
+
+        # Expected Results
+        self.assertEqual(result, [(1, ["a"]), (2, ["b"])])
+
+    def test_should_fetch_pages_concurrently(self):
+        """
+        Test iterating over all pages with multiple workers.
+
+        ### Expected Result
+        - Every page is yielded once in order.
+        """
+        # Test Data
+        operation = make_operation({page: [page] for page in range(1, 6)})
+
+        # Test Action
+        result = list(iter_esi_pages(operation, max_workers=3))
+
+        # Expected Results
+        self.assertEqual(result, [(page, [page]) for page in range(1, 6)])
+        self.assertEqual(operation.call_count, 5)
+
+    def test_should_limit_pages_in_flight(self):
+        """
+        Test iterating with multiple workers over many pages.
+
+        ### Expected Result
+        - At most `max_workers` pages are fetched ahead of the caller.
+        - Not modified pages are fetched again by the workers.
+        """
+        # Test Data
+        operation = make_operation(
+            {page: [page] for page in range(1, 7)}, not_modified=(2,)
+        )
+
+        # Test Action
+        pages = iter_esi_pages(operation, max_workers=2)
+        first = [next(pages), next(pages)]
+        calls = operation.call_count
+        rest = list(pages)
+
+        # Expected Results
+        self.assertEqual(first, [(1, [1]), (3, [3])])
+        self.assertLessEqual(calls, 4)
+        self.assertEqual(rest, [(4, [4]), (5, [5]), (6, [6]), (2, [2])])
+
+    def test_should_raise_esi_errors_from_workers(self):
+        """
+        Test iterating with multiple workers when a page hits the ESI error limit.
+
+        ### Expected Result
+        - The ESI error is raised to the caller.
+        """
+        # Test Data
+        operation = make_operation({1: ["a"], 2: ["b"], 3: ["c"]})
+        side_effect = operation.side_effect
+
+        def operation_with_error(page):
+            if page == 3:
+                raise ESIErrorLimitException(reset=60)
+            return side_effect(page)
+
+        operation.side_effect = operation_with_error
+
+        # Test Action & Expected Results
+        with self.assertRaises(ESIErrorLimitException):
+            list(iter_esi_pages(operation, max_workers=3))
@@ -0,0 +1,463 @@
+# Standard Library
+import datetime
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+# Django
+from django.core.cache import cache
+from django.utils import timezone
+
+# Alliance Auth
+from esi.exceptions import HTTPClientError
+
+# Alliance Auth (External Libs)
+from eve_sde.models.map import SolarSystem
+from eve_sde.models.types import ItemType
+
+# AA Assets
+from assets import tasks
+from assets.models import Assets, EveEntity, Location, Owner, Request, RequestAssets
+from assets.task_helpers.location_helpers import (
+    get_structure_access,
+    order_structure_characters,
+    resolve_locations,
+    set_structure_access,
+)
+from assets.tests import AssetsTestCase
+from assets.tests.testdata.utils import create_owner_from_user
+
+HELPERS_PATH = "assets.task_helpers.location_helpers"
+TASKS_PATH = "assets.tasks"
+
+
+class TestResolveLocations(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        ItemType.objects.create(id=5, name="Solar System")
+        cls.tritanium = ItemType.objects.create(id=34, name="Tritanium")
+        ItemType.objects.create(id=35832, name="Astrahus")
+        SolarSystem.objects.create(id=30000142, name="Jita")
+        cls.owner = create_owner_from_user(cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def _asset(self, item_id: int, location: Location) -> Assets:
+        return Assets.objects.create(
+            item_id=item_id,
+            owner=self.owner,
+            eve_type=self.tritanium,
+            location=location,
+            location_flag=Assets.LocationFlag.HANGAR,
+            location_type="item",
+            quantity=1,
+            singleton=False,
+        )
+
+    @patch(HELPERS_PATH + ".Token.get_token")
+    @patch(HELPERS_PATH + ".esi")
+    def test_should_resolve_locations_in_bulk(self, mock_esi, mock_get_token):
+        """
+        Test resolving solar systems and structures in one batch.
+
+        ### Expected Result
+        - Solar system is resolved without ESI.
+        - Structure is resolved with the token of a character with assets in it.
+        """
+        # Test Data
+        system = Location.objects.create(id=30000142)
+        structure = Location.objects.create(id=1_030_000_000_000)
+        EveEntity.objects.create(
+            id=2001, name="Owner Corporation", category=EveEntity.CATEGORY_CORPORATION
+        )
+        self._asset(1, system)
+        self._asset(2, structure)
+        operation = mock_esi.client.Universe.GetUniverseStructuresStructureId
+        operation.return_value.result.return_value = SimpleNamespace(
+            name="Jita - Astrahus",
+            solar_system_id=30000142,
+            type_id=35832,
+            owner_id=2001,
+        )
+
+        # Test Action
+        count, limit_exceeded = resolve_locations([system.id, structure.id])
+
+        # Expected Results
+        self.assertEqual(count, 2)
+        self.assertFalse(limit_exceeded)
+        mock_get_token.assert_called_once()
+        self.assertEqual(mock_get_token.call_args.args[0], 1001)
+        structure.refresh_from_db()
+        self.assertEqual(structure.name, "Jita - Astrahus")
+        self.assertEqual(structure.resolved_solar_system_id, 30000142)
+        self.assertEqual(structure.owner_id, 2001)
+        self.assertEqual(Location.objects.get(id=30000142).name, "Jita")
+
+    @patch(HELPERS_PATH + ".Token.get_token")
+    @patch(HELPERS_PATH + ".esi")
+    def test_should_create_unknown_structure_owners(self, mock_esi, _):
+        """
+        Test resolving a structure owned by a corporation without EveEntity.
+
+        ### Expected Result
+        - Owner corporation is created from ESI and linked to the structure.
+        """
+        # Test Data
+        structure = Location.objects.create(id=1_030_000_000_003)
+        self._asset(1, structure)
+        operation = mock_esi.client.Universe.GetUniverseStructuresStructureId
+        operation.return_value.result.return_value = SimpleNamespace(
+            name="Jita - Astrahus",
+            solar_system_id=30000142,
+            type_id=35832,
+            owner_id=98000001,
+        )
+
+        # Test Action
+        with patch.object(
+            EveEntity.objects,
+            "create_bulk_from_esi",
+            side_effect=lambda eve_ids: EveEntity.objects.create(
+                id=eve_ids[0],
+                name="New Corporation",
+                category=EveEntity.CATEGORY_CORPORATION,
+            ),
+        ) as mock_create_bulk:
+            resolve_locations([structure.id])
+
+        # Expected Results
+        mock_create_bulk.assert_called_once_with([98000001])
+        structure.refresh_from_db()
+        self.assertEqual(structure.owner_id, 98000001)
+
+    @patch(HELPERS_PATH + ".Token.get_token")
+    @patch(HELPERS_PATH + ".esi")
+    def test_should_skip_characters_without_structure_access(
+        self, mock_esi, mock_get_token
+    ):
+        """
+        Test resolving a structure the only character has no access to.
+
+        ### Expected Result
+        - Structure is not requested from ESI.
+        """
+        # Test Data
+        structure = Location.objects.create(id=1_030_000_000_001)
+        self._asset(1, structure)
+        set_structure_access(structure.id, 1001, False)
+
+        # Test Action
+        count, _ = resolve_locations([structure.id])
+
+        # Expected Results
+        self.assertEqual(count, 0)
+        mock_get_token.assert_not_called()
+        mock_esi.client.Universe.GetUniverseStructuresStructureId.assert_not_called()
+
+    @patch(HELPERS_PATH + ".Token.get_token")
+    @patch(HELPERS_PATH + ".esi")
+    def test_should_remember_forbidden_structure_access(self, mock_esi, mock_get_token):
+        """
+        Test resolving a structure with a character that has no access.
+
+        ### Expected Result
+        - Denied access is cached for the character.
+        """
+        # Test Data
+        structure = Location.objects.create(id=1_030_000_000_002)
+        self._asset(1, structure)
+        operation = mock_esi.client.Universe.GetUniverseStructuresStructureId
+        operation.return_value.result.side_effect = HTTPClientError(
+            403, {}, b"Forbidden"
+        )
+
+        # Test Action
+        count, limit_exceeded = resolve_locations([structure.id])
+
+        # Expected Results
+        self.assertEqual(count, 0)
+        self.assertFalse(limit_exceeded)
+        self.assertEqual(
+            get_structure_access({(structure.id, 1001)}), {(structure.id, 1001): False}
+        )
+
+    @patch(HELPERS_PATH + ".Token.get_token")
+    @patch(HELPERS_PATH + ".esi")
+    def test_should_remember_missing_structures(self, mock_esi, mock_get_token):
+        """
+        Test resolving a structure that does not exist.
+
+        ### Expected Result
+        - The structure is not requested again.
+        """
+        # Test Data
+        structure = Location.objects.create(id=1_030_000_000_004)
+        self._asset(1, structure)
+        operation = mock_esi.client.Universe.GetUniverseStructuresStructureId
+        operation.return_value.result.side_effect = HTTPClientError(
+            404, {}, b"Not Found"
+        )
+
+        # Test Action
+        resolve_locations([structure.id])
+        count, _ = resolve_locations([structure.id])
+
+        # Expected Results
+        self.assertEqual(count, 0)
+        operation.assert_called_once()
+        self.assertEqual(
+            get_structure_access({(structure.id, 1001)}), {(structure.id, 1001): False}
+        )
+
+    @patch(HELPERS_PATH + ".Token.get_token")
+    @patch(HELPERS_PATH + ".esi")
+    def test_should_not_fetch_containers_as_structures(self, mock_esi, mock_get_token):
+        """
+        Test resolving the location of an asset inside another asset.
+
+        ### Expected Result
+        - The container is not requested from ESI.
+        """
+        # Test Data
+        station = Location.objects.create(id=60003760, name="Jita IV - Moon 4")
+        container = Location.objects.create(id=1_030_000_000_005)
+        Assets.objects.create(
+            item_id=container.id,
+            owner=self.owner,
+            eve_type=self.tritanium,
+            location=station,
+            location_flag=Assets.LocationFlag.HANGAR,
+            location_type="station",
+            quantity=1,
+            singleton=True,
+        )
+        self._asset(1, container)
+
+        # Test Action
+        resolve_locations([container.id])
+
+        # Expected Results
+        mock_get_token.assert_not_called()
+        mock_esi.client.Universe.GetUniverseStructuresStructureId.assert_not_called()
+
+    def test_order_structure_characters(self):
+        """
+        Test ordering the characters to fetch a structure with.
+
+        ### Expected Result
+        - Characters with access come first, denied characters are skipped.
+        """
+        # Test Data
+        access = {(1, 1001): False, (1, 1003): True}
+
+        # Test Action
+        result = order_structure_characters(1, [1001, 1002, 1003], access)
+
+        # Expected Results
+        self.assertEqual(result, [1003, 1002])
+
+
+class TestUpdateAllLocations(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tritanium = ItemType.objects.create(id=34, name="Tritanium")
+        cls.owner = create_owner_from_user(cls.user)
+        for item_id in range(1, 6):
+            location = Location.objects.create(id=1_030_000_000_000 + item_id)
+            Assets.objects.create(
+                item_id=item_id,
+                owner=cls.owner,
+                eve_type=cls.tritanium,
+                location=location,
+                location_flag=Assets.LocationFlag.HANGAR,
+                location_type="item",
+                quantity=1,
+                singleton=False,
+            )
+
+    @patch(TASKS_PATH + ".ASSETS_LOCATION_BATCH_SIZE", 2)
+    @patch(TASKS_PATH + ".update_locations.apply_async")
+    def test_should_queue_location_batches(self, mock_apply_async):
+        """
+        Test queueing the location update.
+
+        ### Expected Result
+        - Locations are queued in batches instead of one task per location.
+        - Containers are not queued.
+        """
+        # Test Data
+        container = Location.objects.create(id=6)
+        Assets.objects.create(
+            item_id=container.id,
+            owner=self.owner,
+            eve_type=self.tritanium,
+            location_id=1_030_000_000_001,
+            location_flag=Assets.LocationFlag.HANGAR,
+            location_type="item",
+            quantity=1,
+            singleton=True,
+        )
+        Assets.objects.create(
+            item_id=7,
+            owner=self.owner,
+            eve_type=self.tritanium,
+            location=container,
+            location_flag=Assets.LocationFlag.HANGAR,
+            location_type="item",
+            quantity=1,
+            singleton=False,
+        )
+
+        # Test Action
+        tasks.update_all_locations()
+
+        # Expected Results
+        self.assertEqual(mock_apply_async.call_count, 3)
+        queued = [
+            location_id
+            for call in mock_apply_async.call_args_list
+            for location_id in call.kwargs["args"][0]
+        ]
+        self.assertEqual(len(queued), 5)
+
+
+class TestUpdateAllAssets(AssetsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tritanium = ItemType.objects.create(id=34, name="Tritanium")
+        cls.location = Location.objects.create(id=60003760, name="Jita IV - Moon 4")
+        cls.owner = create_owner_from_user(cls.user)
+        cls.other_owner = create_owner_from_user(cls.superuser)
+
+    def setUp(self):
+        cache.clear()
+
+    @patch(TASKS_PATH + ".update_assets_for_owner.apply_async")
+    def test_should_queue_owners_that_missed_their_slot(self, mock_apply_async):
+        """
+        Test queueing the asset updates of all owners.
+
+        ### Expected Result
+        - Owner updated before its latest slot is queued with a priority boost
+          for open requests.
+        - Owner updated after its latest slot is skipped.
+        """
+        # Test Data
+        now = timezone.now()
+        Owner.objects.filter(pk=self.owner.pk).update(
+            last_update=now - datetime.timedelta(days=1)
+        )
+        Owner.objects.filter(pk=self.other_owner.pk).update(last_update=now)
+        asset = Assets.objects.create(
+            item_id=1,
+            owner=self.owner,
+            eve_type=self.tritanium,
+            location=self.location,
+            location_flag=Assets.LocationFlag.HANGAR,
+            location_type="station",
+            quantity=1,
+            singleton=False,
+        )
+        RequestAssets.objects.create(
+            name=self.tritanium.name,
+            request=Request.objects.create(
+                requesting_user=self.user, status=Request.STATUS_OPEN
+            ),
+            asset_pk=asset.pk,
+            asset_location_id=self.location.id,
+            asset_location_flag=Assets.LocationFlag.HANGAR,
+            eve_type=self.tritanium,
+            quantity=1,
+        )
+
+        # Test Action
+        tasks.update_all_assets()
+
+        # Expected Results
+        mock_apply_async.assert_called_once()
+        self.assertEqual(
+            mock_apply_async.call_args.kwargs["kwargs"]["owner_pk"], self.owner.pk
+        )
+        self.assertEqual(mock_apply_async.call_args.kwargs["priority"], 5)
+
+    def test_get_update_slot_start_should_spread_owners(self):
+        """
+        Test the update slots of owners.
+
+        ### Expected Result
+        - Slot start lies within the last update period.
+        - Owners get different slots.
+        """
+        # Test Data
+        now = timezone.now()
+
+        # Test Action
+        slots = {tasks.get_update_slot_start(owner_pk, now) for owner_pk in range(50)}
+
+        # Expected Results
+        self.assertGreater(len(slots), 40)
+        for slot in slots:
+            self.assertLessEqual(slot, now)
+            self.assertGreater(
+                slot, now - datetime.timedelta(minutes=tasks.ASSETS_UPDATE_PERIOD)
+            )
+
+    @patch(TASKS_PATH + ".ASSETS_UPDATE_MAX_CONCURRENT", 1)
+    def test_update_slot_should_requeue_when_all_slots_are_taken(self):
+        """
+        Test running more owner updates at once than allowed on a worker.
+
+        ### Expected Result
+        - Task is queued again without a retry and the slot is released afterwards.
+        - Tasks on other workers have their own slots.
+        """
+        # Test Data
+        task = Mock()
+        task.request.hostname = "celery@worker1"
+        task.request.kwargs = {"owner_pk": 1}
+        other_task = Mock()
+        other_task.request.hostname = "celery@worker2"
+
+        # Test Action
+        with tasks.update_slot(task) as has_slot:
+            with tasks.update_slot(task) as has_second_slot:
+                pass
+            with tasks.update_slot(other_task) as has_other_slot:
+                pass
+
+        # Expected Results
+        self.assertTrue(has_slot)
+        self.assertFalse(has_second_slot)
+        self.assertTrue(has_other_slot)
+        task.retry.assert_not_called()
+        task.apply_async.assert_called_once()
+        self.assertEqual(task.apply_async.call_args.kwargs["kwargs"], {"owner_pk": 1})
+        with tasks.update_slot(task) as has_slot:
+            self.assertTrue(has_slot)
+
+    @patch(TASKS_PATH + ".Owner.update_assets_esi")
+    def test_update_assets_for_owner_should_skip_running_update(
+        self, mock_update_assets_esi
+    ):
+        """
+        Test updating an owner whose assets are already being updated.
+
+        ### Expected Result
+        - A second update of the same owner does nothing, e.g. a requeued update
+          that lost its QueueOnce lock.
+        - The lock is released after the update.
+        """
+        # Test Action
+        with tasks.owner_update_lock(self.owner.pk) as has_lock:
+            tasks.update_assets_for_owner.run(owner_pk=self.owner.pk)
+        tasks.update_assets_for_owner.run(owner_pk=self.owner.pk)
+
+        # Expected Results
+        self.assertTrue(has_lock)
+        mock_update_assets_esi.assert_called_once()
+        with tasks.owner_update_lock(self.owner.pk) as has_lock:
+            self.assertTrue(has_lock)
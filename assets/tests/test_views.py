@@ -24,3 +24,14 @@ class TestViews(AssetsTestCase):
 
         # Expected Result
         self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_search_view(self):
+        # Test Data
+        request = self.factory.get(reverse("assets:search"))
+        request.user = self.superuser
+
+        # Test Action
+        response = views.search(request)
+
+        # Expected Result
+        self.assertEqual(response.status_code, HTTPStatus.OK)
@@ -13,6 +13,7 @@ urlpatterns = [
     path("", views.index, name="index"),
     path("admin/", views.admin, name="admin"),
     path("location/", views.location, name="location"),
+    path("search/", views.search, name="search"),
     path("<int:location_id>/flag/<str:location_flag>", views.assets, name="assets"),
     path("add_corp/", views.add_corp, name="add_corp"),
     path("add_char/", views.add_char, name="add_char"),
@@ -25,10 +25,13 @@ from assets.hooks import add_info_to_context, get_extension_logger
 from assets.models import Assets, Owner, Request, RequestAssets
 from assets.tasks import (
     clear_all_etags,
+    clear_cache,
+    load_sde_locations,
     update_all_assets,
     update_all_locations,
     update_all_parent_locations,
     update_assets_for_owner,
+    update_market_prices,
 )
 
 logger = get_extension_logger(__name__)
@@ -102,6 +105,11 @@ def admin(request):
         if request.POST.get("run_clear_etag"):
             messages.info(request, _("Queued Clear All ETags"))
             clear_all_etags.apply_async(priority=1)
+        if request.POST.get("run_clear_no_permission"):
+            messages.info(request, _("Queued Clear Cached Structure Permissions"))
+            clear_cache.apply_async(
+                kwargs={"namespaces": ["no_permission"]}, priority=1
+            )
         if request.POST.get("run_update_all_assets"):
             messages.info(request, _("Queued Update All Assets"))
             update_all_assets.apply_async(
@@ -114,9 +122,13 @@ def admin(request):
             )
         if request.POST.get("run_update_all_parent_locations"):
             messages.info(request, _("Queued Update All Parent Locations"))
-            update_all_parent_locations.apply_async(
-                kwargs={"force_refresh": force_refresh}, priority=7
-            )
+            update_all_parent_locations.apply_async(priority=7)
+        if request.POST.get("run_load_sde_locations"):
+            messages.info(request, _("Queued Load SDE Locations"))
+            load_sde_locations.apply_async(priority=7)
+        if request.POST.get("run_update_market_prices"):
+            messages.info(request, _("Queued Update Market Prices"))
+            update_market_prices.apply_async(priority=7)
     return render(request, "assets/admin.html")
 
 
@@ -133,6 +145,19 @@ def location(request):
     return render(request, "assets/location.html", context=context)
 
 
+@login_required
+@permissions_required(["assets.basic_access"])
+def search(request):
+    context = {
+        "corporation_id": request.user.profile.main_character.corporation_id,
+        "character_id": request.user.profile.main_character.character_id,
+        "title": _("Search"),
+    }
+    context = add_info_to_context(request, context)
+
+    return render(request, "assets/search.html", context=context)
+
+
 @login_required
 @permissions_required(["assets.basic_access"])
 def assets(request, location_id: int, location_flag: str):
@@ -145,7 +170,7 @@ def assets(request, location_id: int, location_flag: str):
         "forms": {
             "single_request": forms.RequestOrder(),
             "multi_request": forms.RequestMultiOrder(
-                location_flag=location_flag, location_id=location_id
+                location_flag=location_flag, location_id=location_id, request=request
             ),
         },
     }
@@ -223,7 +248,10 @@ def create_order(request, location_id: int, location_flag: str):
     # Check Permission
     form = forms.RequestOrder(request.POST)
     form_multi = forms.RequestMultiOrder(
-        request.POST, location_flag=location_flag, location_id=location_id
+        request.POST,
+        location_flag=location_flag,
+        location_id=location_id,
+        request=request,
     )
 
     if form.is_valid():
@@ -232,7 +260,7 @@ def create_order(request, location_id: int, location_flag: str):
         user = request.user
 
         try:
-            asset = Assets.objects.get(pk=asset_pk)
+            asset = Assets.objects.visible_to(user).get(pk=asset_pk)
         except Assets.DoesNotExist:
             return JsonResponse(
                 {"success": False, "message": "The asset does not exist."},
@@ -293,7 +321,7 @@ def create_order(request, location_id: int, location_flag: str):
                 continue
 
             try:
-                asset = Assets.objects.get(pk=asset_pk)
+                asset = Assets.objects.visible_to(user).get(pk=asset_pk)
             except Assets.DoesNotExist:
                 return JsonResponse(
                     {"success": False, "message": "The asset does not exist."},